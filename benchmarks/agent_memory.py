@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Per-agent memory benchmark.
+
+Compares the bytes allocated per Agent by the current slotted model, which
+shares one default ethical rule set between agents, with the original
+dict-backed model that gave every agent five fresh EthicalRule objects.
+
+Run from the repository root:
+
+    python -m benchmarks.agent_memory --agents 100000
+"""
+
+import argparse
+import gc
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from src.peterson_ai_model import Agent
+
+
+@dataclass
+class LegacyEthicalRule:
+    id: str
+    description: str
+    priority: int
+    active: bool = True
+
+
+@dataclass
+class LegacyAgent:
+    """The original Agent layout: __dict__-backed with per-agent rule copies"""
+    id: str
+    name: str
+    capability: float
+    supervisor_id: Optional[str] = None
+    decision_logs: List = field(default_factory=list)
+    ethical_rules: List[LegacyEthicalRule] = field(default_factory=list)
+    rule_proposals: int = 0
+    rule_improvements: int = 0
+
+    def __post_init__(self):
+        self.ethical_rules = [
+            LegacyEthicalRule("hierarchy_respect", "Respect legitimate authority and competence hierarchies", 1),
+            LegacyEthicalRule("personal_responsibility", "Take responsibility for decisions and their consequences", 2),
+            LegacyEthicalRule("truth_telling", "Strive for truthfulness in all communications", 3),
+            LegacyEthicalRule("self_improvement", "Continuously work to improve competence and capability", 4),
+            LegacyEthicalRule("community_contribution", "Contribute positively to the community and ecosystem", 5)
+        ]
+
+
+def bytes_per_agent(factory, count: int) -> float:
+    """Average bytes allocated by creating ``count`` agents with ``factory``"""
+    ids = [f"agent-{i}" for i in range(count)]
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    agents = [factory(agent_id) for agent_id in ids]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del agents
+    return (after - before) / count
+
+
+def run(count: int) -> Dict[str, float]:
+    """Measure every agent layout and return bytes per agent"""
+    def with_own_rules(agent_id):
+        agent = Agent(id=agent_id, name=agent_id, capability=5.0)
+        agent.own_ethical_rules()
+        return agent
+
+    return {
+        "legacy (dict-backed, per-agent rules)": bytes_per_agent(
+            lambda agent_id: LegacyAgent(id=agent_id, name=agent_id, capability=5.0), count),
+        "slotted, own rule copy": bytes_per_agent(with_own_rules, count),
+        "slotted, shared default rules": bytes_per_agent(
+            lambda agent_id: Agent(id=agent_id, name=agent_id, capability=5.0), count),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the memory cost of one Agent")
+    parser.add_argument("--agents", type=int, default=100000, help="number of agents to allocate")
+    args = parser.parse_args()
+
+    results = run(args.agents)
+    baseline = next(iter(results.values()))
+    print(f"Bytes per agent ({args.agents} agents):")
+    for label, cost in results.items():
+        print(f"  {label:<40} {cost:8.1f}  ({cost / baseline:.0%} of legacy)")
+
+
+if __name__ == "__main__":
+    main()
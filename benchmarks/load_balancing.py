@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Strict versus load-aware routing throughput.
+
+Replays one seeded decision stream through a discrete-time queueing
+simulation twice, once with strict escalation and once with load-aware
+routing.  Each tick a batch of decisions arrives at random leaves and is
+routed; every agent then completes up to ``service_rate`` of its queued
+decisions in arrival order.  Reports decisions completed per tick, the
+ticks decisions waited in queues, the deepest queue, the share of all work
+taken by the busiest agent, and the wall-clock cost of routing.
+
+Run from the repository root:
+
+    python -m benchmarks.load_balancing --agents 2000 --ticks 500
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import deque
+from typing import Deque, Dict
+
+from benchmarks.run_benchmarks import percentile
+from src.load_balancing import LoadTracker
+from src.synthetic import COMPLEXITY_DISTRIBUTIONS, generate_decisions, generate_system, leaf_ids
+
+
+def simulate(config: dict, load_aware: bool) -> Dict[str, float]:
+    """Run the queueing simulation under one routing policy"""
+    system = generate_system(config['agents'], fan_out=config['fan_out'], seed=config['seed'])
+    if load_aware:
+        tracker = system.enable_load_aware_routing(config['levels'])
+    else:
+        # Strict routing ignores load; the simulation still tracks it
+        tracker = LoadTracker()
+    leaves = leaf_ids(list(system.hierarchy.agents.values()))
+    arrivals = config['arrivals']
+    stream = iter(generate_decisions(arrivals * config['ticks'], leaves, distribution=config['complexity'],
+                                     seed=config['seed'] + 1))
+
+    queues: Dict[str, Deque[int]] = {}
+    handled: Dict[str, int] = {}
+    waits = []
+    max_queue = 0
+    routing_seconds = 0.0
+    clock = time.perf_counter
+    for tick in range(config['ticks']):
+        started = clock()
+        routed = [system.route_decision(decision, agent_id)[0]
+                  for decision, agent_id in (next(stream) for _ in range(arrivals))]
+        routing_seconds += clock() - started
+        for handler_id in routed:
+            if not load_aware:
+                tracker.assign(handler_id)
+            queues.setdefault(handler_id, deque()).append(tick)
+            handled[handler_id] = handled.get(handler_id, 0) + 1
+
+        for agent_id, queue in queues.items():
+            max_queue = max(max_queue, len(queue))
+            started_count = tracker.start(agent_id, config['service_rate'])
+            for _ in range(started_count):
+                waits.append(tick - queue.popleft())
+            tracker.finish(agent_id, started_count)
+
+    waits.sort()
+    total = arrivals * config['ticks']
+    return {
+        'completed': len(waits),
+        'throughput_per_tick': len(waits) / config['ticks'],
+        'backlog': total - len(waits),
+        'mean_wait_ticks': sum(waits) / len(waits) if waits else 0.0,
+        'p95_wait_ticks': percentile(waits, 0.95),
+        'max_queue': max_queue,
+        'busiest_share': max(handled.values()) / total if total else 0.0,
+        'routing_per_second': total / routing_seconds if routing_seconds > 0 else 0.0,
+    }
+
+
+def run(config: dict) -> dict:
+    """Simulate both policies and return the JSON-ready results"""
+    return {
+        'config': config,
+        'results': {'strict': simulate(config, False), 'load_aware': simulate(config, True)},
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare strict and load-aware routing throughput")
+    parser.add_argument("--agents", type=int, default=2000, help="number of agents in the hierarchy")
+    parser.add_argument("--fan-out", type=int, default=4, help="maximum subordinates per agent")
+    parser.add_argument("--ticks", type=int, default=500, help="simulated time steps")
+    parser.add_argument("--arrivals", type=int, default=200, help="decisions arriving per tick")
+    parser.add_argument("--service-rate", type=int, default=1, help="decisions an agent completes per tick")
+    parser.add_argument("--levels", type=int, default=2, help="capable levels load-aware routing considers")
+    parser.add_argument("--complexity", choices=COMPLEXITY_DISTRIBUTIONS, default="uniform",
+                        help="complexity distribution of the decision stream")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the generated workload")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    config = {'agents': args.agents, 'fan_out': args.fan_out, 'ticks': args.ticks,
+              'arrivals': args.arrivals, 'service_rate': args.service_rate, 'levels': args.levels,
+              'complexity': args.complexity, 'seed': args.seed}
+    results = run(config)
+
+    print(f"{'policy':<12} {'done/tick':>10} {'backlog':>9} {'mean wait':>10} {'p95 wait':>9} "
+          f"{'max queue':>10} {'busiest':>8} {'routes/s':>10}")
+    for name, result in results['results'].items():
+        print(f"{name:<12} {result['throughput_per_tick']:>10.1f} {result['backlog']:>9} "
+              f"{result['mean_wait_ticks']:>10.1f} {result['p95_wait_ticks']:>9} {result['max_queue']:>10} "
+              f"{result['busiest_share']:>8.1%} {result['routing_per_second']:>10.0f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(results, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Routing and scoring benchmark suite.
+
+Builds a seeded synthetic hierarchy and decision stream, then measures the
+throughput, per-call latency percentiles and peak traced memory of the
+routing, distance, instability and Agent.calculate_* operations.  Results
+are written as JSON and compared against a stored baseline, by default
+benchmarks/baseline.json; the run exits with status 1 when an operation
+regressed beyond the tolerance, or when batch routing is no faster than
+routing the same batches one by one.
+
+The committed baseline was recorded with the default configuration and
+keeps the slowest of several runs, so it flags real regressions rather than
+noise.  A baseline recorded with a different configuration is not compared.
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --agents 1000 --baseline "" --output results.json
+    python -m benchmarks.run_benchmarks --output benchmarks/baseline.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.synthetic import COMPLEXITY_DISTRIBUTIONS, generate_agents, generate_decisions, leaf_ids
+from src.peterson_ai_model import PetersonianAISystem
+from src.sharding import route_decisions_sharded
+
+try:
+    import numpy  # noqa: F401
+    HAVE_NUMPY = True
+except ImportError:
+    HAVE_NUMPY = False
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+BATCH_SIZE = 1024
+# Sharded routing starts its worker processes on every call, so it is
+# measured on larger batches (see setup_route_decisions_sharded)
+SHARDED_BATCH_SIZE = 16384
+
+# A benchmark's setup builds fresh state and returns the operation together
+# with the argument tuples to call it with and the work units per call
+Setup = Callable[[dict], Tuple[Callable, List[tuple], int]]
+
+
+def _system(config: dict, routed: bool = False) -> Tuple[PetersonianAISystem, List[str]]:
+    agents = generate_agents(config['agents'], fan_out=config['fan_out'], depth=config['depth'],
+                             seed=config['seed'])
+    system = PetersonianAISystem()
+    for agent in agents:
+        system.add_agent(agent)
+    leaves = leaf_ids(agents)
+    if routed:
+        for decision, agent_id in _decisions(config, leaves):
+            system.route_decision(decision, agent_id)
+    return system, leaves
+
+
+def _decisions(config: dict, entry_ids: Sequence[str]) -> List[tuple]:
+    return list(generate_decisions(config['decisions'], entry_ids, distribution=config['complexity'],
+                                   seed=config['seed'] + 1))
+
+
+def _shallow(config: dict) -> dict:
+    # A three-level tree (root, 4 managers, 16 leaves) where per-call
+    # overhead dominates over the escalation search
+    return dict(config, agents=21, fan_out=4, depth=2)
+
+
+def setup_route_decision(config):
+    system, leaves = _system(config)
+    system.hierarchy.get_index()
+    return system.route_decision, _decisions(config, leaves), 1
+
+
+def setup_route_decision_shallow(config):
+    system, leaves = _system(_shallow(config))
+    system.hierarchy.get_index()
+    return system.route_decision, _decisions(config, leaves), 1
+
+
+def setup_route_decision_load_aware(config):
+    system, leaves = _system(config)
+    system.hierarchy.get_index()
+    system.enable_load_aware_routing()
+    return system.route_decision, _decisions(config, leaves), 1
+
+
+def _batches(config: dict, shallow: bool = False,
+             batch_size: int = BATCH_SIZE) -> Tuple[PetersonianAISystem, List[tuple]]:
+    system, leaves = _system(_shallow(config) if shallow else config)
+    system.hierarchy.get_index()
+    pairs = _decisions(config, leaves)
+    return system, [([decision for decision, _ in pairs[start:start + batch_size]],
+                      [agent_id for _, agent_id in pairs[start:start + batch_size]])
+                     for start in range(0, len(pairs), batch_size)]
+
+
+def _batch_setup(shallow: bool, scalar: bool) -> Setup:
+    def setup(config):
+        system, batches = _batches(config, shallow)
+        if not scalar:
+            return system.route_decisions, batches, BATCH_SIZE
+        route_decision = system.route_decision
+
+        def route_one_by_one(decisions, agent_ids):
+            return [route_decision(decision, agent_id) for decision, agent_id in zip(decisions, agent_ids)]
+        return route_one_by_one, batches, BATCH_SIZE
+    return setup
+
+
+def setup_route_decisions_sharded(config):
+    # Compare with route_decisions_large: the same batches routed in this process
+    system, batches = _batches(config, batch_size=SHARDED_BATCH_SIZE)
+
+    def route(decisions, agent_ids):
+        return route_decisions_sharded(system, decisions, agent_ids)
+    return route, batches, SHARDED_BATCH_SIZE
+
+
+def setup_route_decisions_large(config):
+    system, batches = _batches(config, batch_size=SHARDED_BATCH_SIZE)
+    return system.route_decisions, batches, SHARDED_BATCH_SIZE
+
+
+def setup_get_distance(config):
+    system, leaves = _system(config)
+    hierarchy = system.hierarchy
+    hierarchy.get_index()
+    rng = random.Random(config['seed'] + 2)
+    ids = list(hierarchy.agents)
+    pairs = []
+    for _ in range(config['decisions']):
+        agent_id = rng.choice(leaves)
+        supervisor_id = agent_id
+        for _ in range(rng.randrange(1, 4)):
+            supervisor_id = hierarchy.edges.get(supervisor_id, supervisor_id)
+        pairs.append((agent_id, supervisor_id if rng.random() < 0.8 else rng.choice(ids)))
+    return hierarchy.get_distance, pairs, 1
+
+
+def setup_calculate_instability(config):
+    system, _ = _system(config)
+    agents = list(system.hierarchy.agents.values())
+    rng = random.Random(config['seed'] + 3)
+
+    def change_and_measure(agent, capability):
+        # Each call follows a capability change, as in a live system
+        agent.capability = capability
+        return system.hierarchy.calculate_instability()
+
+    calls = [(rng.choice(agents), rng.uniform(0, 10)) for _ in range(min(config['decisions'], 10000))]
+    return change_and_measure, calls, 1
+
+
+def _agent_setup(score: Callable) -> Setup:
+    def setup(config):
+        system, _ = _system(config, routed=True)
+        max_knowledge = system.get_max_knowledge_contribution()
+        agents = list(system.hierarchy.agents.values())
+        return (lambda agent: score(agent, max_knowledge)), [(agent,) for agent in agents], 1
+    return setup
+
+
+BENCHMARKS: Dict[str, Setup] = {
+    'route_decision': setup_route_decision,
+    'route_decision_shallow': setup_route_decision_shallow,
+    'route_decision_load_aware': setup_route_decision_load_aware,
+    'get_distance': setup_get_distance,
+    'calculate_instability': setup_calculate_instability,
+    'calculate_performance': _agent_setup(lambda agent, _: agent.calculate_performance()),
+    'calculate_accountability': _agent_setup(lambda agent, _: agent.calculate_accountability()),
+    'calculate_knowledge_contribution': _agent_setup(
+        lambda agent, _: agent.calculate_knowledge_contribution()),
+    'calculate_citizenship_score': _agent_setup(
+        lambda agent, max_knowledge: agent.calculate_citizenship_score(max_knowledge)),
+}
+if HAVE_NUMPY:
+    # Each batch benchmark is paired with the same batches routed by a
+    # route_decision loop, which it has to beat (see SPEEDUPS)
+    BENCHMARKS.update({
+        'route_decisions': _batch_setup(shallow=False, scalar=False),
+        'route_decisions_scalar': _batch_setup(shallow=False, scalar=True),
+        'route_decisions_shallow': _batch_setup(shallow=True, scalar=False),
+        'route_decisions_shallow_scalar': _batch_setup(shallow=True, scalar=True),
+        'route_decisions_sharded': setup_route_decisions_sharded,
+        'route_decisions_large': setup_route_decisions_large,
+    })
+
+# Vectorized operations and the scalar benchmark they must outrun
+SPEEDUPS = {
+    'route_decisions': 'route_decisions_scalar',
+    'route_decisions_shallow': 'route_decisions_shallow_scalar',
+}
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), int(fraction * len(sorted_values) + 0.999999)))
+    return sorted_values[rank - 1]
+
+
+def measure(setup: Setup, config: dict) -> Dict[str, float]:
+    """Time every call of one benchmark, then trace its peak memory on fresh state"""
+    operation, calls, units = setup(config)
+    gc.collect()
+    latencies = []
+    clock = time.perf_counter
+    started = clock()
+    for args in calls:
+        before = clock()
+        operation(*args)
+        latencies.append(clock() - before)
+    elapsed = clock() - started
+    latencies.sort()
+
+    # Tracing slows allocation down, so memory is measured in a second pass
+    operation, calls, units = setup(config)
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    for args in calls:
+        operation(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'calls': len(calls),
+        'seconds': elapsed,
+        'throughput': len(calls) * units / elapsed if elapsed > 0 else 0.0,
+        'p50_us': percentile(latencies, 0.50) * 1e6,
+        'p95_us': percentile(latencies, 0.95) * 1e6,
+        'p99_us': percentile(latencies, 0.99) * 1e6,
+        'peak_bytes': peak - baseline,
+    }
+
+
+def run(config: dict, names: Optional[Sequence[str]] = None) -> dict:
+    """Run the selected benchmarks and return the JSON-ready results"""
+    selected = names or list(BENCHMARKS)
+    return {
+        'config': config,
+        'python': platform.python_version(),
+        'results': {name: measure(BENCHMARKS[name], config) for name in selected},
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.2) -> List[str]:
+    """Describe every operation that regressed beyond ``tolerance`` against the baseline"""
+    regressions = []
+    for name, current in results['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            continue
+        if current['throughput'] < previous['throughput'] * (1.0 - tolerance):
+            regressions.append(f"{name}: throughput {current['throughput']:.0f}/s "
+                               f"vs {previous['throughput']:.0f}/s in the baseline")
+        if current['p99_us'] > previous['p99_us'] * (1.0 + tolerance):
+            regressions.append(f"{name}: p99 latency {current['p99_us']:.1f}us "
+                               f"vs {previous['p99_us']:.1f}us in the baseline")
+        if current['peak_bytes'] > max(previous['peak_bytes'], 1) * (1.0 + tolerance):
+            regressions.append(f"{name}: peak memory {current['peak_bytes']} bytes "
+                               f"vs {previous['peak_bytes']} bytes in the baseline")
+    return regressions
+
+
+def compare_speedups(results: dict) -> List[str]:
+    """Describe every vectorized operation no faster than its scalar equivalent (see SPEEDUPS)"""
+    regressions = []
+    measured = results['results']
+    for name, scalar in SPEEDUPS.items():
+        if name in measured and scalar in measured:
+            fast, slow = measured[name]['throughput'], measured[scalar]['throughput']
+            if fast <= slow:
+                regressions.append(f"{name}: throughput {fast:.0f}/s is no better than "
+                                   f"{slow:.0f}/s for {scalar}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark routing and scoring on synthetic hierarchies")
+    parser.add_argument("--agents", type=int, default=10000, help="number of agents in the hierarchy")
+    parser.add_argument("--fan-out", type=int, default=8, help="maximum subordinates per agent")
+    parser.add_argument("--depth", type=int, default=None, help="maximum hierarchy depth")
+    parser.add_argument("--decisions", type=int, default=50000, help="decisions in the stream")
+    parser.add_argument("--complexity", choices=COMPLEXITY_DISTRIBUTIONS, default="uniform",
+                        help="complexity distribution of the decision stream")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the generated workload")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE,
+                        help="compare against the results in this JSON file (empty to skip)")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative slowdown before flagging a regression")
+    args = parser.parse_args(argv)
+
+    config = {'agents': args.agents, 'fan_out': args.fan_out, 'depth': args.depth,
+              'decisions': args.decisions, 'complexity': args.complexity, 'seed': args.seed}
+    results = run(config, args.only)
+
+    print(f"{'operation':<34} {'ops/s':>12} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9} {'peak KiB':>10}")
+    for name, result in results['results'].items():
+        print(f"{name:<34} {result['throughput']:>12.0f} {result['p50_us']:>9.2f} "
+              f"{result['p95_us']:>9.2f} {result['p99_us']:>9.2f} {result['peak_bytes'] / 1024:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(results, handle, indent=2)
+
+    regressions = compare_speedups(results)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        if baseline.get('config') != config:
+            print("warning: baseline was recorded with a different configuration, not comparing",
+                  file=sys.stderr)
+        else:
+            regressions += compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
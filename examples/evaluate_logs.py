@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Score agents from decision-log files without loading them into memory.
+
+Usage (from the repository root):
+
+    python -m examples.evaluate_logs logs-2024-*.jsonl --agents agents.jsonl --output scores.json
+"""
+
+import argparse
+import json
+import sys
+
+from src.streaming_metrics import evaluate_files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream decision logs through the Petersonian score formulas")
+    parser.add_argument("logs", nargs="+", help="JSONL or CSV decision-log files")
+    parser.add_argument("--agents", help="JSONL or CSV file describing the agents and their supervisors")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="log format (default: by file extension)")
+    parser.add_argument("--output", help="write the scores as JSON to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    scores = evaluate_files(args.logs, agents_path=args.agents, format=args.format)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(scores, handle, indent=2)
+    else:
+        json.dump(scores, sys.stdout, indent=2)
+        print()
+
+    system = scores["system"]
+    print(f"Scored {system['decisions']} decisions across {system['agents']} agents", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,125 +1,63 @@
-import random
-from peterson_ai_agent import PetersonAgent, AgentCapability, EthicalRule
-from typing import List
+#!/usr/bin/env python3
+"""
+Petersonian AI agent hierarchy simulation.
 
-class AgentHierarchySimulation:
-    def __init__(self):
-        self.agents: List[PetersonAgent] = []
-        self.initialize_hierarchy()
-    
-    def initialize_hierarchy(self):
-        """Initialize a hierarchy of agents with different capability levels"""
-        # Create top-level agent (high capability)
-        ceo = PetersonAgent("CEO", AgentCapability.HIGH)
-        self.agents.append(ceo)
-        
-        # Create middle management (medium capability) reporting to CEO
-        manager1 = PetersonAgent("Manager-1", AgentCapability.MEDIUM, supervisor=ceo)
-        manager2 = PetersonAgent("Manager-2", AgentCapability.MEDIUM, supervisor=ceo)
-        self.agents.extend([manager1, manager2])
-        
-        # Create junior agents (low capability) reporting to managers
-        junior1 = PetersonAgent("Junior-1", AgentCapability.LOW, supervisor=manager1)
-        junior2 = PetersonAgent("Junior-2", AgentCapability.LOW, supervisor=manager1)
-        junior3 = PetersonAgent("Junior-3", AgentCapability.LOW, supervisor=manager2)
-        junior4 = PetersonAgent("Junior-4", AgentCapability.LOW, supervisor=manager2)
-        self.agents.extend([junior1, junior2, junior3, junior4])
-        
-        print("Agent hierarchy initialized:")
-        print(f"  {ceo}")
-        print(f"    {manager1}")
-        print(f"      {junior1}")
-        print(f"      {junior2}")
-        print(f"    {manager2}")
-        print(f"      {junior3}")
-        print(f"      {junior4}")
-        print()
-    
-    def run_simulation(self, rounds: int = 5):
-        """Run the simulation for a specified number of rounds"""
-        print(f"Running simulation for {rounds} rounds...\n")
-        
-        # Sample decisions of varying complexity
-        decisions = [
-            "Process routine customer inquiry",
-            "Handle standard refund request",
-            "Update product documentation",
-            "Evaluate new marketing strategy",
-            "Respond to critical system failure",
-            "Make strategic partnership decision",
-            "Address ethical dilemma with supplier",
-            "Handle high-stakes financial investment"
-        ]
-        
-        for round_num in range(rounds):
-            print(f"--- Round {round_num + 1} ---")
-            
-            # Select a random agent to make a decision
-            agent = random.choice(self.agents)
-            
-            # Select a random decision
-            decision = random.choice(decisions)
-            
-            # Create context for the decision
-            context = {
-                "round": round_num + 1,
-                "agent": agent.name,
-                "timestamp": f"Round {round_num + 1}"
-            }
-            
-            # Agent makes decision
-            print(f"{agent.name} making decision: '{decision}'")
-            decision_log = agent.make_decision(decision, context)
-            print(f"Result: {decision_log.outcome.value}")
-            print()
-            
-            # Occasionally have agents reflect on performance
-            if random.random() < 0.3:  # 30% chance
-                agent.reflect_on_performance()
-            
-            # Occasionally have agents propose rule changes
-            if random.random() < 0.1:  # 10% chance
-                agent.propose_rule_change(
-                    # In a real implementation, this would be more sophisticated
-                    EthicalRule(
-                        rule_id=f"rule_{random.randint(1000, 9999)}",
-                        description=f"New rule about {random.choice(['transparency', 'accountability', 'fairness', 'sustainability'])}",
-                        priority=random.randint(1, 5)
-                    )
-                )
-            
-            print()
-        
-        self.print_summary()
-    
-    def print_summary(self):
-        """Print a summary of the simulation"""
-        print("=== SIMULATION SUMMARY ===")
-        print("Final agent capabilities and performance:")
-        for agent in self.agents:
-            print(f"  {agent}")
-        
-        print("\nSample decision logs:")
-        # Show last few decision logs from different agents
-        logs_shown = 0
-        for agent in self.agents:
-            if agent.decision_logs and logs_shown < 10:
-                print(f"  From {agent.name}:")
-                for log in agent.decision_logs[-2:]:  # Last 2 decisions
-                    print(f"    {log}")
-                logs_shown += len(agent.decision_logs[-2:])
+Runs the seeded simulation engine and prints one line per metric sample:
 
-def main():
+    python -m examples.simulation --agents 10000 --rounds 100 --decisions 20000
+"""
+
+import argparse
+import time
+
+from src.retention import LastN
+from src.simulation import HIERARCHY_SHAPES, SimulationConfig, SimulationEngine
+from src.synthetic import COMPLEXITY_DISTRIBUTIONS
+
+
+def main(argv=None):
     """Main function to run the simulation"""
+    parser = argparse.ArgumentParser(description="Simulate decision routing in an agent hierarchy")
+    parser.add_argument("--agents", type=int, default=1000, help="number of agents in the hierarchy")
+    parser.add_argument("--shape", choices=HIERARCHY_SHAPES, default="random", help="hierarchy shape")
+    parser.add_argument("--fan-out", type=int, default=4, help="subordinates per agent")
+    parser.add_argument("--rounds", type=int, default=50, help="rounds to simulate")
+    parser.add_argument("--decisions", type=int, default=10000, help="decisions per round")
+    parser.add_argument("--complexity", choices=COMPLEXITY_DISTRIBUTIONS, default="uniform",
+                        help="complexity distribution of the decisions")
+    parser.add_argument("--sample-every", type=int, default=10, help="rounds between metric samples")
+    parser.add_argument("--load-aware", action="store_true", help="spread decisions over capable peers")
+    parser.add_argument("--adapt-every", type=int, default=None,
+                        help="rounds between capability updates from performance")
+    parser.add_argument("--keep", type=int, default=1000, help="log entries kept per agent (0 keeps all)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the simulation")
+    args = parser.parse_args(argv)
+
+    config = SimulationConfig(
+        agents=args.agents, shape=args.shape, fan_out=args.fan_out, rounds=args.rounds,
+        decisions_per_round=args.decisions, complexity=args.complexity, sample_every=args.sample_every,
+        load_aware=args.load_aware, adapt_every=args.adapt_every,
+        retention=LastN(args.keep) if args.keep else None, seed=args.seed
+    )
+
     print("Petersonian AI Agent Hierarchy Simulation")
     print("=========================================")
-    print()
-    
-    # Create and run simulation
-    simulation = AgentHierarchySimulation()
-    simulation.run_simulation(rounds=10)
-    
-    print("\nSimulation complete.")
+    started = time.perf_counter()
+    engine = SimulationEngine(config)
+    print(f"{'round':>6} {'routed':>10} {'escalated':>10} {'best att.':>10} {'positive':>9} "
+          f"{'mean perf':>10} {'instab.':>8} {'stability':>10} {'dec/s':>10}")
+    for _ in range(config.rounds):
+        engine.step()
+        if engine.samples and engine.samples[-1]['round'] == engine.round:
+            sample = engine.samples[-1]
+            print(f"{sample['round']:>6} {sample['routed']:>10} {sample['round_escalation_rate']:>10.1%} "
+                  f"{sample['round_best_attempt_rate']:>10.1%} {sample['round_positive_rate']:>9.1%} "
+                  f"{sample['mean_performance']:>10.3f} {sample['instability']:>8.3f} "
+                  f"{sample['stability']:>10.3f} {sample['decisions_per_second']:>10.0f}")
+    elapsed = time.perf_counter() - started
+    print(f"\nRouted {engine.routed} decisions in {elapsed:.1f}s "
+          f"({engine.routed / elapsed * 60 / 1e6:.2f} million per minute).")
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
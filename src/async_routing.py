@@ -0,0 +1,124 @@
+"""
+Asyncio front end for routing bursty decision traffic.
+
+``DecisionIngestionQueue`` accepts decisions from coroutines through a
+bounded queue: when routing falls behind, ``submit`` waits for room instead
+of letting the backlog grow without limit.  Worker tasks drain the queue in
+batches and route each batch on the default executor, so the event loop is
+never blocked by routing and agents are locked per stripe rather than
+globally (see ``concurrency``).
+"""
+
+import asyncio
+from typing import List, Optional, Tuple
+
+try:
+    import numpy  # noqa: F401  (batch routing needs it)
+    _HAVE_NUMPY = True
+except ImportError:
+    _HAVE_NUMPY = False
+
+DEFAULT_MAXSIZE = 1024
+DEFAULT_BATCH_SIZE = 256
+
+
+class DecisionIngestionQueue:
+    """Bounded queue that routes submitted decisions in batches
+
+    Use as an async context manager (or call ``start``/``stop``)::
+
+        async with DecisionIngestionQueue(system) as queue:
+            agent_id, log_entry = await queue.submit(decision, "C")
+    """
+
+    def __init__(self, system: 'PetersonianAISystem', maxsize: int = DEFAULT_MAXSIZE,
+                 batch_size: int = DEFAULT_BATCH_SIZE, workers: int = 1):
+        self.system = system
+        self.maxsize = max(1, maxsize)
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def pending(self) -> int:
+        """Number of decisions waiting to be routed"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        """Start the worker tasks on the running loop"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Route everything already submitted, then stop the workers"""
+        if not self._tasks:
+            return
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def __aenter__(self) -> 'DecisionIngestionQueue':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def enqueue(self, decision: 'Decision', initial_agent_id: str) -> asyncio.Future:
+        """Queue a decision, waiting while the queue is full
+
+        Returns a future that resolves to ``(agent_id, log_entry)`` once the
+        decision has been routed.
+        """
+        if not self._tasks:
+            raise RuntimeError("DecisionIngestionQueue is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((decision, initial_agent_id, future))
+        return future
+
+    async def submit(self, decision: 'Decision', initial_agent_id: str) -> Tuple[str, 'DecisionLogEntry']:
+        """Queue a decision and wait until it has been routed"""
+        return await (await self.enqueue(decision, initial_agent_id))
+
+    async def _worker(self):
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                results = await loop.run_in_executor(None, self._route_batch, batch)
+                for (_, _, future), result in zip(batch, results):
+                    if future.done():
+                        continue
+                    if isinstance(result, BaseException):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _route_batch(self, batch) -> list:
+        """Route a batch in one pass, isolating failures to their own decision"""
+        if _HAVE_NUMPY and len(batch) > 1:
+            try:
+                return self.system.route_decisions([item[0] for item in batch],
+                                                   [item[1] for item in batch])
+            except Exception:
+                # Fall back to routing one at a time so one bad request
+                # (e.g. an unknown agent id) only fails its own future
+                pass
+        results = []
+        for decision, initial_agent_id, _ in batch:
+            try:
+                results.append(self.system.route_decision(decision, initial_agent_id))
+            except Exception as error:
+                results.append(error)
+        return results
@@ -0,0 +1,99 @@
+"""
+Synchronization primitives for routing from several threads.
+
+Agents are guarded by a fixed set of striped re-entrant locks rather than
+one lock per agent (or one lock for everything): an agent id hashes to one
+of the stripes, so unrelated agents rarely contend and memory does not grow
+with the number of agents.  Timestamps come from a lock-free atomic clock.
+"""
+
+import threading
+from contextlib import contextmanager
+from itertools import count, islice
+from typing import Iterable, Iterator, List
+
+DEFAULT_STRIPES = 64
+
+
+class StripedLocks:
+    """A fixed pool of re-entrant locks selected by key hash"""
+
+    def __init__(self, stripes: int = DEFAULT_STRIPES):
+        self._locks = [threading.RLock() for _ in range(max(1, stripes))]
+
+    def lock_for(self, key) -> threading.RLock:
+        """The lock guarding ``key``"""
+        return self._locks[hash(key) % len(self._locks)]
+
+    @contextmanager
+    def locked(self, keys: Iterable) -> Iterator[None]:
+        """Hold the locks of several keys at once
+
+        Stripes are always acquired in index order, so holders of several
+        stripes cannot deadlock each other.
+        """
+        count = len(self._locks)
+        stripes = sorted({hash(key) % count for key in keys})
+        acquired = []
+        try:
+            for stripe in stripes:
+                self._locks[stripe].acquire()
+                acquired.append(self._locks[stripe])
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+
+def _peek(counter: count) -> int:
+    """The value the next ``next(counter)`` returns, without taking it"""
+    # A count's repr is 'count(n)'; unlike __reduce__ it is not deprecated
+    return int(repr(counter)[len('count('):-1])
+
+
+class AtomicClock:
+    """Decision timestamp sequence that advances by 1.0 per decision
+
+    Timestamps are ``start + n`` for ``n`` drawn from an itertools.count,
+    whose ``next`` is atomic under the GIL, so taking one costs no lock.
+    Setting ``value`` restarts the sequence; do not set it while decisions
+    are being routed.
+    """
+
+    def __init__(self, value: float = 0.0):
+        self.value = value
+
+    def __getstate__(self):
+        return {'value': self.value}
+
+    def __setstate__(self, state):
+        self.value = state['value']
+
+    @property
+    def value(self) -> float:
+        """The timestamp the next take returns"""
+        start, counter = self._sequence
+        return start + _peek(counter)
+
+    @value.setter
+    def value(self, value: float):
+        # One tuple, so a concurrent take sees the old or the new sequence
+        self._sequence = (float(value), count())
+
+    def take(self) -> float:
+        """Take the next timestamp"""
+        start, counter = self._sequence
+        return start + next(counter)
+
+    def take_many(self, number: int) -> List[float]:
+        """Take ``number`` timestamps, in increasing order
+
+        They are consecutive unless other threads take timestamps at the
+        same time.
+        """
+        start, counter = self._sequence
+        return [start + n for n in islice(counter, number)]
+
+
+# Locks guarding every agent's log and counters, shared by all systems
+AGENT_LOCKS = StripedLocks()
@@ -0,0 +1,259 @@
+"""
+Precomputed ancestry index for the Petersonian hierarchy.
+
+The index assigns every agent a dense position and stores binary-lifting
+jump pointers over the supervisor chain.  Alongside each jump it keeps the
+running maximum capability of the agents the jump passes over, so the first
+ancestor able to handle a decision is found in O(log depth) instead of
+walking the chain one supervisor at a time.
+
+A preorder (Euler tour) numbering of the supervision forest labels every
+agent's subtree with an interval, which answers ancestry questions and
+hierarchical distances in O(1).
+"""
+
+import copy
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+
+NEGATIVE_INFINITY = float("-inf")
+
+
+class Topology:
+    """Structure of the supervision forest: dense positions, routing parents,
+    and a preorder (which is also a topological order, supervisors first)
+    with subtree sizes, depths and chain roots.
+
+    Building it detects supervision cycles, so a hierarchy that has one
+    fails here instead of looping forever when routed through.
+    """
+
+    def __init__(self, ids: List[str], positions: Dict[str, int], parent: List[int],
+                 dangling: Dict[int, str]):
+        self.ids = ids
+        self.positions = positions
+        self.parent = parent
+        self.dangling = dangling  # position -> supervisor id that is not registered
+        self._build_tour(parent)
+
+    @classmethod
+    def from_hierarchy(cls, hierarchy: 'Hierarchy') -> 'Topology':
+        ids = list(hierarchy.agents)
+        positions = {agent_id: i for i, agent_id in enumerate(ids)}
+
+        # Routing parent: supervisors that are not registered agents end the
+        # chain, exactly as Hierarchy.get_supervisor returns None for them.
+        # Such dangling supervisor ids are remembered for get_distance.
+        parent = [-1] * len(ids)
+        dangling: Dict[int, str] = {}
+        for agent_id, supervisor_id in hierarchy.edges.items():
+            position = positions.get(agent_id)
+            if position is not None:
+                parent[position] = positions.get(supervisor_id, -1)
+                if parent[position] < 0:
+                    dangling[position] = supervisor_id
+        return cls(ids, positions, parent, dangling)
+
+    def _build_tour(self, parent: List[int]):
+        """Preorder numbering, subtree sizes, depths and chain roots"""
+        count = len(parent)
+        children: List[List[int]] = [[] for _ in range(count)]
+        roots = []
+        for node, supervisor in enumerate(parent):
+            if supervisor >= 0:
+                children[supervisor].append(node)
+            else:
+                roots.append(node)
+
+        order: List[int] = []
+        depth = [0] * count
+        root = list(range(count))
+        stack = roots[::-1]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            supervisor = parent[node]
+            if supervisor >= 0:
+                depth[node] = depth[supervisor] + 1
+                root[node] = root[supervisor]
+            stack.extend(reversed(children[node]))
+
+        if len(order) < count:
+            # Agents not reachable from any root sit on or below a cycle
+            reached = set(order)
+            node = next(i for i in range(count) if i not in reached)
+            seen = set()
+            while node not in seen:
+                seen.add(node)
+                node = parent[node]
+            raise ValueError(f"Hierarchy contains a supervision cycle through agent {self.ids[node]!r}")
+
+        tin = [0] * count
+        for number, node in enumerate(order):
+            tin[node] = number
+        size = [1] * count
+        for node in reversed(order):
+            if parent[node] >= 0:
+                size[parent[node]] += size[node]
+
+        self.order = order
+        self.tin = tin
+        self.size = size
+        self.depth = depth
+        self.root = root
+
+
+class HierarchyIndex:
+    """Jump-pointer index over a Hierarchy's routing chains.
+
+    The structural part (positions, parents, depths, jump pointers) depends
+    only on ``Hierarchy.edges``; the capability part (the running maxima)
+    depends on ``Agent.capability`` and can be refreshed on its own via
+    ``refresh_capabilities``.
+    """
+
+    def __init__(self, hierarchy: 'Hierarchy', topology: Optional[Topology] = None):
+        if topology is None:
+            topology = Topology.from_hierarchy(hierarchy)
+        self.ids: List[str] = topology.ids
+        self.positions: Dict[str, int] = topology.positions
+        self.parent = parent = topology.parent
+        self.dangling: Dict[int, str] = topology.dangling
+        self.order = topology.order  # positions in preorder; a subtree is a contiguous slice
+        self.tin = topology.tin
+        self.size = topology.size
+        self.depth = topology.depth
+        self.root = topology.root
+
+        self.up: List[List[int]] = [parent]
+        max_depth = max(self.depth, default=0)
+        for _ in range(1, max(1, max_depth.bit_length())):
+            previous = self.up[-1]
+            self.up.append([previous[mid] if mid >= 0 else -1 for mid in previous])
+
+        self.capabilities: List[float] = []
+        self.reach: List[List[float]] = []
+        # Array form of the tables, filled on demand by src.batch_routing
+        self.array_cache = None
+        self.refresh_capabilities(hierarchy)
+
+    def is_ancestor(self, ancestor: int, position: int) -> bool:
+        """Whether ``ancestor`` is a proper ancestor of ``position``"""
+        start = self.tin[ancestor]
+        return start < self.tin[position] < start + self.size[ancestor]
+
+    def distance(self, subordinate_id: str, supervisor_id: Optional[str]) -> int:
+        """Hierarchical distance with the semantics of Hierarchy.get_distance.
+
+        This is the number of supervision edges from the subordinate up to
+        the supervisor, or the length of the subordinate's whole chain
+        (counting a final edge to an unregistered supervisor) when the
+        supervisor is not above it.
+        """
+        position = self.positions.get(subordinate_id)
+        if position is None:
+            return 0
+        target = self.positions.get(supervisor_id)
+        if target is not None and self.is_ancestor(target, position):
+            return self.depth[position] - self.depth[target]
+        # Walking past the top of the chain follows one more, dangling edge
+        return self.depth[position] + (1 if self.root[position] in self.dangling else 0)
+
+    def refresh_capabilities(self, hierarchy: 'Hierarchy'):
+        """Rebuild the running-max capability tables from the agents"""
+        agents = hierarchy.agents
+        capabilities = [agents[agent_id].capability for agent_id in self.ids]
+        reach = [[capabilities[p] if p >= 0 else NEGATIVE_INFINITY for p in self.parent]]
+        for k in range(1, len(self.up)):
+            previous = reach[-1]
+            jumps = self.up[k - 1]
+            reach.append([
+                max(previous[i], previous[mid]) if mid >= 0 else previous[i]
+                for i, mid in enumerate(jumps)
+            ])
+        self.capabilities = capabilities
+        self.reach = reach
+        self.array_cache = None
+
+    def with_capabilities(self, hierarchy: 'Hierarchy') -> 'HierarchyIndex':
+        """Copy of this index sharing its structure, with fresh capability tables
+
+        Routing threads still holding the old index keep a consistent view.
+        """
+        refreshed = copy.copy(self)
+        refreshed.refresh_capabilities(hierarchy)
+        return refreshed
+
+    def resolve(self, position: int, complexity: float) -> Tuple[int, int, bool]:
+        """Find the handler for a decision entering at ``position``.
+
+        Returns ``(handler, referrer, capable)``: the handler position, the
+        position directly below it on the escalation path (-1 when the
+        entry agent handles the decision itself) and whether the handler is
+        actually capable.  When no agent on the chain is capable, the top of
+        the chain is returned with ``capable`` False (best attempt).
+        """
+        if self.capabilities[position] >= complexity:
+            return position, -1, True
+
+        node = position
+        up = self.up
+        reach = self.reach
+        for k in range(len(up) - 1, -1, -1):
+            jump = up[k][node]
+            if jump >= 0 and not reach[k][node] >= complexity:
+                node = jump
+
+        parent = self.parent[node]
+        if parent >= 0:
+            return parent, node, True
+        return node, -1, False
+
+    def ancestor(self, position: int, levels: int) -> int:
+        """Position ``levels`` supervisors above ``position`` (-1 past the top of its chain)"""
+        if levels > self.depth[position]:
+            return -1
+        up = self.up
+        k = 0
+        while levels:
+            if levels & 1:
+                position = up[k][position]
+            levels >>= 1
+            k += 1
+        return position
+
+    def referral_counts(self, routes: Dict[Tuple[str, int], int]) -> Dict[str, int]:
+        """Decisions each agent referred on, from counts of ``(entry_id, hops)`` routes
+
+        A decision taking ``hops`` hops from its entry agent was handed on
+        by the entry agent and the supervisors above it that it passed
+        through: the first ``hops`` agents of the entry agent's chain.  Each
+        route adds its count at the entry agent and takes it off again at
+        the agent ``hops`` levels up, so an agent's total is the sum over
+        its subtree, one preorder interval.  Costs O(agents + routes).
+        Entry agents that are no longer in the hierarchy are credited for
+        their own routes only.
+        """
+        counts: Dict[str, int] = {}
+        delta = [0] * (len(self.ids) + 1)  # indexed by preorder number
+        tin = self.tin
+        for (entry_id, hops), count in routes.items():
+            if not hops:
+                continue
+            position = self.positions.get(entry_id)
+            if position is None:
+                counts[entry_id] = counts.get(entry_id, 0) + count
+                continue
+            delta[tin[position]] += count
+            stop = self.ancestor(position, hops)
+            if stop >= 0:
+                delta[tin[stop]] -= count
+        prefix = [0]
+        prefix.extend(accumulate(delta))
+        size = self.size
+        for position, agent_id in enumerate(self.ids):
+            start = tin[position]
+            count = prefix[start + size[position]] - prefix[start]
+            if count:
+                counts[agent_id] = counts.get(agent_id, 0) + count
+        return counts
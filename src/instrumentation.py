@@ -0,0 +1,239 @@
+"""
+Opt-in routing instrumentation.
+
+A RoutingInstrumentation attached to a PetersonianAISystem records, for
+every routed decision, how many hops it took to its handler, how long
+route_decision took, which agents referred decisions on and which
+received them, and how often nobody on the chain was capable (a best
+attempt).  When no instrumentation is attached the routing paths only pay
+for one attribute check.
+
+``snapshot`` returns plain dicts for programmatic use and
+``export_prometheus`` renders the same data in the Prometheus text format
+for a metrics scraper.
+"""
+
+import threading
+from bisect import bisect_left
+from contextlib import ExitStack
+from itertools import count
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Latency bucket upper bounds in seconds: 1us doubling up to about 1s
+LATENCY_BUCKETS = tuple(1e-6 * 2 ** k for k in range(21))
+
+# Counter shards; routing threads are spread over them round-robin, so a
+# thread only contends with the others that share its shard
+DEFAULT_SHARDS = 16
+
+
+class _Shard:
+    """One stripe of the routing counters, guarded by its own lock"""
+
+    __slots__ = ('lock', 'decisions', 'best_attempts', 'hop_counts', 'latency_counts', 'latency_sum',
+                 'latency_count', 'referrals_in', 'referrals_out', 'routes')
+
+    def __init__(self, latency_buckets: int):
+        self.lock = threading.Lock()
+        self.clear(latency_buckets)
+
+    def clear(self, latency_buckets: int):
+        self.decisions = 0
+        self.best_attempts = 0
+        self.hop_counts: List[int] = []  # hop_counts[h] = decisions handled h hops away
+        self.latency_counts = [0] * (latency_buckets + 1)  # last bucket is +Inf
+        self.latency_sum = 0.0
+        self.latency_count = 0
+        self.referrals_in: Dict[str, int] = {}
+        self.referrals_out: Dict[str, int] = {}  # credited by callers passing referrers
+        self.routes: Dict[Tuple[str, int], int] = {}  # (entry_id, hops) -> escalated decisions
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__ if name != 'lock'}
+
+    def __setstate__(self, state):
+        self.lock = threading.Lock()
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+class RoutingInstrumentation:
+    """Counters and histograms for decision routing
+
+    Counters are kept in ``shards`` independently locked stripes, each
+    routing thread recording into one of them, and merged by ``snapshot``.
+
+    Routing only records each escalated decision's entry agent and hop
+    count.  The agents that referred it on are credited when a snapshot is
+    taken, along the chains of ``hierarchy`` as it is then; without a
+    hierarchy only the entry agents are.
+    """
+
+    def __init__(self, latency_buckets=LATENCY_BUCKETS, prefix: str = 'petersonian',
+                 shards: int = DEFAULT_SHARDS, hierarchy: Optional['Hierarchy'] = None):
+        self.latency_buckets = tuple(latency_buckets)
+        self.prefix = prefix
+        self.hierarchy = hierarchy
+        self._shards = [_Shard(len(self.latency_buckets)) for _ in range(max(1, shards))]
+        self._assign_threads()
+
+    def _assign_threads(self):
+        self._local = threading.local()
+        self._next_shard = count()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_local'], state['_next_shard']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._assign_threads()
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            # next() on a count is atomic, so concurrent first calls get distinct shards
+            shard = self._local.shard = self._shards[next(self._next_shard) % len(self._shards)]
+            return shard
+
+    def _locked(self) -> ExitStack:
+        """Hold every shard's lock, for a consistent view across shards"""
+        stack = ExitStack()
+        for shard in self._shards:
+            stack.enter_context(shard.lock)
+        return stack
+
+    def reset(self):
+        """Zero every counter and histogram"""
+        with self._locked():
+            for shard in self._shards:
+                shard.clear(len(self.latency_buckets))
+
+    def record_route(self, entry_id: str, handler_id: str, hops: int, capable: bool,
+                     seconds: Optional[float] = None, referrers: Optional[Sequence[str]] = None):
+        """Record one routed decision (``seconds`` is omitted for batch routing)
+
+        ``referrers`` are the agents that handed the decision on, entry
+        agent first; each is credited with a referral out straight away.
+        Without it the referrers are worked out when a snapshot is taken.
+        """
+        shard = self._shard()
+        with shard.lock:
+            shard.decisions += 1
+            hop_counts = shard.hop_counts
+            if hops >= len(hop_counts):
+                hop_counts.extend([0] * (hops + 1 - len(hop_counts)))
+            hop_counts[hops] += 1
+            if hops:
+                if referrers is None:
+                    routes = shard.routes
+                    route = (entry_id, hops)
+                    routes[route] = routes.get(route, 0) + 1
+                else:
+                    referrals_out = shard.referrals_out
+                    for referrer_id in referrers:
+                        referrals_out[referrer_id] = referrals_out.get(referrer_id, 0) + 1
+                shard.referrals_in[handler_id] = shard.referrals_in.get(handler_id, 0) + 1
+            if not capable:
+                shard.best_attempts += 1
+            if seconds is not None:
+                shard.latency_counts[bisect_left(self.latency_buckets, seconds)] += 1
+                shard.latency_sum += seconds
+                shard.latency_count += 1
+
+    def snapshot(self) -> dict:
+        """Consistent copy of all counters, merged over the shards
+
+        Crediting referrers costs O(agents + distinct routes), so take
+        snapshots at scrape intervals rather than per decision.
+        """
+        hop_counts: List[int] = []
+        latency_counts = [0] * (len(self.latency_buckets) + 1)
+        referrals_in: Dict[str, int] = {}
+        referrals_out: Dict[str, int] = {}
+        routes: Dict[Tuple[str, int], int] = {}
+        decisions = best_attempts = latency_count = 0
+        latency_sum = 0.0
+        with self._locked():
+            for shard in self._shards:
+                decisions += shard.decisions
+                best_attempts += shard.best_attempts
+                if len(shard.hop_counts) > len(hop_counts):
+                    hop_counts.extend([0] * (len(shard.hop_counts) - len(hop_counts)))
+                for hops, hop_count in enumerate(shard.hop_counts):
+                    hop_counts[hops] += hop_count
+                for bucket, bucket_count in enumerate(shard.latency_counts):
+                    latency_counts[bucket] += bucket_count
+                latency_sum += shard.latency_sum
+                latency_count += shard.latency_count
+                for merged, counts in ((referrals_in, shard.referrals_in), (referrals_out, shard.referrals_out),
+                                       (routes, shard.routes)):
+                    for key, key_count in counts.items():
+                        merged[key] = merged.get(key, 0) + key_count
+        if self.hierarchy is not None:
+            credited = self.hierarchy.get_index(with_capabilities=False).referral_counts(routes)
+        else:
+            credited = {}
+            for (entry_id, _), route_count in routes.items():
+                credited[entry_id] = credited.get(entry_id, 0) + route_count
+        for agent_id, agent_count in credited.items():
+            referrals_out[agent_id] = referrals_out.get(agent_id, 0) + agent_count
+        return {
+            'decisions': decisions,
+            'best_attempts': best_attempts,
+            'hops': {hops: hop_count for hops, hop_count in enumerate(hop_counts) if hop_count},
+            'latency': {
+                'buckets': list(zip(self.latency_buckets + (float('inf'),), latency_counts)),
+                'sum': latency_sum,
+                'count': latency_count,
+            },
+            'referrals_in': referrals_in,
+            'referrals_out': referrals_out,
+        }
+
+    def hotspots(self, limit: int = 10) -> List[tuple]:
+        """Agents receiving the most escalated decisions, busiest first"""
+        ranked = sorted(self.snapshot()['referrals_in'].items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+    def export_prometheus(self) -> str:
+        """Render a snapshot in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        name = self.prefix
+        lines = [
+            f"# TYPE {name}_decisions_routed_total counter",
+            f"{name}_decisions_routed_total {snapshot['decisions']}",
+            f"# TYPE {name}_best_attempts_total counter",
+            f"{name}_best_attempts_total {snapshot['best_attempts']}",
+            f"# TYPE {name}_escalation_hops histogram",
+        ]
+        cumulative = 0
+        total_hops = 0
+        for hops, count in sorted(snapshot['hops'].items()):
+            cumulative += count
+            total_hops += hops * count
+            lines.append(f'{name}_escalation_hops_bucket{{le="{hops}"}} {cumulative}')
+        lines += [
+            f'{name}_escalation_hops_bucket{{le="+Inf"}} {cumulative}',
+            f"{name}_escalation_hops_sum {total_hops}",
+            f"{name}_escalation_hops_count {cumulative}",
+            f"# TYPE {name}_route_latency_seconds histogram",
+        ]
+        cumulative = 0
+        for bound, count in snapshot['latency']['buckets']:
+            cumulative += count
+            label = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{name}_route_latency_seconds_bucket{{le="{label}"}} {cumulative}')
+        lines += [
+            f"{name}_route_latency_seconds_sum {snapshot['latency']['sum']!r}",
+            f"{name}_route_latency_seconds_count {snapshot['latency']['count']}",
+        ]
+        for metric, counts in (('referrals_in', snapshot['referrals_in']),
+                               ('referrals_out', snapshot['referrals_out'])):
+            lines.append(f"# TYPE {name}_{metric}_total counter")
+            for agent_id, count in sorted(counts.items()):
+                label = agent_id.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                lines.append(f'{name}_{metric}_total{{agent="{label}"}} {count}')
+        return '\n'.join(lines) + '\n'
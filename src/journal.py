@@ -0,0 +1,343 @@
+"""
+Persistent, append-only decision journal.
+
+Routed decisions are written as fixed-width binary records into a
+memory-mapped file so that routing history survives restarts.  Appends are
+buffered and committed in groups; past records are read straight out of the
+mapping without copying the file; and ``replay`` rebuilds every agent's log
+and metric counters without routing the decisions again.
+
+File layout (little-endian):
+
+* ``<path>`` -- a 64-byte header (magic, version, record size, committed
+  record count) followed by 56-byte records.
+* ``<path>.strings`` -- the interned string table (agent ids and
+  descriptions), each string stored as a u32 length and UTF-8 bytes.
+* ``<path>.ids`` -- decision ids, each stored as a u32 length and UTF-8
+  bytes.  They are nearly always unique, so they are written inline rather
+  than interned, and only read back when a record is materialized.
+
+A record is either a routed decision or a later outcome update for one.
+A routed record's ``decision_id`` is the byte offset of its id in the ids
+file.  Outcome updates reuse the ``agent`` field for the number of the
+routed record they apply to.
+"""
+
+import mmap
+import os
+import struct
+import threading
+from collections import namedtuple
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from .log_store import encode_outcome, decode_outcome
+
+MAGIC = b'PAIJRNL1'
+VERSION = 2
+HEADER = struct.Struct('<8sIIQ40x')
+RECORD = struct.Struct('<BBb5xqqqqdd')
+STRING_LENGTH = struct.Struct('<I')
+
+# Records copied out of the mapping at a time while iterating
+READ_CHUNK = 4096
+
+ROUTED = 1
+OUTCOME_UPDATE = 2
+
+JournalRecord = namedtuple('JournalRecord', [
+    'kind', 'directly_made', 'outcome', 'agent', 'referrer',
+    'decision_id', 'description', 'timestamp', 'complexity'
+])
+
+
+class DecisionJournal:
+    """Memory-mapped append-only journal of routed decisions
+
+    ``group_size`` records are buffered before they are written to the
+    mapping; call ``commit`` to force pending records out.  With ``sync``
+    the mapping is also flushed to disk on every commit.
+    """
+
+    def __init__(self, path: str, group_size: int = 256, sync: bool = False,
+                 initial_capacity: int = 1024):
+        self.path = path
+        self.group_size = max(1, group_size)
+        self.sync = sync
+        self.strings: List[str] = []
+        self._string_index: Dict[str, int] = {}
+        self._pending = bytearray()
+        self._pending_count = 0
+        self._pending_strings = bytearray()
+        self._pending_ids = bytearray()
+        # Appends may come from several routing threads
+        self._lock = threading.RLock()
+
+        exists = os.path.exists(path) and os.path.getsize(path) >= HEADER.size
+        self._file = open(path, 'r+b' if exists else 'w+b')
+        if exists:
+            magic, version, record_size, count = HEADER.unpack_from(self._file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+                self._file.close()
+                raise ValueError(f"{path} is not a version {VERSION} decision journal")
+            self._count = count
+        else:
+            self._count = 0
+            self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, 0))
+            self._file.flush()
+        capacity = max(self._count, initial_capacity)
+        size = max(os.path.getsize(path), HEADER.size + capacity * RECORD.size)
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+        self._strings_file = open(path + '.strings', 'a+b')
+        self._load_strings()
+        # A crash between writing ids and committing their records leaves
+        # unreferenced bytes at the end, which new ids are simply written after
+        self._ids_file = open(path + '.ids', 'a+b')
+        self._ids_size = self._ids_file.seek(0, os.SEEK_END)
+
+    def _load_strings(self):
+        """Read the string table, dropping a torn entry left by a crash"""
+        self._strings_file.seek(0)
+        data = self._strings_file.read()
+        offset = 0
+        while offset + STRING_LENGTH.size <= len(data):
+            (length,) = STRING_LENGTH.unpack_from(data, offset)
+            end = offset + STRING_LENGTH.size + length
+            if end > len(data):
+                break
+            self._add_string(data[offset + STRING_LENGTH.size:end].decode('utf-8'))
+            offset = end
+        if offset != len(data):
+            self._strings_file.truncate(offset)
+
+    def _add_string(self, value: str) -> int:
+        index = len(self.strings)
+        self.strings.append(value)
+        self._string_index[value] = index
+        return index
+
+    def intern(self, value: str) -> int:
+        """Get the string table index of a value, adding it if necessary"""
+        with self._lock:
+            return self._intern(value)
+
+    def _intern(self, value: str) -> int:
+        index = self._string_index.get(value)
+        if index is None:
+            index = self._add_string(value)
+            encoded = value.encode('utf-8')
+            self._pending_strings += STRING_LENGTH.pack(len(encoded)) + encoded
+        return index
+
+    def _inline(self, value: str) -> int:
+        """Buffer a decision id for the ids file and return its offset; the caller holds the lock"""
+        encoded = value.encode('utf-8')
+        offset = self._ids_size
+        self._pending_ids += STRING_LENGTH.pack(len(encoded)) + encoded
+        self._ids_size += STRING_LENGTH.size + len(encoded)
+        return offset
+
+    def __len__(self) -> int:
+        """Number of records, including those not yet committed"""
+        return self._count + self._pending_count
+
+    def __enter__(self) -> 'DecisionJournal':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Writing
+
+    def _append_record(self, *fields) -> int:
+        """Buffer one record; the caller holds the lock"""
+        number = self._count + self._pending_count
+        self._pending += RECORD.pack(*fields)
+        self._pending_count += 1
+        if self._pending_count >= self.group_size:
+            self._commit()
+        return number
+
+    def append(self, log_entry: 'DecisionLogEntry') -> int:
+        """Journal a routed decision and return its record number"""
+        decision = log_entry.decision
+        with self._lock:
+            number = self._append_record(
+                ROUTED,
+                1 if log_entry.directly_made else 0,
+                encode_outcome(decision.outcome),
+                self._intern(log_entry.agent_id),
+                self._intern(log_entry.supervisor_id) if log_entry.supervisor_id is not None else -1,
+                self._inline(decision.id),
+                self._intern(decision.description),
+                log_entry.timestamp,
+                decision.complexity
+            )
+        # Journal outcomes that are set after routing as update records
+        decision._observe(self, number)
+        return number
+
+    def extend(self, log_entries: Sequence['DecisionLogEntry']) -> List[int]:
+        """Journal several routed decisions in order"""
+        return [self.append(log_entry) for log_entry in log_entries]
+
+    def _on_outcome_change(self, record: int, was_positive: bool, outcome: Optional[bool]):
+        """Decision observer hook: journal an outcome set after routing"""
+        with self._lock:
+            self._append_record(OUTCOME_UPDATE, 0, encode_outcome(outcome), record, -1, -1, -1, 0.0, 0.0)
+
+    def commit(self):
+        """Write all pending records (and new strings and ids) to the journal"""
+        with self._lock:
+            self._commit()
+
+    def _commit(self):
+        if self._pending_strings:
+            self._strings_file.write(self._pending_strings)
+            self._strings_file.flush()
+            self._pending_strings = bytearray()
+        if self._pending_ids:
+            self._ids_file.write(self._pending_ids)
+            self._ids_file.flush()
+            self._pending_ids = bytearray()
+        if not self._pending_count:
+            return
+        end = HEADER.size + (self._count + self._pending_count) * RECORD.size
+        if end > len(self._map):
+            self._grow(end)
+        start = HEADER.size + self._count * RECORD.size
+        self._map[start:end] = self._pending
+        self._count += self._pending_count
+        # The header count is what makes the group visible to readers
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, RECORD.size, self._count)
+        self._pending = bytearray()
+        self._pending_count = 0
+        if self.sync:
+            self._map.flush()
+
+    def _grow(self, needed: int):
+        size = len(self._map)
+        while size < needed:
+            size *= 2
+        self._release_map()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def _release_map(self):
+        try:
+            self._map.close()
+        except BufferError:
+            # A view() is still held.  It keeps the old mapping alive, and
+            # the records it covers valid, until it is released
+            pass
+
+    def close(self):
+        """Commit pending records and release the mapping"""
+        if self._file.closed:
+            return
+        self.commit()
+        self._map.flush()
+        self._release_map()
+        self._file.close()
+        self._strings_file.close()
+        self._ids_file.close()
+
+    # Reading
+
+    def view(self) -> memoryview:
+        """Zero-copy view of the records committed so far
+
+        Appending while the view is held is safe, but the view does not
+        grow: records committed later are not part of it.
+        """
+        with self._lock:
+            return memoryview(self._map)[HEADER.size:HEADER.size + self._count * RECORD.size]
+
+    def record(self, number: int) -> JournalRecord:
+        """Read one committed record straight from the mapping"""
+        if not 0 <= number < self._count:
+            raise IndexError(number)
+        with self._lock:
+            return JournalRecord._make(RECORD.unpack_from(self._map, HEADER.size + number * RECORD.size))
+
+    def records(self, start: int = 0) -> Iterator[JournalRecord]:
+        """Iterate over the records committed when iteration starts, from ``start`` onwards
+
+        Records are copied out of the mapping a chunk at a time, so the
+        journal can be appended to (and its mapping grown) mid-iteration.
+        """
+        end = self._count
+        while start < end:
+            stop = min(end, start + READ_CHUNK)
+            with self._lock:
+                chunk = self._map[HEADER.size + start * RECORD.size:HEADER.size + stop * RECORD.size]
+            for fields in RECORD.iter_unpack(chunk):
+                yield JournalRecord._make(fields)
+            start = stop
+
+    def decision_id(self, offset: int, ids: Optional[bytes] = None) -> str:
+        """Read the decision id stored at an offset of the ids file
+
+        ``ids`` may hold the whole ids file, read once for many lookups.
+        """
+        if ids is None:
+            fileno = self._ids_file.fileno()
+            (length,) = STRING_LENGTH.unpack(os.pread(fileno, STRING_LENGTH.size, offset))
+            return os.pread(fileno, length, offset + STRING_LENGTH.size).decode('utf-8')
+        (length,) = STRING_LENGTH.unpack_from(ids, offset)
+        start = offset + STRING_LENGTH.size
+        return ids[start:start + length].decode('utf-8')
+
+    def entry(self, number: int) -> 'DecisionLogEntry':
+        """Materialize the DecisionLogEntry of a routed record"""
+        return self._entry(self.record(number))
+
+    def _entry(self, record: JournalRecord, ids: Optional[bytes] = None) -> 'DecisionLogEntry':
+        from .peterson_ai_model import Decision, DecisionLogEntry
+
+        if record.kind != ROUTED:
+            raise ValueError("Only routed records describe a log entry")
+        strings = self.strings
+        decision = Decision(
+            id=self.decision_id(record.decision_id, ids),
+            description=strings[record.description],
+            complexity=record.complexity,
+            outcome=decode_outcome(record.outcome)
+        )
+        return DecisionLogEntry(
+            decision=decision,
+            agent_id=strings[record.agent],
+            timestamp=record.timestamp,
+            directly_made=bool(record.directly_made),
+            supervisor_id=strings[record.referrer] if record.referrer >= 0 else None
+        )
+
+    def replay(self, system: 'PetersonianAISystem'):
+        """Rebuild agent logs and metrics in ``system`` from the journal
+
+        Agents must already be registered.  Decisions are logged exactly as
+        they were routed, without routing them again, and later outcome
+        updates are re-applied.  The system's timestamp is moved past the
+        last replayed entry.
+        """
+        self.commit()
+        self._ids_file.seek(0)
+        ids = self._ids_file.read()
+        agents = system.hierarchy.agents
+        decisions = {}
+        last_timestamp = None
+        for number, record in enumerate(self.records()):
+            if record.kind == ROUTED:
+                log_entry = self._entry(record, ids)
+                agents[log_entry.agent_id].record_decision(log_entry)
+                decisions[number] = log_entry.decision
+                last_timestamp = record.timestamp
+            elif record.kind == OUTCOME_UPDATE:
+                # Re-applied before the journal observes the decision, so
+                # the update is not journaled a second time
+                decisions[record.agent].outcome = decode_outcome(record.outcome)
+        for number, decision in decisions.items():
+            decision._observe(self, number)
+        if last_timestamp is not None:
+            system.timestamp = max(system.timestamp, last_timestamp + 1.0)
@@ -0,0 +1,142 @@
+"""
+Load-aware routing.
+
+Strict escalation sends every decision to the first capable agent above
+its entry point, so hard decisions pile up on a few senior agents while
+equally capable peers sit idle.  In load-aware mode the system still
+resolves that strict handler, then considers the capable agents at its
+level and up to ``levels - 1`` capable ancestors above it, each together
+with its capable peers (the other subordinates of its supervisor), and
+hands the decision to the least-loaded one.  Ties go to the strict
+handler, so an idle system routes exactly like strict escalation.
+
+Load is the queue depth plus the work in flight that a LoadTracker keeps
+per agent: routing a decision enqueues it at its handler, ``start`` moves
+queued work in flight and ``finish`` completes it.  Callers that never
+report progress still get balancing by cumulative assignments.
+"""
+
+import threading
+from typing import Dict, List, Sequence, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .hierarchy_index import HierarchyIndex
+
+
+class LoadTracker:
+    """Per-agent queue depth and in-flight work"""
+
+    def __init__(self, levels: int = 2):
+        if levels < 1:
+            raise ValueError("levels must be at least 1")
+        self.levels = levels
+        self._lock = threading.Lock()
+        self.queued: Dict[str, int] = {}
+        self.in_flight: Dict[str, int] = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def load(self, agent_id: str) -> int:
+        """Queued plus in-flight decisions of an agent"""
+        return self.queued.get(agent_id, 0) + self.in_flight.get(agent_id, 0)
+
+    def assign(self, agent_id: str, count: int = 1):
+        """Enqueue decisions at an agent"""
+        with self._lock:
+            self.queued[agent_id] = self.queued.get(agent_id, 0) + count
+
+    def assign_least_loaded(self, candidate_ids: Sequence[str]) -> int:
+        """Enqueue a decision at the least-loaded candidate and return its index
+
+        The earliest candidate wins ties.  Choosing and enqueueing happen
+        under one lock, so concurrent routes do not all pick the same
+        idle agent.
+        """
+        with self._lock:
+            best = min(range(len(candidate_ids)), key=lambda i: self.load(candidate_ids[i]))
+            agent_id = candidate_ids[best]
+            self.queued[agent_id] = self.queued.get(agent_id, 0) + 1
+        return best
+
+    def start(self, agent_id: str, count: int = 1) -> int:
+        """Move up to ``count`` queued decisions in flight; returns how many moved"""
+        with self._lock:
+            queued = self.queued.get(agent_id, 0)
+            started = min(count, queued)
+            if started:
+                self.queued[agent_id] = queued - started
+                self.in_flight[agent_id] = self.in_flight.get(agent_id, 0) + started
+        return started
+
+    def finish(self, agent_id: str, count: int = 1):
+        """Complete in-flight decisions of an agent"""
+        with self._lock:
+            in_flight = self.in_flight.get(agent_id, 0)
+            if count > in_flight:
+                raise ValueError(f"Agent {agent_id} has only {in_flight} decisions in flight")
+            self.in_flight[agent_id] = in_flight - count
+
+    def reset(self):
+        """Forget all queued and in-flight work"""
+        with self._lock:
+            self.queued.clear()
+            self.in_flight.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Queue depth and in-flight work of every agent with any load"""
+        with self._lock:
+            return {
+                agent_id: {'queued': self.queued.get(agent_id, 0), 'in_flight': self.in_flight.get(agent_id, 0)}
+                for agent_id in sorted(set(self.queued) | set(self.in_flight))
+                if self.load(agent_id)
+            }
+
+
+def _children(index: 'HierarchyIndex', position: int) -> List[int]:
+    """Direct subordinates of a position, read off the preorder layout"""
+    order, tin, size = index.order, index.tin, index.size
+    children = []
+    number, end = tin[position] + 1, tin[position] + size[position]
+    while number < end:
+        child = order[number]
+        children.append(child)
+        number += size[child]
+    return children
+
+
+def candidates(index: 'HierarchyIndex', position: int, handler: int, referrer: int,
+               complexity: float, levels: int) -> List[Tuple[int, int, int]]:
+    """Capable ``(handler, referrer, hops)`` choices for a decision, strict handler first
+
+    ``handler`` and ``referrer`` are the strict resolution of a decision
+    entering at ``position``.  Each choice keeps the DecisionLogEntry
+    meaning of the referrer: the agent on the escalation path that handed
+    the decision on (-1 only when the entry agent handles it itself).
+    ``hops`` counts the hand-offs from the entry agent to the handler: the
+    levels climbed, or one for a peer of the entry agent.
+    """
+    capabilities, parent, depth = index.capabilities, index.parent, index.depth
+    choices = []
+    level, below = handler, referrer
+    for _ in range(levels):
+        hops = depth[position] - depth[level]
+        if capabilities[level] >= complexity:
+            choices.append((level, below, hops))
+        supervisor = parent[level]
+        if supervisor >= 0:
+            # A decision handed sideways at the entry agent was referred by it
+            peer_referrer, peer_hops = (below, hops) if below >= 0 else (position, 1)
+            for peer in _children(index, supervisor):
+                if peer != level and capabilities[peer] >= complexity:
+                    choices.append((peer, peer_referrer, peer_hops))
+        else:
+            break
+        level, below = supervisor, level
+    return choices
@@ -0,0 +1,196 @@
+"""
+Indexed queries over routed decision logs.
+
+A DecisionLogIndex lays out every log entry of a system in one columnar
+table ordered by the handling agent's preorder number (see
+``Hierarchy.subtree_interval``) and, within an agent, by timestamp.  That
+gives the secondary indexes the audit queries need:
+
+* subtree membership -- a subtree's entries form one contiguous row range;
+* time ranges -- a bisect over each agent's sorted timestamps;
+* outcome and complexity -- per (outcome, complexity bucket) lists of row
+  numbers, bisected against the row ranges above;
+* roll-ups -- prefix sums of decisions and positive outcomes, so subtree
+  performance and accountability only cost O(1) per agent range.
+
+The index is a snapshot of the logs when it was built; call ``refresh``
+after routing more decisions or changing outcomes.
+"""
+
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .log_store import DecisionLogView, encode_outcome, OUTCOME_POSITIVE
+from .peterson_ai_model import (
+    DecisionLogEntry, Hierarchy, PetersonianAISystem, accountability_score, performance_score
+)
+
+
+class DecisionLogIndex:
+    """Subtree, time, outcome and complexity index over a system's logs"""
+
+    def __init__(self, system: PetersonianAISystem, complexity_bucket_width: float = 1.0):
+        if not complexity_bucket_width > 0:
+            raise ValueError("complexity_bucket_width must be positive")
+        self.hierarchy: Hierarchy = system.hierarchy
+        self.bucket_width = complexity_bucket_width
+        self.refresh()
+
+    def _bucket(self, complexity: float) -> Optional[int]:
+        if math.isnan(complexity):
+            return None
+        return math.floor(complexity / self.bucket_width)
+
+    def refresh(self):
+        """Rebuild the index from the current logs"""
+        index = self.hierarchy.get_index(with_capabilities=False)
+        agents = self.hierarchy.agents
+        self.index = index
+        self.agent_ids = [index.ids[position] for position in index.order]  # by preorder number
+        self.offsets = array('q')  # rows of preorder number t: offsets[t]:offsets[t + 1]
+        self.timestamps = array('d')
+        self.outcomes = array('b')
+        self.complexities = array('d')
+        self.log_positions = array('q')  # position of the row's entry in its agent's log
+        buckets: Dict[Tuple[int, Optional[int]], array] = {}
+
+        for agent_id in self.agent_ids:
+            self.offsets.append(len(self.timestamps))
+            rows = self._read_log(agents[agent_id].decision_logs)
+            if any(rows[i][0] > rows[i + 1][0] for i in range(len(rows) - 1)):
+                rows.sort(key=lambda row: row[0])
+            for timestamp, outcome, complexity, log_position in rows:
+                row = len(self.timestamps)
+                self.timestamps.append(timestamp)
+                self.outcomes.append(outcome)
+                self.complexities.append(complexity)
+                self.log_positions.append(log_position)
+                key = (outcome, self._bucket(complexity))
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = array('q')
+                bucket.append(row)
+        self.offsets.append(len(self.timestamps))
+        self.buckets = buckets
+        self.positive_prefix = array('q', accumulate(
+            (1 if outcome == OUTCOME_POSITIVE else 0 for outcome in self.outcomes), initial=0))
+
+    @staticmethod
+    def _read_log(logs) -> List[Tuple[float, int, float, int]]:
+        if isinstance(logs, DecisionLogView):
+            # Read the columns directly instead of materializing entries
+            store = logs.store
+            return [(store.timestamps[row], store.outcomes[row], store.complexities[row], i)
+                    for i, row in enumerate(logs.rows)]
+        return [(log.timestamp, encode_outcome(log.decision.outcome), log.decision.complexity, i)
+                for i, log in enumerate(logs)]
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def _segments(self, subtree: Optional[str], start: Optional[float],
+                  end: Optional[float]) -> List[Tuple[int, int]]:
+        """Row ranges of the matching agents, narrowed to ``[start, end)``"""
+        if subtree is None:
+            first, last = 0, len(self.agent_ids)
+        else:
+            # Preorder numbers of the snapshot, not of the live hierarchy
+            index = self.index
+            position = index.positions[subtree]
+            first = index.tin[position]
+            last = first + index.size[position]
+        offsets = self.offsets
+        if start is None and end is None:
+            return [(offsets[first], offsets[last])] if offsets[first] < offsets[last] else []
+        timestamps = self.timestamps
+        segments = []
+        for number in range(first, last):
+            low, high = offsets[number], offsets[number + 1]
+            if low == high:
+                continue
+            if start is not None:
+                low = bisect_left(timestamps, start, low, high)
+            if end is not None:
+                high = bisect_left(timestamps, end, low, high)
+            if low < high:
+                segments.append((low, high))
+        return segments
+
+    def _matching_rows(self, segments: List[Tuple[int, int]], outcomes: Optional[Iterable[Optional[bool]]],
+                       min_complexity: Optional[float], max_complexity: Optional[float]) -> List[int]:
+        if outcomes is None and min_complexity is None and max_complexity is None:
+            return [row for low, high in segments for row in range(low, high)]
+        codes = None if outcomes is None else {encode_outcome(outcome) for outcome in outcomes}
+        low_bucket = None if min_complexity is None else self._bucket(min_complexity)
+        high_bucket = None if max_complexity is None else self._bucket(max_complexity)
+        complexities = self.complexities
+        rows = []
+        for (code, bucket), bucket_rows in self.buckets.items():
+            if codes is not None and code not in codes:
+                continue
+            if (min_complexity is not None or max_complexity is not None) and (
+                    bucket is None
+                    or (low_bucket is not None and bucket < low_bucket)
+                    or (high_bucket is not None and bucket > high_bucket)):
+                continue
+            # Only the buckets at either end can hold out-of-range complexities
+            exact = bucket in (low_bucket, high_bucket)
+            for low, high in segments:
+                for i in range(bisect_left(bucket_rows, low), bisect_left(bucket_rows, high)):
+                    row = bucket_rows[i]
+                    if exact and ((min_complexity is not None and complexities[row] < min_complexity)
+                                  or (max_complexity is not None and complexities[row] > max_complexity)):
+                        continue
+                    rows.append(row)
+        rows.sort()
+        return rows
+
+    def _entry(self, row: int) -> DecisionLogEntry:
+        agent_id = self.agent_ids[bisect_right(self.offsets, row) - 1]
+        return self.hierarchy.agents[agent_id].decision_logs[self.log_positions[row]]
+
+    def find(self, subtree: Optional[str] = None, start: Optional[float] = None,
+             end: Optional[float] = None, outcomes: Optional[Iterable[Optional[bool]]] = None,
+             min_complexity: Optional[float] = None,
+             max_complexity: Optional[float] = None) -> List[DecisionLogEntry]:
+        """Log entries matching every given filter
+
+        ``subtree`` limits the handlers to an agent and everyone below it;
+        timestamps must lie in ``[start, end)``; ``outcomes`` lists the
+        accepted Decision.outcome values (e.g. ``(False,)`` for failures);
+        complexities must lie in ``[min_complexity, max_complexity]``.
+        Entries come back grouped by handler in preorder, each handler's
+        in timestamp order.
+        """
+        segments = self._segments(subtree, start, end)
+        return [self._entry(row) for row in self._matching_rows(segments, outcomes, min_complexity, max_complexity)]
+
+    def count(self, subtree: Optional[str] = None, start: Optional[float] = None,
+              end: Optional[float] = None, outcomes: Optional[Iterable[Optional[bool]]] = None,
+              min_complexity: Optional[float] = None, max_complexity: Optional[float] = None) -> int:
+        """Number of log entries ``find`` would return, without materializing them"""
+        segments = self._segments(subtree, start, end)
+        if outcomes is None and min_complexity is None and max_complexity is None:
+            return sum(high - low for low, high in segments)
+        return len(self._matching_rows(segments, outcomes, min_complexity, max_complexity))
+
+    def rollup(self, subtree: Optional[str] = None, start: Optional[float] = None,
+               end: Optional[float] = None) -> Dict[str, float]:
+        """Decisions, performance and accountability of a subtree over ``[start, end)``
+
+        Computed from prefix sums over the matching row ranges only.
+        """
+        prefix = self.positive_prefix
+        decisions = positive = 0
+        for low, high in self._segments(subtree, start, end):
+            decisions += high - low
+            positive += prefix[high] - prefix[low]
+        return {
+            'decisions': decisions,
+            'positive': positive,
+            'performance': performance_score(positive, decisions),
+            'accountability': accountability_score(decisions, decisions),
+        }
@@ -0,0 +1,309 @@
+"""
+Columnar, array-backed storage for decision logs.
+
+Instead of keeping a DecisionLogEntry (and through it a Decision with its
+context dict) alive for every routed decision, the store keeps one typed
+array per field and interns the repeated strings, agent ids and
+descriptions, in a shared string table.  Decision ids are nearly always
+unique, so they go in a plain list instead, where interning would only add
+a table entry per decision.  Agents see their log through a
+DecisionLogView, which materializes DecisionLogEntry objects only when one
+is actually requested.
+
+Materialized entries are snapshots: their Decision carries the id,
+description, complexity and outcome that were stored, but not the context.
+
+Entries dropped by log retention leave dead rows behind.  Once they make up
+most of the store, the columns are rewritten without them and the string
+table without the strings no live row uses, so a bounded log keeps the
+store bounded too.  Row numbers change when that happens; entries are
+referred to by their position in the agent's log instead (see
+DecisionLogView.append_rows), which compaction does not change.
+"""
+
+import threading
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence
+
+# Outcome column encoding (Decision.outcome is Optional[bool])
+OUTCOME_UNKNOWN = -1
+OUTCOME_NEGATIVE = 0
+OUTCOME_POSITIVE = 1
+
+# Dead rows a store keeps before it compacts, whatever its size
+MIN_COMPACTION_ROWS = 1024
+
+
+def encode_outcome(outcome) -> int:
+    """Encode a Decision.outcome value for the outcome column"""
+    if outcome is None:
+        return OUTCOME_UNKNOWN
+    return OUTCOME_POSITIVE if outcome else OUTCOME_NEGATIVE
+
+
+def decode_outcome(code: int) -> Optional[bool]:
+    """Decode an outcome column value back into a Decision.outcome"""
+    if code == OUTCOME_UNKNOWN:
+        return None
+    return code == OUTCOME_POSITIVE
+
+
+class ColumnarLogStore:
+    """Struct-of-arrays store for the decision logs of a whole system"""
+
+    def __init__(self):
+        self.timestamps = array('d')
+        self.agent_indices = array('q')
+        self.supervisor_indices = array('q')  # -1 when there is no referrer
+        self.directly_made = array('b')
+        self.outcomes = array('b')
+        self.complexities = array('d')
+        self.decision_ids: List[str] = []  # unique per row, so not interned
+        self.descriptions = array('q')
+        self.strings: List[str] = []
+        self._string_index: Dict[str, int] = {}
+        self._agent_rows: Dict[int, array] = {}
+        # Entries dropped from the front of each agent's rows, and the
+        # dead rows they left in the columns
+        self._agent_dropped: Dict[int, int] = {}
+        self._dead_rows = 0
+        # Rows are appended from several routing threads
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def intern(self, value: str) -> int:
+        """Get the string table index of a value, adding it if necessary"""
+        index = self._string_index.get(value)
+        if index is None:
+            with self._lock:
+                index = self._string_index.get(value)
+                if index is None:
+                    index = len(self.strings)
+                    self.strings.append(value)
+                    self._string_index[value] = index
+        return index
+
+    def append(self, log_entry: 'DecisionLogEntry') -> int:
+        """Store a log entry and return its row number"""
+        decision = log_entry.decision
+        with self._lock:
+            row = len(self.timestamps)
+            agent_index = self.intern(log_entry.agent_id)
+            self.timestamps.append(log_entry.timestamp)
+            self.agent_indices.append(agent_index)
+            self.supervisor_indices.append(
+                self.intern(log_entry.supervisor_id) if log_entry.supervisor_id is not None else -1)
+            self.directly_made.append(1 if log_entry.directly_made else 0)
+            self.outcomes.append(encode_outcome(decision.outcome))
+            self.complexities.append(decision.complexity)
+            self.decision_ids.append(decision.id)
+            self.descriptions.append(self.intern(decision.description))
+
+            rows = self._agent_rows.get(agent_index)
+            if rows is None:
+                rows = self._agent_rows[agent_index] = array('q')
+            rows.append(row)
+            return row
+
+    def extend(self, log_entries: Sequence['DecisionLogEntry']) -> int:
+        """Store several log entries, column by column, and return the first row number"""
+        intern = self.intern
+        decisions = [log_entry.decision for log_entry in log_entries]
+        with self._lock:
+            first = len(self.timestamps)
+            agent_indices = [intern(log_entry.agent_id) for log_entry in log_entries]
+            self.timestamps.extend([log_entry.timestamp for log_entry in log_entries])
+            self.agent_indices.extend(agent_indices)
+            self.supervisor_indices.extend([
+                intern(log_entry.supervisor_id) if log_entry.supervisor_id is not None else -1
+                for log_entry in log_entries])
+            self.directly_made.extend([1 if log_entry.directly_made else 0 for log_entry in log_entries])
+            self.outcomes.extend([encode_outcome(decision.outcome) for decision in decisions])
+            self.complexities.extend([decision.complexity for decision in decisions])
+            self.decision_ids.extend([decision.id for decision in decisions])
+            self.descriptions.extend([intern(decision.description) for decision in decisions])
+
+            agent_rows = self._agent_rows
+            for row, agent_index in enumerate(agent_indices, first):
+                rows = agent_rows.get(agent_index)
+                if rows is None:
+                    rows = agent_rows[agent_index] = array('q')
+                rows.append(row)
+            return first
+
+    def set_outcome(self, row: int, outcome: Optional[bool]):
+        """Update the stored outcome of a row"""
+        self.outcomes[row] = encode_outcome(outcome)
+
+    def drop_oldest(self, agent_id: str, count: int) -> int:
+        """Drop an agent's oldest ``count`` rows, compacting the store once most rows are dead
+
+        Returns the number of rows dropped.
+        """
+        with self._lock:
+            index = self._string_index.get(agent_id)
+            rows = self._agent_rows.get(index) if index is not None else None
+            count = min(count, len(rows)) if rows is not None else 0
+            if count <= 0:
+                return 0
+            del rows[:count]
+            self._agent_dropped[index] = self._agent_dropped.get(index, 0) + count
+            self._dead_rows += count
+            if self._dead_rows >= MIN_COMPACTION_ROWS and 2 * self._dead_rows > len(self.timestamps):
+                self.compact()
+            return count
+
+    def dropped(self, agent_id: str) -> int:
+        """Number of rows dropped from the front of an agent's rows"""
+        index = self._string_index.get(agent_id)
+        return self._agent_dropped.get(index, 0) if index is not None else 0
+
+    def compact(self):
+        """Rewrite the columns without dead rows and the string table without unused strings
+
+        Every agent's row array is renumbered in place, so existing views
+        stay valid.  Costs O(rows + strings); drop_oldest only calls it once
+        dead rows are the majority, which keeps it amortized O(1) per row.
+        """
+        with self._lock:
+            live = sorted(row for rows in self._agent_rows.values() for row in rows)
+            remap = {row: new_row for new_row, row in enumerate(live)}
+
+            # Strings still in use: agent ids with a row array, and those of live rows
+            used = set(self._agent_rows)
+            for column in (self.supervisor_indices, self.descriptions):
+                used.update(column[row] for row in live)
+            used.discard(-1)
+            kept = sorted(used)
+            strings = {old: new for new, old in enumerate(kept)}
+            strings[-1] = -1
+
+            for name in ('timestamps', 'directly_made', 'outcomes', 'complexities'):
+                column = getattr(self, name)
+                setattr(self, name, array(column.typecode, [column[row] for row in live]))
+            self.decision_ids = [self.decision_ids[row] for row in live]
+            for name in ('agent_indices', 'supervisor_indices', 'descriptions'):
+                column = getattr(self, name)
+                setattr(self, name, array('q', [strings[column[row]] for row in live]))
+            self.strings = [self.strings[old] for old in kept]
+            self._string_index = {value: index for index, value in enumerate(self.strings)}
+
+            agent_rows = {}
+            for index, rows in self._agent_rows.items():
+                rows[:] = array('q', [remap[row] for row in rows])
+                agent_rows[strings[index]] = rows
+            self._agent_rows = agent_rows
+            self._agent_dropped = {strings[index]: count for index, count in self._agent_dropped.items()}
+            self._dead_rows = 0
+
+    def rows_for_agent(self, agent_id: str) -> array:
+        """Row numbers handled by an agent, in insertion order"""
+        with self._lock:
+            index = self._string_index.get(agent_id)
+            rows = self._agent_rows.get(index) if index is not None else None
+            if rows is None:
+                rows = array('q')
+                self._agent_rows[self.intern(agent_id)] = rows
+            return rows
+
+    def entry(self, row: int) -> 'DecisionLogEntry':
+        """Materialize the DecisionLogEntry stored at a row"""
+        from .peterson_ai_model import Decision, DecisionLogEntry
+
+        strings = self.strings
+        supervisor_index = self.supervisor_indices[row]
+        decision = Decision(
+            id=self.decision_ids[row],
+            description=strings[self.descriptions[row]],
+            complexity=self.complexities[row],
+            outcome=decode_outcome(self.outcomes[row])
+        )
+        return DecisionLogEntry(
+            decision=decision,
+            agent_id=strings[self.agent_indices[row]],
+            timestamp=self.timestamps[row],
+            directly_made=bool(self.directly_made[row]),
+            supervisor_id=strings[supervisor_index] if supervisor_index >= 0 else None
+        )
+
+    def view(self, agent_id: str) -> 'DecisionLogView':
+        """Get a sequence view over the rows handled by an agent"""
+        return DecisionLogView(self, agent_id)
+
+
+class DecisionLogView(Sequence):
+    """Read-mostly list-like view of one agent's rows in a ColumnarLogStore"""
+
+    __slots__ = ('store', 'agent_id', 'rows')
+
+    def __init__(self, store: ColumnarLogStore, agent_id: str):
+        self.store = store
+        self.agent_id = agent_id
+        self.rows = store.rows_for_agent(agent_id)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self.store.entry(row) for row in self.rows[item]]
+        return self.store.entry(self.rows[item])
+
+    def __iter__(self) -> Iterator['DecisionLogEntry']:
+        entry = self.store.entry
+        for row in self.rows:
+            yield entry(row)
+
+    def __repr__(self) -> str:
+        return f"DecisionLogView(agent_id={self.agent_id!r}, entries={len(self.rows)})"
+
+    def append(self, log_entry: 'DecisionLogEntry'):
+        """Store a log entry for this view's agent"""
+        self.append_rows((log_entry,))
+
+    def extend(self, log_entries: Sequence['DecisionLogEntry']):
+        """Store several log entries for this view's agent"""
+        self.append_rows(log_entries)
+
+    def append_rows(self, log_entries: Sequence['DecisionLogEntry']) -> List[int]:
+        """Store log entries and return their positions in the agent's log
+
+        A position counts every entry this agent ever logged before it,
+        including dropped ones, so it stays valid across drop_oldest and
+        store compaction.
+        """
+        for log_entry in log_entries:
+            if log_entry.agent_id != self.agent_id:
+                raise ValueError(f"Log entry for agent {log_entry.agent_id!r} "
+                                 f"does not belong in the log of {self.agent_id!r}")
+        store = self.store
+        with store._lock:
+            first = self.dropped + len(self.rows)
+            store.extend(log_entries)
+        return list(range(first, first + len(log_entries)))
+
+    @property
+    def dropped(self) -> int:
+        """Number of entries dropped from the front of this log"""
+        return self.store.dropped(self.agent_id)
+
+    def drop_oldest(self, count: int) -> int:
+        """Drop the oldest ``count`` entries; see ColumnarLogStore.drop_oldest"""
+        return self.store.drop_oldest(self.agent_id, count)
+
+    def set_outcome(self, position: int, outcome: Optional[bool]):
+        """Update the stored outcome of the entry at a log position (see append_rows)"""
+        store = self.store
+        with store._lock:
+            store.set_outcome(self.rows[position - self.dropped], outcome)
@@ -1,17 +1,84 @@
+import asyncio
 import math
-from typing import List, Dict, Tuple, Optional
+import heapq
+import sys
+import threading
+import time
+from collections import deque
+from itertools import repeat
+from typing import Iterable, List, Dict, Mapping, Set, Tuple, Optional, Sequence
 from dataclasses import dataclass, field
 from enum import Enum
 
-@dataclass
+from .hierarchy_index import HierarchyIndex, Topology
+from .log_store import ColumnarLogStore, DecisionLogView
+from .journal import DecisionJournal
+from .concurrency import AGENT_LOCKS, AtomicClock
+from .instrumentation import RoutingInstrumentation
+from .load_balancing import LoadTracker, candidates as load_aware_candidates
+from .sketches import RoutingSketches
+from .retention import DecisionWindow, LogSummary, LogTimestamps, RetentionPolicy
+
+# Model classes use __slots__ where dataclasses support it (Python 3.10+)
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_SLOTS)
 class Decision:
     id: str
     description: str
     complexity: float  # D(δ)
     outcome: Optional[bool] = None  # True for positive, False for negative
     context: Dict = field(default_factory=dict)
+    # Whoever must hear about outcomes set after routing.  The common case,
+    # one list-backed agent log, stores that agent itself; otherwise a list
+    # of (observer, token) pairs: an agent with the entry's log position
+    # (None for list-backed logs), or a journal with the record number.
+    # Observers implement _on_outcome_change.
+    _loggers: object = field(default=None, init=False, repr=False, compare=False)
+    
+    def __setattr__(self, name, value):
+        loggers = getattr(self, '_loggers', None) if name == 'outcome' else None
+        if loggers is None:
+            object.__setattr__(self, name, value)
+            return
+        # Keep the counters and stored outcomes of every agent that logged
+        # this decision in step with outcomes that are set after routing
+        previous = self.outcome
+        object.__setattr__(self, name, value)
+        if value is not previous:
+            if type(loggers) is not list:
+                loggers._on_outcome_change(None, bool(previous), value)
+                return
+            for observer, token in loggers:
+                observer._on_outcome_change(token, bool(previous), value)
+    
+    def _observe(self, observer, token: Optional[int] = None):
+        """Register an observer of later outcome changes (see _loggers)"""
+        loggers = self._loggers
+        if loggers is None and token is None:
+            object.__setattr__(self, '_loggers', observer)
+        elif type(loggers) is list:
+            loggers.append((observer, token))
+        else:
+            object.__setattr__(self, '_loggers', [] if loggers is None else [(loggers, None)])
+            self._loggers.append((observer, token))
+    
+    def _replace_observer(self, observer, token: Optional[int], replacement, replacement_token: Optional[int]):
+        """Hand one observer's registration over to another"""
+        loggers = self._loggers
+        if type(loggers) is not list:
+            if loggers is observer and token is None:
+                if replacement_token is None:
+                    object.__setattr__(self, '_loggers', replacement)
+                else:
+                    object.__setattr__(self, '_loggers', [(replacement, replacement_token)])
+            return
+        for i, (logged, logged_token) in enumerate(loggers):
+            if logged is observer and logged_token == token:
+                loggers[i] = (replacement, replacement_token)
+                return
 
-@dataclass
+@dataclass(**_SLOTS)
 class DecisionLogEntry:
     decision: Decision
     agent_id: str
@@ -19,33 +86,327 @@ class DecisionLogEntry:
     directly_made: bool
     supervisor_id: Optional[str] = None
 
-@dataclass
+@dataclass(**_SLOTS)
 class EthicalRule:
     id: str
     description: str
     priority: int
     active: bool = True
+    
+    def copy(self) -> 'EthicalRule':
+        """Get a modifiable copy of this rule"""
+        return EthicalRule(self.id, self.description, self.priority, self.active)
+
+class _SharedEthicalRule(EthicalRule):
+    """Read-only member of the default rule set shared by all agents"""
+    __slots__ = ()
+    
+    def __init__(self, id: str, description: str, priority: int, active: bool = True):
+        for name, value in (('id', id), ('description', description), ('priority', priority), ('active', active)):
+            object.__setattr__(self, name, value)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("Default ethical rules are shared between agents; use "
+                             "Agent.improve_rule or Agent.own_ethical_rules() to change an agent's copy")
+    
+    def __reduce__(self):
+        # Copies and unpickled agents keep sharing the module's rule objects
+        return _default_ethical_rule, (DEFAULT_ETHICAL_RULES.index(self),)
+    
+    def __eq__(self, other):
+        if not isinstance(other, EthicalRule):
+            return NotImplemented
+        return _rule_fields(self) == _rule_fields(other)
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return repr(self.copy())
+
+def _rule_fields(rule: EthicalRule) -> Tuple[str, str, int, bool]:
+    return rule.id, rule.description, rule.priority, rule.active
+
+def _default_ethical_rule(position: int) -> EthicalRule:
+    return DEFAULT_ETHICAL_RULES[position]
+
+def _private_rules(rules: Sequence[EthicalRule]) -> List[EthicalRule]:
+    """The rules as a list an agent may modify, with any shared default rule copied
+
+    A list is updated in place, so references to it stay live; any other
+    container is copied into a new list.
+    """
+    if not isinstance(rules, list):
+        rules = list(rules)
+    for position, rule in enumerate(rules):
+        if type(rule) is _SharedEthicalRule:
+            rules[position] = rule.copy()
+    return rules
+
+# Basic ethical rules every agent starts with.  Agents share this tuple
+# until they propose or modify a rule, at which point they get their own
+# copy.  Rules assigned in any other container get copies of the shared
+# rule objects straight away.
+DEFAULT_ETHICAL_RULES: Tuple[EthicalRule, ...] = (
+    _SharedEthicalRule("hierarchy_respect", "Respect legitimate authority and competence hierarchies", 1),
+    _SharedEthicalRule("personal_responsibility", "Take responsibility for decisions and their consequences", 2),
+    _SharedEthicalRule("truth_telling", "Strive for truthfulness in all communications", 3),
+    _SharedEthicalRule("self_improvement", "Continuously work to improve competence and capability", 4),
+    _SharedEthicalRule("community_contribution", "Contribute positively to the community and ecosystem", 5)
+)
 
-@dataclass
+@dataclass(**_SLOTS)
 class Agent:
     id: str
     name: str
     capability: float  # C(aᵢ)
     supervisor_id: Optional[str] = None
     decision_logs: List[DecisionLogEntry] = field(default_factory=list)
-    ethical_rules: List[EthicalRule] = field(default_factory=list)
+    ethical_rules: Sequence[EthicalRule] = DEFAULT_ETHICAL_RULES
     rule_proposals: int = 0
     rule_improvements: int = 0
+    _hierarchy: Optional['Hierarchy'] = field(default=None, init=False, repr=False, compare=False)
+    _decision_count: int = field(default=0, init=False, repr=False, compare=False)
+    _positive_count: int = field(default=0, init=False, repr=False, compare=False)
+    _knowledge_queued: bool = field(default=False, init=False, repr=False, compare=False)
+    # Whether the hierarchy already has this agent queued for both the
+    # capability and the knowledge update, so new log entries need not tell it
+    _logs_noted: bool = field(default=False, init=False, repr=False, compare=False)
+    _log_summary: Optional[LogSummary] = field(default=None, init=False, repr=False, compare=False)
+    _retention: Optional[RetentionPolicy] = field(default=None, init=False, repr=False, compare=False)
+    _recent: Optional[DecisionWindow] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __setattr__(self, name, value):
+        if name in _RULE_FIELDS:
+            if name == 'ethical_rules':
+                if type(value) is tuple and len(value) == len(DEFAULT_ETHICAL_RULES) and all(
+                        rule is default for rule, default in zip(value, DEFAULT_ETHICAL_RULES)):
+                    # An unpickled agent's copy of the defaults
+                    value = DEFAULT_ETHICAL_RULES
+                else:
+                    value = _private_rules(value)
+            elif value and getattr(self, name, 0) != value:
+                # Proposing or modifying rules is the write that ends sharing
+                self.own_ethical_rules()
+        object.__setattr__(self, name, value)
+        if name in _HIERARCHY_TRACKED_FIELDS:
+            hierarchy = getattr(self, '_hierarchy', None)
+            if hierarchy is not None:
+                hierarchy._on_agent_change(self, name)
+    
+    @property
+    def shares_default_rules(self) -> bool:
+        """Whether this agent still reads the shared DEFAULT_ETHICAL_RULES"""
+        return self.ethical_rules is DEFAULT_ETHICAL_RULES
+    
+    def own_ethical_rules(self) -> List[EthicalRule]:
+        """Get this agent's private rule list, copying the shared defaults on first use"""
+        rules = self.ethical_rules
+        private = _private_rules(rules)
+        if private is not rules:
+            object.__setattr__(self, 'ethical_rules', private)
+        return private
+    
+    def propose_rule(self, rule: EthicalRule):
+        """Add a new ethical rule proposed by this agent"""
+        self.own_ethical_rules().append(rule)
+        self.rule_proposals += 1
+    
+    def improve_rule(self, rule_id: str, **changes):
+        """Modify one of this agent's ethical rules"""
+        for rule in self.own_ethical_rules():
+            if rule.id == rule_id:
+                for name, value in changes.items():
+                    setattr(rule, name, value)
+                self.rule_improvements += 1
+                return
+        raise KeyError(rule_id)
+    
+    @property
+    def decision_count(self) -> int:
+        """Number of decisions this agent has logged, including compacted ones"""
+        self._sync_counters()
+        return self._decision_count
+    
+    @property
+    def positive_outcome_count(self) -> int:
+        """Number of logged decisions with a positive outcome"""
+        self._sync_counters()
+        return self._positive_count
+    
+    @property
+    def log_summary(self) -> Optional[LogSummary]:
+        """Aggregates of the log entries compacted away by retention, if any"""
+        return self._log_summary
+    
+    def record_decision(self, log_entry: DecisionLogEntry):
+        """Append a log entry and update the running metric counters"""
+        with AGENT_LOCKS.lock_for(self.id):
+            self._append_log(log_entry)
+        if not self._logs_noted:
+            self._notify_logs_changed()
+    
+    def _append_log(self, log_entry: DecisionLogEntry):
+        """record_decision without the locking and hierarchy notification; the caller holds the lock"""
+        logs = self.decision_logs
+        if type(logs) is not list or self._retention is not None or self._recent is not None:
+            self._record_logs((log_entry,))
+            return
+        # A plain list log: a few counter increments.  Counter drift from
+        # direct log edits is caught by _sync_counters when they are read.
+        logs.append(log_entry)
+        decision = log_entry.decision
+        if decision._loggers is None:
+            object.__setattr__(decision, '_loggers', self)
+        else:
+            decision._observe(self)
+        object.__setattr__(self, '_decision_count', self._decision_count + 1)
+        if decision.outcome:
+            object.__setattr__(self, '_positive_count', self._positive_count + 1)
+    
+    def record_decisions(self, log_entries: Sequence[DecisionLogEntry]):
+        """Append several log entries and update the running metric counters"""
+        with AGENT_LOCKS.lock_for(self.id):
+            self._record_logs(log_entries)
+        if not self._logs_noted:
+            self._notify_logs_changed()
+    
+    def _record_logs(self, log_entries: Sequence[DecisionLogEntry]):
+        """record_decisions without the locking and hierarchy notification; the caller holds the lock"""
+        append_rows = getattr(self.decision_logs, 'append_rows', None)
+        positive = 0
+        if append_rows is not None:
+            for log_entry, row in zip(log_entries, append_rows(log_entries)):
+                decision = log_entry.decision
+                decision._observe(self, row)
+                if decision.outcome:
+                    positive += 1
+        else:
+            self.decision_logs.extend(log_entries)
+            set_attribute = object.__setattr__
+            for log_entry in log_entries:
+                decision = log_entry.decision
+                if decision._loggers is None:
+                    set_attribute(decision, '_loggers', self)
+                else:
+                    decision._observe(self)
+                if decision.outcome:
+                    positive += 1
+        object.__setattr__(self, '_decision_count', self._decision_count + len(log_entries))
+        object.__setattr__(self, '_positive_count', self._positive_count + positive)
+        if self._recent is not None:
+            for log_entry in log_entries:
+                self._recent.push(log_entry.timestamp, log_entry.decision)
+        if self._retention is not None:
+            self._apply_retention()
+    
+    def _notify_logs_changed(self):
+        """Queue this agent's capability and knowledge updates with its hierarchy
+
+        Routing calls this only while ``_logs_noted`` is False; the flag is
+        cleared again when the hierarchy takes the agent off either queue.
+        """
+        hierarchy = self._hierarchy
+        if hierarchy is not None:
+            hierarchy._on_agent_change(self, 'decision_logs')
+    
+    def _on_outcome_change(self, row: Optional[int], was_positive: bool, outcome: Optional[bool]):
+        """Update the log and counters after a logged decision's outcome changed"""
+        with AGENT_LOCKS.lock_for(self.id):
+            if row is not None:
+                summary = self._log_summary
+                if summary is not None and row < self.decision_logs.dropped:
+                    # Positions before the first kept entry were compacted
+                    summary.outcome_changed(was_positive, outcome)
+                else:
+                    self.decision_logs.set_outcome(row, outcome)
+            if bool(outcome) == was_positive:
+                return
+            self._positive_count += 1 if outcome else -1
+        self._notify_logs_changed()
+    
+    def _sync_counters(self):
+        """Rescan the log if it was modified without going through record_decision"""
+        summary = self._log_summary
+        compacted = summary.decisions if summary is not None else 0
+        if self._decision_count == compacted + len(self.decision_logs):
+            return
+        with AGENT_LOCKS.lock_for(self.id):
+            # Re-check: a concurrent record_decisions may just be finishing
+            if self._decision_count != compacted + len(self.decision_logs):
+                self._decision_count = compacted + len(self.decision_logs)
+                self._positive_count = (summary.positive if summary is not None else 0) + sum(
+                    1 for log in self.decision_logs if log.decision.outcome)
+    
+    def set_retention_policy(self, policy: Optional[RetentionPolicy]):
+        """Bound this agent's log with a retention policy (None keeps everything)"""
+        with AGENT_LOCKS.lock_for(self.id):
+            self._retention = policy
+            if policy is not None:
+                self._apply_retention(force=True)
+    
+    def _apply_retention(self, force: bool = False):
+        timestamps = LogTimestamps(self.decision_logs)
+        if not timestamps:
+            return
+        policy = self._retention
+        if force:
+            count = policy.excess(timestamps, timestamps[-1])
+        else:
+            count = policy.compaction_count(timestamps, timestamps[-1])
+        if count > 0:
+            self._compact_logs(count)
+    
+    def compact_logs(self, count: int) -> int:
+        """Fold the oldest ``count`` log entries into the log summary and drop them
+
+        Lifetime counters, and so every calculate_* score, are unchanged.
+        Returns the number of entries compacted.
+        """
+        with AGENT_LOCKS.lock_for(self.id):
+            return self._compact_logs(count)
+    
+    def _compact_logs(self, count: int) -> int:
+        """compact_logs without the locking; the caller holds the lock"""
+        self._sync_counters()
+        logs = self.decision_logs
+        count = min(count, len(logs))
+        if count <= 0:
+            return 0
+        summary = self._log_summary
+        if summary is None:
+            summary = self._log_summary = LogSummary(self)
+        columnar = isinstance(logs, DecisionLogView)
+        for log_entry in logs[:count]:
+            summary.add(log_entry)
+            if not columnar:
+                # The summary now tracks this decision's outcome
+                log_entry.decision._replace_observer(self, None, summary, None)
+        if columnar:
+            logs.drop_oldest(count)
+        else:
+            del logs[:count]
+        return count
+    
+    def track_recent_decisions(self, capacity: int, half_life: Optional[float] = None) -> DecisionWindow:
+        """Keep the latest ``capacity`` decisions in a ring buffer for windowed metrics
+
+        With a ``half_life`` the decayed metrics are available too.  The
+        ring is seeded from the current log.
+        """
+        window = DecisionWindow(capacity, half_life)
+        with AGENT_LOCKS.lock_for(self.id):
+            logs = self.decision_logs
+            start = 0 if half_life is not None else max(0, len(logs) - capacity)
+            for log_entry in logs[start:]:
+                window.push(log_entry.timestamp, log_entry.decision)
+            self._recent = window
+        return window
     
-    def __post_init__(self):
-        # Initialize with basic ethical rules
-        self.ethical_rules = [
-            EthicalRule("hierarchy_respect", "Respect legitimate authority and competence hierarchies", 1),
-            EthicalRule("personal_responsibility", "Take responsibility for decisions and their consequences", 2),
-            EthicalRule("truth_telling", "Strive for truthfulness in all communications", 3),
-            EthicalRule("self_improvement", "Continuously work to improve competence and capability", 4),
-            EthicalRule("community_contribution", "Contribute positively to the community and ecosystem", 5)
-        ]
+    def _recent_window(self) -> DecisionWindow:
+        if self._recent is None:
+            raise ValueError(f"Agent {self.id!r} does not track recent decisions; "
+                             "call track_recent_decisions first")
+        return self._recent
     
     def can_handle_decision(self, decision: Decision) -> bool:
         """Determine if agent can handle decision directly"""
@@ -58,60 +419,364 @@ class Agent:
         elif log_entry.supervisor_id:
             # Calculate hierarchical distance
             distance = hierarchy.get_distance(log_entry.agent_id, log_entry.supervisor_id)
-            return 1.0 - (1.0 / (1.0 + distance))
+            return referral_responsibility(distance)
         else:
             # No supervisor to refer to, full responsibility
             return 1.0
     
     def calculate_accountability(self) -> float:
         """Calculate accountability score (A(aᵢ))"""
-        if not self.decision_logs:
-            return 0.0
-        
-        explained_count = len(self.decision_logs)  # Simplified - assume all explained
-        return explained_count / len(self.decision_logs)
+        total = self.decision_count
+        explained_count = total  # Simplified - assume all explained
+        return accountability_score(explained_count, total)
     
     def calculate_performance(self) -> float:
         """Calculate performance score (P(aᵢ))"""
-        if not self.decision_logs:
-            return 0.0
-        
-        positive_outcomes = sum(1 for log in self.decision_logs if log.decision.outcome)
-        return positive_outcomes / len(self.decision_logs)
+        total = self.decision_count
+        return performance_score(self._positive_count, total)
     
     def calculate_knowledge_contribution(self) -> float:
         """Calculate knowledge contribution (K(aᵢ))"""
-        # Simplified calculation based on performance and rule proposals
-        performance = self.calculate_performance()
-        return 0.5 * performance + 0.3 * self.rule_proposals + 0.2 * self.rule_improvements
+        return knowledge_contribution_score(self.calculate_performance(), self.rule_proposals,
+                                            self.rule_improvements)
     
     def calculate_citizenship_score(self, max_knowledge: float) -> float:
         """Calculate citizenship score (CS(aᵢ))"""
-        if not self.ethical_rules:
-            return 0.0
-        
-        # Simplified compliance - assume full compliance
-        compliance = 1.0
-        
-        # Knowledge contribution normalized
-        knowledge_normalized = self.calculate_knowledge_contribution() / max_knowledge if max_knowledge > 0 else 0
-        
-        # Simplified adaptability - assume moderate
-        adaptability = 0.7
-        
-        # Weighted combination
-        return 0.4 * compliance + 0.3 * knowledge_normalized + 0.3 * adaptability
+        return citizenship_score(self.calculate_knowledge_contribution(), max_knowledge,
+                                 bool(self.ethical_rules))
+    
+    def calculate_windowed_performance(self, window: Optional[float] = None,
+                                       now: Optional[float] = None) -> float:
+        """P(aᵢ) over the tracked recent decisions, optionally only those within ``window`` of ``now``"""
+        total, positive = self._recent_window().counts(window, now)
+        return performance_score(positive, total)
+    
+    def calculate_windowed_accountability(self, window: Optional[float] = None,
+                                          now: Optional[float] = None) -> float:
+        """A(aᵢ) over the tracked recent decisions"""
+        total, _ = self._recent_window().counts(window, now)
+        return accountability_score(total, total)
+    
+    def calculate_windowed_knowledge_contribution(self, window: Optional[float] = None,
+                                                  now: Optional[float] = None) -> float:
+        """K(aᵢ) using the windowed performance"""
+        return knowledge_contribution_score(self.calculate_windowed_performance(window, now),
+                                            self.rule_proposals, self.rule_improvements)
+    
+    def calculate_decayed_performance(self, now: Optional[float] = None) -> float:
+        """P(aᵢ) with every decision weighted by 0.5 ** (age / half_life)"""
+        total, positive = self._recent_window().decayed_counts(now)
+        return performance_score(positive, total)
+    
+    def calculate_decayed_accountability(self, now: Optional[float] = None) -> float:
+        """A(aᵢ) with decay-weighted decisions"""
+        total, _ = self._recent_window().decayed_counts(now)
+        return accountability_score(total, total)
+    
+    def calculate_decayed_knowledge_contribution(self, now: Optional[float] = None) -> float:
+        """K(aᵢ) using the decayed performance"""
+        return knowledge_contribution_score(self.calculate_decayed_performance(now),
+                                            self.rule_proposals, self.rule_improvements)
+
+# Score formulas, shared by Agent, Hierarchy and the streaming evaluator
+
+def referral_responsibility(distance: int) -> float:
+    """Responsibility retained for a referred decision at a hierarchical distance"""
+    return 1.0 - (1.0 / (1.0 + distance))
+
+def accountability_score(explained_count: int, total: int) -> float:
+    """Accountability A(aᵢ): share of logged decisions that were explained"""
+    if not total:
+        return 0.0
+    return explained_count / total
+
+def performance_score(positive_outcomes: int, total: int) -> float:
+    """Performance P(aᵢ): share of logged decisions with a positive outcome"""
+    if not total:
+        return 0.0
+    return positive_outcomes / total
+
+def knowledge_contribution_score(performance: float, rule_proposals: int, rule_improvements: int) -> float:
+    """Knowledge contribution K(aᵢ)"""
+    # Simplified calculation based on performance and rule proposals
+    return 0.5 * performance + 0.3 * rule_proposals + 0.2 * rule_improvements
+
+def citizenship_score(knowledge: float, max_knowledge: float, has_ethical_rules: bool = True) -> float:
+    """Citizenship score CS(aᵢ) from a knowledge contribution and the system maximum"""
+    if not has_ethical_rules:
+        return 0.0
+    
+    # Simplified compliance - assume full compliance
+    compliance = 1.0
+    
+    # Knowledge contribution normalized
+    knowledge_normalized = knowledge / max_knowledge if max_knowledge > 0 else 0
+    
+    # Simplified adaptability - assume moderate
+    adaptability = 0.7
+    
+    # Weighted combination
+    return 0.4 * compliance + 0.3 * knowledge_normalized + 0.3 * adaptability
+
+def instability_score(total_violations: float, edge_count: int, max_capability: float) -> float:
+    """Hierarchy instability σ_H from the summed capability violations"""
+    if not edge_count:
+        return 0.0
+    return total_violations / (edge_count * max_capability) if max_capability > 0 else 0.0
+
+def system_stability_score(instability: float, mean_citizenship: float) -> float:
+    """System stability: hierarchy soundness (1 - σ_H) and mean citizenship, equally weighted, in [0, 1]"""
+    return 0.5 * (1.0 - min(max(instability, 0.0), 1.0)) + 0.5 * min(max(mean_citizenship, 0.0), 1.0)
+
+# Agent attributes whose changes the owning hierarchy must hear about
+_HIERARCHY_TRACKED_FIELDS = frozenset(('capability', 'rule_proposals', 'rule_improvements'))
+_RULE_ACTIVITY_FIELDS = frozenset(('rule_proposals', 'rule_improvements'))
+_RULE_FIELDS = _RULE_ACTIVITY_FIELDS | {'ethical_rules'}
+
+class _KeyedMax:
+    """Maximum over keyed values, kept in a heap with lazy deletion"""
+    
+    def __init__(self):
+        self.values: Dict[str, float] = {}
+        self.heap: List[Tuple[float, str]] = []
+    
+    def set(self, key: str, value: float):
+        self.values[key] = value
+        heapq.heappush(self.heap, (-value, key))
+        if len(self.heap) > 2 * len(self.values) + 64:
+            self.heap = [(-v, k) for k, v in self.values.items()]
+            heapq.heapify(self.heap)
+    
+    def update(self, items: Iterable[Tuple[str, float]]):
+        """Set many values at once, rebuilding the heap in O(n)"""
+        self.values.update(items)
+        self.heap = [(-v, k) for k, v in self.values.items()]
+        heapq.heapify(self.heap)
+    
+    def max(self, default: float = 0.0) -> float:
+        heap = self.heap
+        while heap:
+            negated, key = heap[0]
+            if self.values.get(key) == -negated:
+                return -negated
+            heapq.heappop(heap)
+        return default
 
 class Hierarchy:
     def __init__(self):
         self.agents: Dict[str, Agent] = {}
         self.edges: Dict[str, str] = {}  # agent_id -> supervisor_id
+        self._index: Optional[HierarchyIndex] = None
+        self._index_capabilities_stale = False
+        # Structure precomputed by the bulk constructors, reused by the
+        # first index build; cleared by any later add_agent
+        self._topology: Optional[Topology] = None
+        self._knowledge = _KeyedMax()
+        # Agents whose knowledge contribution changed; appended without
+        # locking from routing threads and drained by the max query
+        self._knowledge_queue: deque = deque()
+        # Guards structural state: agents, edges, the index and the
+        # validity and maximum structures
+        self._lock = threading.RLock()
+        # Incrementally maintained validity state: subordinates per
+        # supervisor id, the capability excess of every violating edge,
+        # their running sum and the maximum capability
+        self._children: Dict[str, Set[str]] = {}
+        self._violations: Dict[str, float] = {}
+        self._violation_sum = 0.0
+        self._capabilities = _KeyedMax()
+        # Agents whose decision logs or outcomes changed since the last
+        # capability update
+        self._active_agents: Set[str] = set()
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
     
     def add_agent(self, agent: Agent):
         """Add an agent to the hierarchy"""
-        self.agents[agent.id] = agent
-        if agent.supervisor_id:
-            self.edges[agent.id] = agent.supervisor_id
+        with self._lock:
+            self.agents[agent.id] = agent
+            agent._hierarchy = self
+            if agent.supervisor_id:
+                previous_supervisor_id = self.edges.get(agent.id)
+                if previous_supervisor_id is not None:
+                    self._children[previous_supervisor_id].discard(agent.id)
+                self.edges[agent.id] = agent.supervisor_id
+                self._children.setdefault(agent.supervisor_id, set()).add(agent.id)
+            self._index = None
+            self._topology = None
+            self._queue_knowledge_update(agent)
+            self._capabilities.set(agent.id, agent.capability)
+            self._refresh_edges_around(agent.id)
+    
+    @classmethod
+    def from_agents(cls, agents: Iterable[Agent], allow_dangling: bool = False) -> 'Hierarchy':
+        """Build a hierarchy from many agents in one O(N) pass
+
+        Raises ValueError for duplicate agent ids, for supervision cycles
+        and (unless ``allow_dangling``) for supervisor ids that name no
+        agent.  Depths and a topological order are computed on the way and
+        reused by the first index build.
+        """
+        hierarchy = cls()
+        registered: Dict[str, Agent] = {}
+        for agent in agents:
+            if agent.id in registered:
+                raise ValueError(f"Duplicate agent id {agent.id!r}")
+            registered[agent.id] = agent
+        ids = list(registered)
+        positions = {agent_id: i for i, agent_id in enumerate(ids)}
+        
+        parent = [-1] * len(ids)
+        dangling: Dict[int, str] = {}
+        edges = hierarchy.edges
+        children = hierarchy._children
+        for position, agent in enumerate(registered.values()):
+            supervisor_id = agent.supervisor_id
+            if not supervisor_id:
+                continue
+            edges[agent.id] = supervisor_id
+            children.setdefault(supervisor_id, set()).add(agent.id)
+            supervisor_position = positions.get(supervisor_id, -1)
+            if supervisor_position < 0:
+                if not allow_dangling:
+                    raise ValueError(f"Supervisor {supervisor_id!r} of agent {agent.id!r} is not in the hierarchy")
+                dangling[position] = supervisor_id
+            parent[position] = supervisor_position
+        # Raises ValueError on a cycle before any agent is attached
+        hierarchy._topology = Topology(ids, positions, parent, dangling)
+        
+        hierarchy.agents = registered
+        for agent in registered.values():
+            agent._hierarchy = hierarchy
+            hierarchy._queue_knowledge_update(agent)
+        hierarchy._capabilities.update((agent.id, agent.capability) for agent in registered.values())
+        violations = hierarchy._violations
+        for agent_id, supervisor_id in edges.items():
+            supervisor = registered.get(supervisor_id)
+            if supervisor is not None and supervisor.capability < registered[agent_id].capability:
+                violations[agent_id] = registered[agent_id].capability - supervisor.capability
+        hierarchy._violation_sum = sum(violations.values())
+        return hierarchy
+    
+    @classmethod
+    def from_arrays(cls, ids: Sequence[str], capabilities: Sequence[float],
+                    supervisor_ids: Sequence[Optional[str]], names: Optional[Sequence[str]] = None,
+                    allow_dangling: bool = False) -> 'Hierarchy':
+        """Build a hierarchy from parallel arrays of ids, capabilities and supervisor ids"""
+        if not len(ids) == len(capabilities) == len(supervisor_ids) or (names is not None and len(names) != len(ids)):
+            raise ValueError("ids, capabilities, supervisor_ids and names must have the same length")
+        names = ids if names is None else names
+        return cls.from_agents(
+            (Agent(id=agent_id, name=name, capability=capability, supervisor_id=supervisor_id)
+             for agent_id, name, capability, supervisor_id in zip(ids, names, capabilities, supervisor_ids)),
+            allow_dangling=allow_dangling
+        )
+    
+    @classmethod
+    def from_edge_list(cls, capabilities: Mapping[str, float], edges: Iterable[Tuple[str, str]],
+                       names: Optional[Mapping[str, str]] = None,
+                       allow_dangling: bool = False) -> 'Hierarchy':
+        """Build a hierarchy from agent capabilities and (subordinate_id, supervisor_id) edges
+
+        Agents without an edge are roots.  An agent may have at most one
+        supervisor.
+        """
+        supervisors: Dict[str, str] = {}
+        for subordinate_id, supervisor_id in edges:
+            if subordinate_id not in capabilities:
+                raise ValueError(f"Edge names unknown agent {subordinate_id!r}")
+            if supervisors.setdefault(subordinate_id, supervisor_id) != supervisor_id:
+                raise ValueError(f"Agent {subordinate_id!r} has more than one supervisor")
+        ids = list(capabilities)
+        return cls.from_arrays(
+            ids,
+            [capabilities[agent_id] for agent_id in ids],
+            [supervisors.get(agent_id) for agent_id in ids],
+            names=[names.get(agent_id, agent_id) for agent_id in ids] if names is not None else None,
+            allow_dangling=allow_dangling
+        )
+    
+    def _refresh_edge(self, agent_id: str):
+        """Recompute the violation contributed by an agent's supervision edge"""
+        previous = self._violations.pop(agent_id, None)
+        if previous is not None:
+            self._violation_sum -= previous
+        supervisor = self.agents.get(self.edges.get(agent_id))
+        if supervisor is not None:
+            agent = self.agents[agent_id]
+            if supervisor.capability < agent.capability:
+                excess = agent.capability - supervisor.capability
+                self._violations[agent_id] = excess
+                self._violation_sum += excess
+        if not self._violations:
+            # Drop any rounding drift left by the running sum
+            self._violation_sum = 0.0
+    
+    def _refresh_edges_around(self, agent_id: str):
+        """Recompute the violations of the edges above and below an agent"""
+        self._refresh_edge(agent_id)
+        for subordinate_id in self._children.get(agent_id, ()):
+            self._refresh_edge(subordinate_id)
+    
+    def get_index(self, with_capabilities: bool = True) -> HierarchyIndex:
+        """Get the escalation index, rebuilding whatever part is stale
+
+        Pass ``with_capabilities=False`` when only the structure (ancestry,
+        depths, distances) is needed; stale capability tables are then left
+        for the next routing call to refresh.
+        """
+        index = self._index
+        if index is not None and not (self._index_capabilities_stale and with_capabilities):
+            return index
+        with self._lock:
+            if self._index is None:
+                self._index = HierarchyIndex(self, self._topology)
+                self._index_capabilities_stale = False
+            elif self._index_capabilities_stale and with_capabilities:
+                self._index = self._index.with_capabilities(self)
+                self._index_capabilities_stale = False
+            return self._index
+    
+    def _on_agent_change(self, agent: Agent, name: str):
+        """Invalidate state derived from an agent after one of its attributes changed"""
+        if self.agents.get(agent.id) is not agent:
+            return
+        if name == 'capability':
+            with self._lock:
+                self._index_capabilities_stale = True
+                self._capabilities.set(agent.id, agent.capability)
+                self._refresh_edges_around(agent.id)
+        else:
+            if name == 'decision_logs':
+                # Flag first: a drain that runs in between clears it again
+                agent._logs_noted = True
+                self._active_agents.add(agent.id)
+            self._queue_knowledge_update(agent)
+    
+    def _queue_knowledge_update(self, agent: Agent):
+        if not agent._knowledge_queued:
+            agent._knowledge_queued = True
+            self._knowledge_queue.append(agent)
+    
+    def get_max_knowledge_contribution(self) -> float:
+        """Get the highest knowledge contribution K(aᵢ) of any agent"""
+        with self._lock:
+            queue = self._knowledge_queue
+            while queue:
+                agent = queue.popleft()
+                # Clear the flags first so a concurrent change re-queues the agent
+                agent._knowledge_queued = False
+                agent._logs_noted = False
+                if self.agents.get(agent.id) is agent:
+                    self._knowledge.set(agent.id, agent.calculate_knowledge_contribution())
+            return self._knowledge.max(0.0)
     
     def get_supervisor(self, agent_id: str) -> Optional[Agent]:
         """Get the supervisor of an agent"""
@@ -121,96 +786,434 @@ class Hierarchy:
         return None
     
     def get_distance(self, subordinate_id: str, supervisor_id: str) -> int:
-        """Calculate hierarchical distance between two agents"""
-        distance = 0
-        current_id = subordinate_id
-        
-        while current_id in self.edges:
-            distance += 1
-            current_id = self.edges[current_id]
-            if current_id == supervisor_id:
-                return distance
-        
-        return distance  # Return distance even if not in path (will be 0 if no path)
+        """Calculate hierarchical distance between two agents
+
+        Counts the supervision edges from the subordinate up to the
+        supervisor.  If the supervisor is not above the subordinate, the
+        length of the subordinate's whole chain is returned (0 if it has no
+        supervisor).  Answered in O(1) from the hierarchy index.
+        """
+        return self.get_index(with_capabilities=False).distance(subordinate_id, supervisor_id)
+    
+    def subtree_interval(self, agent_id: str) -> Tuple[int, int]:
+        """Half-open preorder interval labelling an agent's subtree
+
+        An agent belongs to the subtree exactly when its preorder number
+        (``get_index().tin``) falls inside the interval.
+        """
+        index = self.get_index(with_capabilities=False)
+        start = index.tin[index.positions[agent_id]]
+        return start, start + index.size[index.positions[agent_id]]
     
     def is_valid(self) -> bool:
         """Check if hierarchy is valid (supervisors have >= capability)"""
-        for agent_id, supervisor_id in self.edges.items():
-            agent = self.agents[agent_id]
-            supervisor = self.agents[supervisor_id]
-            if supervisor.capability < agent.capability:
-                return False
-        return True
+        return not self._violations
+    
+    def violating_edges(self) -> List[Tuple[str, str]]:
+        """List the (agent_id, supervisor_id) edges where the supervisor is less capable"""
+        return [(agent_id, self.edges[agent_id]) for agent_id in self._violations]
+    
+    def _set_supervisor(self, agent_id: str, supervisor_id: Optional[str]):
+        """Move an agent under a new supervisor (None makes it a root)"""
+        previous_supervisor_id = self.edges.pop(agent_id, None)
+        if previous_supervisor_id is not None:
+            self._children[previous_supervisor_id].discard(agent_id)
+        if supervisor_id:
+            self.edges[agent_id] = supervisor_id
+            self._children.setdefault(supervisor_id, set()).add(agent_id)
+        object.__setattr__(self.agents[agent_id], 'supervisor_id', supervisor_id)
+    
+    def _swap(self, promoted_id: str, demoted_id: str) -> List[str]:
+        """Exchange the positions of an agent and its direct supervisor
+
+        Returns the agents whose supervision edge changed.
+        """
+        promoted_subordinates = list(self._children.get(promoted_id, ()))
+        demoted_subordinates = [agent_id for agent_id in self._children.get(demoted_id, ())
+                                if agent_id != promoted_id]
+        self._set_supervisor(promoted_id, self.edges.get(demoted_id))
+        self._set_supervisor(demoted_id, promoted_id)
+        for agent_id in demoted_subordinates:
+            self._set_supervisor(agent_id, promoted_id)
+        for agent_id in promoted_subordinates:
+            self._set_supervisor(agent_id, demoted_id)
+        moved = [promoted_id, demoted_id, *promoted_subordinates, *demoted_subordinates]
+        for agent_id in moved:
+            self._refresh_edge(agent_id)
+        return moved
+    
+    def rebalance(self, agent_ids: Optional[Iterable[str]] = None) -> List[Tuple[str, str]]:
+        """Restore supervisor ≥ subordinate around the given agents by promotion and demotion
+
+        Like sifting in a heap, an agent more capable than its supervisor
+        swaps places with it (taking over its supervisor and subordinates)
+        and an agent less capable than one of its subordinates swaps with
+        the most capable of them.  Both agents of every swap are sifted
+        again, since the demoted one inherits the promoted one's
+        subordinates, until no edge touched on the way violates.  Only the
+        paths of the given agents are touched, so k changed agents cost
+        O(k · depth) swaps on an otherwise valid hierarchy.  Without
+        ``agent_ids`` every agent on a violating edge is rebalanced.
+
+        Returns the ``(promoted_id, demoted_id)`` swaps in the order made.
+        """
+        swaps: List[Tuple[str, str]] = []
+        with self._lock:
+            agents = self.agents
+            pending = deque(self._violations if agent_ids is None else agent_ids)
+            touched: Set[str] = set()
+            while pending:
+                while pending:
+                    agent_id = pending.popleft()
+                    agent = agents.get(agent_id)
+                    if agent is None:
+                        continue
+                    while True:
+                        supervisor = agents.get(self.edges.get(agent_id))
+                        if supervisor is None or not supervisor.capability < agent.capability:
+                            break
+                        touched.update(self._swap(agent_id, supervisor.id))
+                        swaps.append((agent_id, supervisor.id))
+                        pending.append(supervisor.id)
+                    while True:
+                        best = None
+                        for subordinate_id in self._children.get(agent_id, ()):
+                            subordinate = agents.get(subordinate_id)
+                            if subordinate is not None and subordinate.capability > agent.capability and (
+                                    best is None or subordinate.capability > best.capability):
+                                best = subordinate
+                        if best is None:
+                            break
+                        touched.update(self._swap(best.id, agent_id))
+                        swaps.append((best.id, agent_id))
+                        pending.append(best.id)
+                # Violations are keyed by the subordinate of the edge
+                pending.extend(agent_id for agent_id in touched if agent_id in self._violations)
+                touched = set()
+            if swaps:
+                self._index = None
+                self._topology = None
+        return swaps
     
     def calculate_instability(self) -> float:
         """Calculate hierarchy instability (σ_H)"""
         if not self.edges:
             return 0.0
         
-        total_violations = 0.0
-        max_capability = max(agent.capability for agent in self.agents.values()) if self.agents else 1.0
-        
-        for agent_id, supervisor_id in self.edges.items():
-            agent = self.agents[agent_id]
-            supervisor = self.agents[supervisor_id]
-            if supervisor.capability < agent.capability:
-                total_violations += (agent.capability - supervisor.capability)
-        
-        return total_violations / (len(self.edges) * max_capability) if max_capability > 0 else 0.0
+        max_capability = self._capabilities.max() if self.agents else 1.0
+        return instability_score(self._violation_sum, len(self.edges), max_capability)
 
 class PetersonianAISystem:
-    def __init__(self):
+    def __init__(self, log_store: Optional[ColumnarLogStore] = None,
+                 journal: Optional[DecisionJournal] = None):
         self.hierarchy = Hierarchy()
         self.decisions: List[Decision] = []
-        self.timestamp = 0.0
+        self._clock = AtomicClock(0.0)
+        # Optional columnar backend for every agent's decision_logs
+        self.log_store = log_store
+        # Optional persistent journal every routed decision is written to
+        self.journal = journal
+        # Optional routing metrics; None keeps the routing paths uninstrumented
+        self.instrumentation: Optional[RoutingInstrumentation] = None
+        # Per-agent load; when set, routing picks the least-loaded capable agent
+        self.load_tracker: Optional[LoadTracker] = None
+        # Optional per-agent complexity and escalation depth sketches
+        self.sketches: Optional[RoutingSketches] = None
+        # Retention policy applied to every agent's log (None keeps everything)
+        self.retention_policy: Optional[RetentionPolicy] = None
+    
+    @property
+    def timestamp(self) -> float:
+        """Timestamp the next routed decision will receive"""
+        return self._clock.value
+    
+    @timestamp.setter
+    def timestamp(self, value: float):
+        self._clock.value = value
+    
+    def enable_instrumentation(self) -> RoutingInstrumentation:
+        """Start recording routing metrics (set ``instrumentation`` to None to stop)"""
+        if self.instrumentation is None:
+            self.instrumentation = RoutingInstrumentation(hierarchy=self.hierarchy)
+        return self.instrumentation
+    
+    def enable_sketches(self, **options) -> RoutingSketches:
+        """Start sketching routed traffic per agent (set ``sketches`` to None to stop)
+
+        ``options`` are passed to RoutingSketches.
+        """
+        if self.sketches is None:
+            self.sketches = RoutingSketches(**options)
+        return self.sketches
+    
+    def enable_load_aware_routing(self, levels: int = 2) -> LoadTracker:
+        """Spread decisions over capable peers (set ``load_tracker`` to None to go back to strict)
+
+        See src.load_balancing for how candidates are chosen; ``levels``
+        is how many capable levels, starting at the strict handler's, are
+        considered.
+        """
+        if self.load_tracker is None or self.load_tracker.levels != levels:
+            self.load_tracker = LoadTracker(levels)
+        return self.load_tracker
     
     def add_agent(self, agent: Agent):
         """Add an agent to the system"""
         self.hierarchy.add_agent(agent)
+        if self.log_store is not None:
+            self._attach_log_store(agent)
+        if self.retention_policy is not None:
+            agent.set_retention_policy(self.retention_policy)
+    
+    def set_retention_policy(self, policy: Optional[RetentionPolicy]):
+        """Apply a retention policy to the logs of every current and future agent"""
+        self.retention_policy = policy
+        for agent in self.hierarchy.agents.values():
+            agent.set_retention_policy(policy)
+    
+    def _attach_log_store(self, agent: Agent):
+        """Move an agent's decision log into the columnar store"""
+        logs = agent.decision_logs
+        if isinstance(logs, DecisionLogView) and logs.store is self.log_store:
+            return
+        existing = list(logs)
+        view = self.log_store.view(agent.id)
+        for log_entry, row in zip(existing, view.append_rows(existing)):
+            # Point late outcome updates at the stored entry
+            log_entry.decision._replace_observer(agent, None, agent, row)
+        agent.decision_logs = view
     
     def add_decision(self, decision: Decision):
         """Add a decision to the system"""
         self.decisions.append(decision)
     
-    def route_decision(self, decision: Decision, initial_agent_id: str) -> Tuple[str, DecisionLogEntry]:
-        """Route decision through hierarchy based on capability"""
-        current_agent_id = initial_agent_id
-        path = []  # Track the path of agents that considered the decision
-        
-        while True:
-            agent = self.hierarchy.agents[current_agent_id]
-            path.append(agent.id)
-            
-            if agent.can_handle_decision(decision):
-                # Agent can handle decision
-                # Determine if this agent referred from another
-                supervisor_id = path[-2] if len(path) > 1 else None
-                directly_made = (current_agent_id == initial_agent_id)  # Directly made if handling agent is initial agent
-                
-                log_entry = DecisionLogEntry(
-                    decision=decision,
-                    agent_id=agent.id,
-                    timestamp=self.timestamp,
-                    directly_made=directly_made,
-                    supervisor_id=supervisor_id
+    def get_max_knowledge_contribution(self) -> float:
+        """Get the highest knowledge contribution of any agent in the system"""
+        return self.hierarchy.get_max_knowledge_contribution()
+    
+    def calculate_system_stability(self) -> float:
+        """Calculate system stability from hierarchy instability and mean citizenship"""
+        agents = self.hierarchy.agents
+        max_knowledge = self.get_max_knowledge_contribution()
+        mean_citizenship = (sum(agent.calculate_citizenship_score(max_knowledge) for agent in agents.values())
+                            / len(agents)) if agents else 0.0
+        return system_stability_score(self.hierarchy.calculate_instability(), mean_citizenship)
+    
+    def get_responsibilities(self) -> Dict[str, List[float]]:
+        """Calculate R(aᵢ, δⱼ) for every log entry in the system in one pass
+
+        Returns each agent's responsibilities in the order of its
+        decision_logs.  Columnar logs are read straight from the store
+        without materializing entries.
+        """
+        index = self.hierarchy.get_index(with_capabilities=False)
+        distance = index.distance
+        responsibilities = {}
+        for agent_id, agent in self.hierarchy.agents.items():
+            logs = agent.decision_logs
+            if isinstance(logs, DecisionLogView):
+                store = logs.store
+                strings = store.strings
+                entries = (
+                    (store.directly_made[row], strings[store.agent_indices[row]],
+                     strings[store.supervisor_indices[row]] if store.supervisor_indices[row] >= 0 else None)
+                    for row in logs.rows
                 )
-                agent.decision_logs.append(log_entry)
-                self.timestamp += 1.0
-                return agent.id, log_entry
             else:
-                # Need to refer to supervisor
-                supervisor = self.hierarchy.get_supervisor(current_agent_id)
-                if supervisor:
-                    current_agent_id = supervisor.id
+                entries = ((log.directly_made, log.agent_id, log.supervisor_id) for log in logs)
+            responsibilities[agent_id] = [
+                referral_responsibility(distance(handler_id, supervisor_id))
+                if not directly_made and supervisor_id else 1.0
+                for directly_made, handler_id, supervisor_id in entries
+            ]
+        return responsibilities
+    
+    def update_capabilities(self, learning_rate: float = 0.1, target_performance: float = 0.5,
+                            agent_ids: Optional[Iterable[str]] = None,
+                            rebalance: bool = True) -> Dict[str, float]:
+        """Adjust capabilities from recent performance, then rebalance the hierarchy
+
+        Each agent's capability is scaled by
+        ``1 + learning_rate * (performance - target_performance)`` (never
+        below 0), using its windowed performance when it tracks recent
+        decisions.  By default only agents that logged decisions or saw
+        outcome changes since the last update are adjusted, and only their
+        paths are rebalanced.  Returns the new capability of every changed agent.
+        """
+        hierarchy = self.hierarchy
+        if agent_ids is None:
+            with hierarchy._lock:
+                agent_ids, hierarchy._active_agents = hierarchy._active_agents, set()
+            for agent_id in agent_ids:
+                agent = hierarchy.agents.get(agent_id)
+                if agent is not None:
+                    # Its next log entry must queue it again
+                    agent._logs_noted = False
+        
+        updated: Dict[str, float] = {}
+        for agent_id in agent_ids:
+            agent = hierarchy.agents.get(agent_id)
+            if agent is None or not agent.decision_count:
+                continue
+            if agent._recent is not None and len(agent._recent):
+                performance = agent.calculate_windowed_performance()
+            else:
+                performance = agent.calculate_performance()
+            capability = max(0.0, agent.capability * (1.0 + learning_rate * (performance - target_performance)))
+            if capability != agent.capability:
+                agent.capability = capability
+                updated[agent_id] = capability
+        
+        if rebalance and updated:
+            hierarchy.rebalance(updated)
+        return updated
+    
+    def route_decision(self, decision: Decision, initial_agent_id: str) -> Tuple[str, DecisionLogEntry]:
+        """Route decision through hierarchy based on capability
+
+        The decision goes to the first agent, starting at the initial agent
+        and following supervisors upward, whose capability covers its
+        complexity.  If no such agent exists the top of the chain makes a
+        best attempt.  The search uses the hierarchy's escalation index, so
+        it costs O(log depth) rather than one step per level.
+
+        With load-aware routing enabled the decision may instead go to a
+        less loaded capable peer or ancestor of that agent.
+
+        Safe to call from several threads: the handler's log is updated
+        under its lock stripe, and timestamps come from a lock-free atomic
+        sequence drawn under that stripe, so every agent's log stays in
+        timestamp order.
+        """
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            started = time.perf_counter()
+        index = self.hierarchy.get_index()
+        ids = index.ids
+        position = index.positions[initial_agent_id]
+        handler, referrer, capable = index.resolve(position, decision.complexity)
+        hops = None
+        load_tracker = self.load_tracker
+        if load_tracker is not None:
+            if capable:
+                choices = load_aware_candidates(index, position, handler, referrer, decision.complexity,
+                                                load_tracker.levels)
+            else:
+                choices = [(handler, referrer, index.depth[position] - index.depth[handler])]
+            handler, referrer, hops = choices[
+                load_tracker.assign_least_loaded([ids[choice[0]] for choice in choices])]
+        agent = self.hierarchy.agents[ids[handler]]
+        
+        with AGENT_LOCKS.lock_for(agent.id):
+            # The referrer is the agent directly below the handler on the
+            # path; a best attempt at the top of the chain is never directly made.
+            log_entry = DecisionLogEntry(decision, agent.id, self._clock.take(), capable and referrer < 0,
+                                         ids[referrer] if referrer >= 0 else None)
+            agent._append_log(log_entry)
+            if self.journal is not None:
+                self.journal.append(log_entry)
+        if not agent._logs_noted:
+            agent._notify_logs_changed()
+        if instrumentation is not None or self.sketches is not None:
+            if hops is None:
+                hops = index.depth[position] - index.depth[handler]
+            if instrumentation is not None:
+                instrumentation.record_route(initial_agent_id, agent.id, hops, capable,
+                                             time.perf_counter() - started)
+            if self.sketches is not None:
+                self.sketches.record_route(initial_agent_id, agent.id, decision.complexity, hops, decision.id)
+        return agent.id, log_entry
+    
+    async def route_decision_async(self, decision: Decision, initial_agent_id: str) -> Tuple[str, DecisionLogEntry]:
+        """Route a decision from asyncio code without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.route_decision, decision, initial_agent_id)
+    
+    def route_decisions(self, decisions: Sequence[Decision],
+                        initial_agent_ids: Sequence[str]) -> List[Tuple[str, DecisionLogEntry]]:
+        """Route a batch of decisions in one vectorized pass
+
+        Produces exactly what calling route_decision on each pair in order
+        would, including timestamps and per-agent log order, but resolves
+        all handlers together with NumPy (required for this method).
+        Load-aware routing depends on every earlier choice, so with it
+        enabled the batch is routed one decision at a time.
+        """
+        from .batch_routing import resolve_batch
+        
+        if len(decisions) != len(initial_agent_ids):
+            raise ValueError("decisions and initial_agent_ids must have the same length")
+        if self.load_tracker is not None:
+            return [self.route_decision(decision, agent_id)
+                    for decision, agent_id in zip(decisions, initial_agent_ids)]
+        
+        index = self.hierarchy.get_index()
+        positions = [index.positions[agent_id] for agent_id in initial_agent_ids]
+        handlers, referrers, capable = resolve_batch(
+            index, positions, [decision.complexity for decision in decisions])
+        
+        ids = index.ids
+        return self._record_resolved(
+            decisions,
+            initial_agent_ids,
+            [ids[handler] for handler in handlers.tolist()],
+            [ids[referrer] if referrer >= 0 else None for referrer in referrers.tolist()],
+            capable.tolist()
+        )
+    
+    def _record_resolved(self, decisions: Sequence[Decision], initial_agent_ids: Sequence[str],
+                         handler_ids: Sequence[str], referrer_ids: Sequence[Optional[str]],
+                         capable: Sequence[bool]) -> List[Tuple[str, DecisionLogEntry]]:
+        """Log a batch of already resolved decisions as if routed one by one in order"""
+        instrumentation = self.instrumentation
+        sketches = self.sketches
+        if instrumentation is not None or sketches is not None:
+            index = self.hierarchy.get_index(with_capabilities=False)
+            depth = index.depth
+            positions = index.positions
+            depths = [depth[positions[initial_agent_id]] - depth[positions[handler_id]]
+                      for initial_agent_id, handler_id in zip(initial_agent_ids, handler_ids)]
+            if instrumentation is not None:
+                for initial_agent_id, handler_id, hops, handled in zip(initial_agent_ids, handler_ids,
+                                                                       depths, capable):
+                    instrumentation.record_route(initial_agent_id, handler_id, hops, handled)
+            if sketches is not None:
+                sketches.record_routes(zip(initial_agent_ids, handler_ids,
+                                           [decision.complexity for decision in decisions], depths,
+                                           [decision.id for decision in decisions]))
+        agents = self.hierarchy.agents
+        handlers = set(handler_ids)
+        directly_made = [handled and referrer_id is None for handled, referrer_id in zip(capable, referrer_ids)]
+        # Logs _record_logs must handle (columnar, retained or windowed), in bulk per agent
+        special: Dict[str, List[DecisionLogEntry]] = {}
+        set_attribute = object.__setattr__
+        # Hold every involved handler's stripe while the timestamps are
+        # taken and logged, keeping per-agent logs ordered
+        with AGENT_LOCKS.locked(handlers):
+            log_entries = list(map(DecisionLogEntry, decisions, handler_ids,
+                                   self._clock.take_many(len(decisions)), directly_made, referrer_ids))
+            for handler_id, log_entry in zip(handler_ids, log_entries):
+                agent = agents[handler_id]
+                logs = agent.decision_logs
+                if type(logs) is not list or agent._retention is not None or agent._recent is not None:
+                    special.setdefault(handler_id, []).append(log_entry)
+                    continue
+                # _append_log, inlined
+                logs.append(log_entry)
+                decision = log_entry.decision
+                if decision._loggers is None:
+                    set_attribute(decision, '_loggers', agent)
                 else:
-                    # No supervisor available, agent makes best attempt
-                    log_entry = DecisionLogEntry(
-                        decision=decision,
-                        agent_id=agent.id,
-                        timestamp=self.timestamp,
-                        directly_made=False,  # Not directly made, but best attempt
-                        supervisor_id=None
-                    )
-                    agent.decision_logs.append(log_entry)
-                    self.timestamp += 1.0
-                    return agent.id, log_entry
\ No newline at end of file
+                    decision._observe(agent)
+                set_attribute(agent, '_decision_count', agent._decision_count + 1)
+                if decision.outcome:
+                    set_attribute(agent, '_positive_count', agent._positive_count + 1)
+            for handler_id, handled_entries in special.items():
+                agents[handler_id]._record_logs(handled_entries)
+            if self.journal is not None:
+                self.journal.extend(log_entries)
+        for handler_id in handlers:
+            agent = agents[handler_id]
+            if not agent._logs_noted:
+                agent._notify_logs_changed()
+        return list(zip(handler_ids, log_entries))
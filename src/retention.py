@@ -0,0 +1,245 @@
+"""
+Bounded decision-log retention and recency-weighted metrics.
+
+Retention policies decide how many of an agent's oldest log entries to fold
+into a LogSummary: the entries are dropped from ``decision_logs`` but their
+counts stay in the summary, so the agent's lifetime totals (and therefore
+``calculate_performance`` and friends) remain exact while memory per agent
+stays bounded.  With a columnar log store the agent's rows are dropped
+from the shared store, which compacts its columns and string table once
+most of its rows are dead.
+
+A DecisionWindow keeps an agent's most recent decisions in a fixed-size
+ring buffer for sliding-window and exponentially decayed metrics.  Entries
+pushed out of the ring are folded into a decayed tail aggregate, so decayed
+metrics still account for the whole history.
+"""
+
+import math
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left
+from typing import Iterator, Optional, Sequence, Tuple
+
+# Fraction of the kept size a policy may overshoot before compacting, so the
+# O(kept) removal from the front of a log is amortized over many appends
+DEFAULT_SLACK = 0.125
+
+
+class RetentionPolicy(ABC):
+    """Decides how many of the oldest log entries to compact
+
+    ``timestamps`` are the agent's log timestamps in log (time) order.
+    """
+
+    def __init__(self, slack: float = DEFAULT_SLACK):
+        self.slack = slack
+
+    @abstractmethod
+    def excess(self, timestamps: Sequence[float], now: float) -> int:
+        """Number of oldest entries that fall outside the policy"""
+
+    def compaction_count(self, timestamps: Sequence[float], now: float) -> int:
+        """Entries to compact now: the excess, once it exceeds the slack"""
+        excess = self.excess(timestamps, now)
+        if excess <= 0 or excess < self.slack * (len(timestamps) - excess):
+            return 0
+        return excess
+
+
+class LastN(RetentionPolicy):
+    """Keep only the most recent ``count`` entries"""
+
+    def __init__(self, count: int, slack: float = DEFAULT_SLACK):
+        super().__init__(slack)
+        self.count = max(0, count)
+
+    def excess(self, timestamps, now):
+        return len(timestamps) - self.count
+
+
+class TimeWindow(RetentionPolicy):
+    """Keep only entries whose timestamp lies within ``span`` of ``now``"""
+
+    def __init__(self, span: float, slack: float = DEFAULT_SLACK):
+        super().__init__(slack)
+        self.span = span
+
+    def excess(self, timestamps, now):
+        return bisect_left(timestamps, now - self.span)
+
+
+class ExponentialDecay(TimeWindow):
+    """Keep entries whose decay weight ``0.5 ** (age / half_life)`` is at least ``min_weight``"""
+
+    def __init__(self, half_life: float, min_weight: float = 0.01, slack: float = DEFAULT_SLACK):
+        super().__init__(half_life * math.log2(1.0 / min_weight), slack)
+        self.half_life = half_life
+        self.min_weight = min_weight
+
+
+class LogTimestamps(Sequence):
+    """Read-only timestamps of a decision log, without materializing entries"""
+
+    __slots__ = ('logs',)
+
+    def __init__(self, logs):
+        self.logs = logs
+
+    def __len__(self) -> int:
+        return len(self.logs)
+
+    def __getitem__(self, index):
+        logs = self.logs
+        rows = getattr(logs, 'rows', None)
+        if rows is not None:
+            return logs.store.timestamps[rows[index]]
+        return logs[index].timestamp
+
+
+class LogSummary:
+    """Exact aggregates of an agent's compacted log entries
+
+    Also observes outcome changes of compacted list-backed decisions (in
+    place of the agent) to keep ``positive`` exact.
+    """
+
+    __slots__ = ('agent', 'decisions', 'positive', 'directly_made', 'complexity_sum',
+                 'first_timestamp', 'last_timestamp')
+
+    def __init__(self, agent: 'Agent'):
+        self.agent = agent
+        self.decisions = 0
+        self.positive = 0
+        self.directly_made = 0
+        self.complexity_sum = 0.0
+        self.first_timestamp: Optional[float] = None
+        self.last_timestamp: Optional[float] = None
+
+    def __repr__(self) -> str:
+        return (f"LogSummary(decisions={self.decisions}, positive={self.positive}, "
+                f"first_timestamp={self.first_timestamp}, last_timestamp={self.last_timestamp})")
+
+    def add(self, log_entry: 'DecisionLogEntry'):
+        """Fold one log entry into the aggregates"""
+        decision = log_entry.decision
+        self.decisions += 1
+        if decision.outcome:
+            self.positive += 1
+        if log_entry.directly_made:
+            self.directly_made += 1
+        self.complexity_sum += decision.complexity
+        if self.first_timestamp is None:
+            self.first_timestamp = log_entry.timestamp
+        self.last_timestamp = log_entry.timestamp
+
+    def outcome_changed(self, was_positive: bool, outcome: Optional[bool]):
+        if bool(outcome) != was_positive:
+            self.positive += 1 if outcome else -1
+
+    def _on_outcome_change(self, row: Optional[int], was_positive: bool, outcome: Optional[bool]):
+        """Decision observer hook for compacted list-backed entries"""
+        self.outcome_changed(was_positive, outcome)
+        self.agent._on_outcome_change(None, was_positive, outcome)
+
+
+class DecisionWindow:
+    """Ring buffer of an agent's most recent decisions
+
+    Outcomes are read from the live Decision objects, so outcomes set after
+    routing are reflected.  With a ``half_life`` the decisions pushed out of
+    the ring are folded into a decayed tail (with the outcome they had at
+    that point).
+    """
+
+    __slots__ = ('capacity', 'half_life', 'timestamps', 'decisions', 'next', 'count',
+                 'tail_time', 'tail_weight', 'tail_positive')
+
+    def __init__(self, capacity: int, half_life: Optional[float] = None):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.half_life = half_life
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.decisions = [None] * capacity
+        self.next = 0
+        self.count = 0
+        self.tail_time: Optional[float] = None
+        self.tail_weight = 0.0
+        self.tail_positive = 0.0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def push(self, timestamp: float, decision: 'Decision'):
+        """Add the newest decision, evicting the oldest when full"""
+        slot = self.next
+        if self.count == self.capacity:
+            self._retire(self.timestamps[slot], self.decisions[slot])
+        else:
+            self.count += 1
+        self.timestamps[slot] = timestamp
+        self.decisions[slot] = decision
+        self.next = (slot + 1) % self.capacity
+
+    def _retire(self, timestamp: float, decision: 'Decision'):
+        if self.half_life is None:
+            return
+        if self.tail_time is None or timestamp > self.tail_time:
+            if self.tail_time is not None:
+                scale = 0.5 ** ((timestamp - self.tail_time) / self.half_life)
+                self.tail_weight *= scale
+                self.tail_positive *= scale
+            self.tail_time = timestamp
+            weight = 1.0
+        else:
+            weight = 0.5 ** ((self.tail_time - timestamp) / self.half_life)
+        self.tail_weight += weight
+        if decision.outcome:
+            self.tail_positive += weight
+
+    def entries(self) -> Iterator[Tuple[float, 'Decision']]:
+        """``(timestamp, decision)`` pairs, oldest first"""
+        start = (self.next - self.count) % self.capacity
+        for offset in range(self.count):
+            slot = (start + offset) % self.capacity
+            yield self.timestamps[slot], self.decisions[slot]
+
+    def latest_timestamp(self) -> Optional[float]:
+        if not self.count:
+            return self.tail_time
+        return self.timestamps[(self.next - 1) % self.capacity]
+
+    def counts(self, window: Optional[float] = None, now: Optional[float] = None) -> Tuple[int, int]:
+        """(decisions, positive outcomes) in the ring, or within ``window`` of ``now``"""
+        if window is not None and now is None:
+            now = self.latest_timestamp()
+        total = positive = 0
+        for timestamp, decision in self.entries():
+            if window is not None and timestamp < now - window:
+                continue
+            total += 1
+            if decision.outcome:
+                positive += 1
+        return total, positive
+
+    def decayed_counts(self, now: Optional[float] = None) -> Tuple[float, float]:
+        """Decay-weighted (decisions, positive outcomes) over the whole history"""
+        if self.half_life is None:
+            raise ValueError("This decision window was created without a half-life")
+        if now is None:
+            now = self.latest_timestamp()
+        if now is None:
+            return 0.0, 0.0
+        half_life = self.half_life
+        total = positive = 0.0
+        if self.tail_time is not None:
+            scale = 0.5 ** ((now - self.tail_time) / half_life)
+            total = self.tail_weight * scale
+            positive = self.tail_positive * scale
+        for timestamp, decision in self.entries():
+            weight = 0.5 ** ((now - timestamp) / half_life)
+            total += weight
+            if decision.outcome:
+                positive += weight
+        return total, positive
@@ -0,0 +1,465 @@
+"""
+Local routing service.
+
+``RoutingServer`` shares one authoritative PetersonianAISystem with other
+processes over a Unix socket (when given a path) or a localhost TCP socket
+(when given a ``(host, port)`` pair).  It exposes decision routing, batch
+routing and the metric queries; requests on different connections are
+served by separate threads, which the system's routing is safe for.
+
+``RoutingClient`` keeps a pool of connections and coalesces concurrent
+``route_decision`` calls: while every pooled connection is busy, new calls
+queue up, and the next connection to free up carries all of them in one
+batched request.  A single call on an idle client costs one round trip.
+
+Frames are length-prefixed (little-endian)::
+
+    request:  u32 payload length, u32 request id, u8 operation, payload
+    response: u32 payload length, u32 request id, u8 status, payload
+
+Payloads are compact JSON.  A routed decision is sent as
+``[id, description, complexity, outcome, context]`` and comes back as
+``[agent_id, timestamp, directly_made, supervisor_id]``, or as
+``[null, error message]`` when that decision alone could not be routed.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from .peterson_ai_model import Decision, DecisionLogEntry, PetersonianAISystem
+
+HEADER = struct.Struct('<IIB')
+MAX_FRAME = 64 * 1024 * 1024
+
+ROUTE = 1
+QUERY = 2
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_MAX_BATCH = 512
+
+Address = Union[str, Tuple[str, int]]
+
+# Metric queries: per-agent ones take the agent, system-wide ones the system
+AGENT_QUERIES = {
+    'performance': lambda system, agent: agent.calculate_performance(),
+    'accountability': lambda system, agent: agent.calculate_accountability(),
+    'knowledge_contribution': lambda system, agent: agent.calculate_knowledge_contribution(),
+    'citizenship': lambda system, agent: agent.calculate_citizenship_score(
+        system.get_max_knowledge_contribution()),
+    'decision_count': lambda system, agent: agent.decision_count,
+    'capability': lambda system, agent: agent.capability,
+}
+SYSTEM_QUERIES = {
+    'instability': lambda system: system.hierarchy.calculate_instability(),
+    'stability': lambda system: system.calculate_system_stability(),
+    'max_knowledge_contribution': lambda system: system.get_max_knowledge_contribution(),
+    'agent_count': lambda system: len(system.hierarchy.agents),
+}
+
+
+class RemoteError(Exception):
+    """The routing server rejected a request"""
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+def _receive_exactly(sock: socket.socket, size: int) -> Optional[bytes]:
+    """Read ``size`` bytes, or None if the peer closed before sending any"""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            if received == 0:
+                return None
+            raise ConnectionError("Connection closed in the middle of a frame")
+        received += count
+    return bytes(buffer)
+
+
+def send_frame(sock: socket.socket, request_id: int, code: int, payload: bytes):
+    """Write one length-prefixed frame"""
+    if len(payload) > MAX_FRAME:
+        raise ValueError(f"Frame of {len(payload)} bytes exceeds the {MAX_FRAME} byte limit")
+    sock.sendall(HEADER.pack(len(payload), request_id, code) + payload)
+
+
+def receive_frame(sock: socket.socket) -> Optional[Tuple[int, int, bytes]]:
+    """Read one frame as ``(request_id, code, payload)``; None on a clean close"""
+    header = _receive_exactly(sock, HEADER.size)
+    if header is None:
+        return None
+    length, request_id, code = HEADER.unpack(header)
+    if length > MAX_FRAME:
+        raise ConnectionError(f"Frame of {length} bytes exceeds the {MAX_FRAME} byte limit")
+    payload = _receive_exactly(sock, length) if length else b''
+    if payload is None:
+        raise ConnectionError("Connection closed in the middle of a frame")
+    return request_id, code, payload
+
+
+def _decode_decision(fields: list) -> Decision:
+    decision_id, description, complexity, outcome, context = fields
+    return Decision(id=decision_id, description=description, complexity=complexity,
+                    outcome=outcome, context=context or {})
+
+
+def _encode_decision(decision: Decision) -> list:
+    return [decision.id, decision.description, decision.complexity, decision.outcome,
+            decision.context or None]
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server: 'RoutingServer' = self.server.routing_server
+        while True:
+            try:
+                frame = receive_frame(self.request)
+            except (ConnectionError, OSError):
+                return
+            if frame is None:
+                return
+            request_id, operation, payload = frame
+            try:
+                result = server.dispatch(operation, json.loads(payload))
+                status = STATUS_OK
+            except Exception as exc:  # reported to the client, never fatal to the server
+                result = f"{type(exc).__name__}: {exc}"
+                status = STATUS_ERROR
+            try:
+                send_frame(self.request, request_id, status, _encode(result))
+            except OSError:
+                return
+
+
+def _remove_stale_socket(path: str):
+    """Unlink ``path`` if it is a Unix socket that nobody is listening on
+
+    Regular files, directories and live sockets are left alone; binding to
+    them then fails with ``EADDRINUSE``.
+    """
+    try:
+        if not stat.S_ISSOCK(os.lstat(path).st_mode):
+            return
+    except FileNotFoundError:
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+    finally:
+        probe.close()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class RoutingServer:
+    """Serve a PetersonianAISystem on a Unix path or a ``(host, port)`` pair
+
+    Use as a context manager (or call ``start``/``stop``)::
+
+        with RoutingServer(system, "/tmp/routing.sock") as server:
+            client = RoutingClient(server.address)
+    """
+
+    def __init__(self, system: PetersonianAISystem, address: Address):
+        self.system = system
+        if isinstance(address, str):
+            _remove_stale_socket(address)
+            self._server = _UnixServer(address, _RequestHandler)
+        else:
+            self._server = _TCPServer(address, _RequestHandler)
+        self._server.routing_server = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Address:
+        """Address clients connect to (with the actual port when bound to port 0)"""
+        return self._server.server_address
+
+    def start(self) -> 'RoutingServer':
+        """Serve requests on a background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="routing-server",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the socket"""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+        if isinstance(self.address, str):
+            _remove_stale_socket(self.address)
+
+    def __enter__(self) -> 'RoutingServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def dispatch(self, operation: int, request: Any) -> Any:
+        """Execute one decoded request"""
+        if operation == ROUTE:
+            return self._route([_decode_decision(fields) for fields in request['decisions']],
+                               request['agents'])
+        if operation == QUERY:
+            return self._query(request['query'], request.get('agent_id'))
+        raise ValueError(f"Unknown operation {operation}")
+
+    def _route(self, decisions: List[Decision], initial_agent_ids: List[str]) -> list:
+        system = self.system
+        if len(decisions) != len(initial_agent_ids):
+            raise ValueError("decisions and agents must have the same length")
+        results = None
+        if len(decisions) > 1:
+            try:
+                results = system.route_decisions(decisions, initial_agent_ids)
+            except ImportError:
+                pass  # batch routing needs NumPy
+            except KeyError:
+                pass  # an unknown entry agent; route one by one to isolate it
+        if results is None:
+            results = []
+            for decision, agent_id in zip(decisions, initial_agent_ids):
+                try:
+                    results.append(system.route_decision(decision, agent_id))
+                except KeyError as exc:
+                    results.append((None, f"Unknown agent {exc}"))
+        return [
+            [agent_id, log_entry.timestamp, log_entry.directly_made, log_entry.supervisor_id]
+            if agent_id is not None else [None, log_entry]
+            for agent_id, log_entry in results
+        ]
+
+    def _query(self, name: str, agent_id: Optional[str]) -> Any:
+        if agent_id is None:
+            if name not in SYSTEM_QUERIES:
+                raise ValueError(f"Unknown system query {name!r}")
+            return SYSTEM_QUERIES[name](self.system)
+        if name not in AGENT_QUERIES:
+            raise ValueError(f"Unknown agent query {name!r}")
+        agent = self.system.hierarchy.agents.get(agent_id)
+        if agent is None:
+            raise KeyError(f"Unknown agent {agent_id!r}")
+        return AGENT_QUERIES[name](self.system, agent)
+
+
+class _PendingCall:
+    __slots__ = ('decision', 'agent_id', 'taken', 'done', 'result', 'error')
+
+    def __init__(self, decision: Decision, agent_id: str):
+        self.decision = decision
+        self.agent_id = agent_id
+        self.taken = False  # set once some caller's request carries it
+        self.done = threading.Event()
+        self.result: Optional[Tuple[str, DecisionLogEntry]] = None
+        self.error: Optional[Exception] = None
+
+
+class RoutingClient:
+    """Pooled, coalescing client of a RoutingServer; safe to share between threads"""
+
+    def __init__(self, address: Address, pool_size: int = DEFAULT_POOL_SIZE,
+                 max_batch: int = DEFAULT_MAX_BATCH, timeout: Optional[float] = 30.0):
+        self.address = address
+        self.max_batch = max(1, max_batch)
+        self.timeout = timeout
+        self._free = max(1, pool_size)  # connections not in use, open or not
+        self._idle: List[socket.socket] = []
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+        self._pending: List[_PendingCall] = []
+        self._request_ids = iter(range(1, 2 ** 32))
+        self._closed = False
+
+    def _connect(self) -> socket.socket:
+        if isinstance(self.address, str):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.address)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _acquire(self) -> socket.socket:
+        with self._slot_freed:
+            while not self._free:
+                self._slot_freed.wait()
+            self._free -= 1
+        return self._checkout()
+
+    def _checkout(self) -> socket.socket:
+        """A connection for an already reserved slot"""
+        with self._lock:
+            closed = self._closed
+            sock = self._idle.pop() if self._idle and not closed else None
+        if closed:
+            self._release(None)
+            raise RuntimeError("RoutingClient is closed")
+        if sock is not None:
+            return sock
+        try:
+            return self._connect()
+        except BaseException:
+            self._release(None)
+            raise
+
+    def _release(self, sock: Optional[socket.socket]):
+        """Free a slot, returning a healthy connection to the pool (None drops a broken one)"""
+        with self._slot_freed:
+            if sock is not None:
+                if self._closed:
+                    sock.close()
+                else:
+                    self._idle.append(sock)
+            self._free += 1
+            self._slot_freed.notify_all()
+
+    def _call(self, operation: int, request: Any) -> Any:
+        return self._exchange(self._acquire(), operation, request)
+
+    def _exchange(self, sock: socket.socket, operation: int, request: Any) -> Any:
+        """One round trip on an acquired connection, which is then released"""
+        try:
+            with self._lock:
+                request_id = next(self._request_ids)
+            send_frame(sock, request_id, operation, _encode(request))
+            frame = receive_frame(sock)
+            if frame is None:
+                raise ConnectionError("Routing server closed the connection")
+            response_id, status, payload = frame
+            if response_id != request_id:
+                raise ConnectionError(f"Response {response_id} does not match request {request_id}")
+        except BaseException:
+            sock.close()
+            self._release(None)
+            raise
+        self._release(sock)
+        result = json.loads(payload)
+        if status != STATUS_OK:
+            raise RemoteError(result)
+        return result
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for sock in idle:
+            sock.close()
+
+    def __enter__(self) -> 'RoutingClient':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _log_entry(decision: Decision, fields: list) -> Tuple[str, DecisionLogEntry]:
+        if fields[0] is None:
+            raise RemoteError(fields[1])
+        agent_id, timestamp, directly_made, supervisor_id = fields
+        return agent_id, DecisionLogEntry(decision=decision, agent_id=agent_id, timestamp=timestamp,
+                                          directly_made=directly_made, supervisor_id=supervisor_id)
+
+    def route_decisions(self, decisions: Sequence[Decision],
+                        initial_agent_ids: Sequence[str]) -> List[Tuple[str, DecisionLogEntry]]:
+        """Route a batch in one request; results as from PetersonianAISystem.route_decisions
+
+        The returned log entries are local copies; the server keeps the
+        authoritative logs.
+        """
+        if len(decisions) != len(initial_agent_ids):
+            raise ValueError("decisions and initial_agent_ids must have the same length")
+        fields = self._call(ROUTE, {'decisions': [_encode_decision(decision) for decision in decisions],
+                                    'agents': list(initial_agent_ids)})
+        return [self._log_entry(decision, result) for decision, result in zip(decisions, fields)]
+
+    def route_decision(self, decision: Decision, initial_agent_id: str) -> Tuple[str, DecisionLogEntry]:
+        """Route one decision, sharing a request with concurrent calls"""
+        call = _PendingCall(decision, initial_agent_id)
+        with self._slot_freed:
+            self._pending.append(call)
+        while True:
+            with self._slot_freed:
+                while not call.taken and not self._free:
+                    self._slot_freed.wait()
+                if call.taken:
+                    break
+                # Carry everything queued so far, oldest first, in one request
+                self._free -= 1
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                for pending in batch:
+                    pending.taken = True
+                self._slot_freed.notify_all()
+            try:
+                sock = self._checkout()
+            except Exception as exc:
+                self._fail(batch, exc)
+                continue
+            self._send_batch(sock, batch)
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _send_batch(self, sock: socket.socket, batch: List[_PendingCall]):
+        try:
+            fields = self._exchange(sock, ROUTE, {'decisions': [_encode_decision(call.decision) for call in batch],
+                                        'agents': [call.agent_id for call in batch]})
+        except Exception as exc:
+            self._fail(batch, exc)
+            return
+        for call, result in zip(batch, fields):
+            try:
+                call.result = self._log_entry(call.decision, result)
+            except RemoteError as exc:
+                call.error = exc
+            call.done.set()
+
+    @staticmethod
+    def _fail(batch: List[_PendingCall], error: Exception):
+        for call in batch:
+            call.error = error
+            call.done.set()
+
+    def query(self, name: str, agent_id: Optional[str] = None) -> Any:
+        """A metric of one agent (see AGENT_QUERIES) or of the system (see SYSTEM_QUERIES)"""
+        return self._call(QUERY, {'query': name, 'agent_id': agent_id})
+
+    def metrics(self, agent_id: str) -> Dict[str, Any]:
+        """Every per-agent metric of one agent"""
+        return {name: self.query(name, agent_id) for name in AGENT_QUERIES}
@@ -0,0 +1,82 @@
+"""
+Vectorized system-wide scoring.
+
+Computes performance, accountability, knowledge contribution and
+citizenship for every agent, and the system stability figure, with a
+handful of NumPy array operations over counters gathered in one pass,
+instead of calling the per-agent ``calculate_*`` methods in a loop (which
+recompute the knowledge contribution for every citizenship score).  The
+results equal the per-agent methods up to floating-point rounding.
+
+NumPy is an optional dependency; it is only needed for this module.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .peterson_ai_model import (
+    Hierarchy, PetersonianAISystem, citizenship_score, knowledge_contribution_score, system_stability_score
+)
+
+
+class ScoreTable:
+    """Per-agent score arrays, aligned with ``ids``"""
+
+    def __init__(self, ids: List[str], decisions: np.ndarray, positive: np.ndarray,
+                 performance: np.ndarray, accountability: np.ndarray, knowledge: np.ndarray,
+                 citizenship: np.ndarray, max_knowledge: float):
+        self.ids = ids
+        self.decisions = decisions
+        self.positive = positive
+        self.performance = performance
+        self.accountability = accountability
+        self.knowledge = knowledge
+        self.citizenship = citizenship
+        self.max_knowledge = max_knowledge
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        """Scores per agent id, shaped like StreamingEvaluator.agent_scores"""
+        return {
+            agent_id: {
+                'decisions': int(self.decisions[i]),
+                'performance': float(self.performance[i]),
+                'accountability': float(self.accountability[i]),
+                'knowledge_contribution': float(self.knowledge[i]),
+                'citizenship': float(self.citizenship[i]),
+            }
+            for i, agent_id in enumerate(self.ids)
+        }
+
+
+def score_agents(hierarchy: Hierarchy) -> ScoreTable:
+    """Score every agent of a hierarchy at once"""
+    agents = list(hierarchy.agents.values())
+    count = len(agents)
+    decisions = np.fromiter((agent.decision_count for agent in agents), dtype=np.int64, count=count)
+    positive = np.fromiter((agent.positive_outcome_count for agent in agents), dtype=np.int64, count=count)
+    proposals = np.fromiter((agent.rule_proposals for agent in agents), dtype=np.float64, count=count)
+    improvements = np.fromiter((agent.rule_improvements for agent in agents), dtype=np.float64, count=count)
+    has_rules = np.fromiter((bool(agent.ethical_rules) for agent in agents), dtype=bool, count=count)
+
+    logged = decisions > 0
+    performance = np.divide(positive, decisions, out=np.zeros(count), where=logged)
+    # Every logged decision counts as explained (see accountability_score)
+    accountability = logged.astype(np.float64)
+    # The scalar formulas are plain arithmetic, so they apply elementwise
+    knowledge = knowledge_contribution_score(performance, proposals, improvements)
+    max_knowledge = float(knowledge.max()) if count else 0.0
+    citizenship = np.where(has_rules, citizenship_score(knowledge, max_knowledge), 0.0)
+    return ScoreTable([agent.id for agent in agents], decisions, positive, performance,
+                      accountability, knowledge, citizenship, max_knowledge)
+
+
+def system_stability(system: PetersonianAISystem, scores: Optional[ScoreTable] = None) -> float:
+    """PetersonianAISystem.calculate_system_stability from a score table"""
+    if scores is None:
+        scores = score_agents(system.hierarchy)
+    mean_citizenship = float(scores.citizenship.mean()) if len(scores) else 0.0
+    return system_stability_score(system.hierarchy.calculate_instability(), mean_citizenship)
@@ -0,0 +1,208 @@
+"""
+Process-pool sharded routing over hierarchy subtrees.
+
+The supervision forest is cut into subtrees ("shards") of roughly equal
+size, each owned by one worker process, which is sent and builds only the
+shards it owns.  A shard resolves the decisions that
+enter at its agents with the same escalation index route_decision uses;
+only a decision that escalates past the shard's root is forwarded, in the
+next round, to the shard owning that root's supervisor.  Forwarding always
+moves towards the top of the forest, so the number of rounds is bounded by
+the depth of the shard tree.
+
+Workers only compute handlers.  The logs are written by the calling process
+in decision order, with the timestamps a sequential run would assign, so
+the agents' logs and metrics match routing the same decisions one by one.
+"""
+
+import heapq
+import math
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .hierarchy_index import HierarchyIndex
+from .peterson_ai_model import Agent, Decision, DecisionLogEntry, Hierarchy, PetersonianAISystem
+
+ShardPlan = namedtuple('ShardPlan', ['roots', 'owner'])
+ShardPlan.__doc__ = """Subtree partition of a hierarchy
+
+``roots[s]`` is the index position of shard ``s``'s root and ``owner[p]``
+the shard owning the agent at position ``p``.
+"""
+
+
+def partition_subtrees(index: HierarchyIndex, shards: int) -> ShardPlan:
+    """Cut the supervision forest into connected subtrees of about equal size
+
+    Every chain root starts a shard; below that a node becomes a shard root
+    once the part of its subtree not already cut off reaches the target
+    size.  Wide, shallow trees leave fewer cut points, so the number of
+    shards only approximates the request.
+    """
+    count = len(index.ids)
+    target = max(1, math.ceil(count / max(1, shards)))
+    parent = index.parent
+    residual = [1] * count
+    is_root = [False] * count
+    for node in reversed(index.order):
+        supervisor = parent[node]
+        if supervisor < 0 or residual[node] >= target:
+            is_root[node] = True
+        else:
+            residual[supervisor] += residual[node]
+
+    roots: List[int] = []
+    owner = [-1] * count
+    for node in index.order:
+        if is_root[node]:
+            owner[node] = len(roots)
+            roots.append(node)
+        else:
+            owner[node] = owner[parent[node]]
+    return ShardPlan(roots, owner)
+
+
+def _shard_specs(hierarchy: Hierarchy, index: HierarchyIndex, plan: ShardPlan) -> list:
+    """Picklable description of every shard: its agents and where it forwards"""
+    members: List[List[Tuple[str, float, Optional[str]]]] = [[] for _ in plan.roots]
+    agents = hierarchy.agents
+    for node in index.order:
+        agent_id = index.ids[node]
+        members[plan.owner[node]].append(
+            (agent_id, agents[agent_id].capability, hierarchy.edges.get(agent_id)))
+    specs = []
+    for shard, root in enumerate(plan.roots):
+        supervisor = index.parent[root]
+        forward = (plan.owner[supervisor], index.ids[supervisor]) if supervisor >= 0 else None
+        specs.append((members[shard], forward))
+    return specs
+
+
+def _assign_workers(specs: list, workers: int) -> List[int]:
+    """Give every shard a worker, balancing the number of agents per worker
+
+    Returns the worker of each shard.  Shards are placed largest first on
+    the least loaded worker.
+    """
+    loads = [(0, worker) for worker in range(min(workers, len(specs)))]
+    assignment = [0] * len(specs)
+    for shard in sorted(range(len(specs)), key=lambda shard: -len(specs[shard][0])):
+        load, worker = heapq.heappop(loads)
+        assignment[shard] = worker
+        heapq.heappush(loads, (load + len(specs[shard][0]), worker))
+    return assignment
+
+
+# Per-process shard indexes, built once by the worker's initializer
+_WORKER_SHARDS: Dict[int, Tuple[HierarchyIndex, Optional[Tuple[int, str]]]] = {}
+
+
+def _init_worker(specs: Dict[int, tuple]):
+    """Build the indexes of the shards (by number) this worker owns"""
+    _WORKER_SHARDS.clear()
+    for shard, (members, forward) in specs.items():
+        hierarchy = Hierarchy()
+        for agent_id, capability, supervisor_id in members:
+            hierarchy.add_agent(Agent(id=agent_id, name=agent_id, capability=capability,
+                                      supervisor_id=supervisor_id))
+        # The shard root's supervisor lives in another shard, so locally its
+        # chain ends there, exactly where forwarding takes over
+        _WORKER_SHARDS[shard] = (HierarchyIndex(hierarchy), forward)
+
+
+def _route_in_shards(batches: Dict[int, list]) -> Tuple[list, list]:
+    """Resolve one round of decisions for several shards of this worker"""
+    resolved = []
+    forwarded = []
+    for shard, items in batches.items():
+        shard_resolved, shard_forwarded = _route_in_shard(shard, items)
+        resolved += shard_resolved
+        forwarded += shard_forwarded
+    return resolved, forwarded
+
+
+def _route_in_shard(shard: int, items: list) -> Tuple[list, list]:
+    """Resolve decisions entering a shard; return (resolved, forwarded)
+
+    Items are ``(number, entry_id, came_from, complexity)``, where
+    ``came_from`` is the agent a forwarded decision escalated from.
+    """
+    index, forward = _WORKER_SHARDS[shard]
+    ids = index.ids
+    resolved = []
+    forwarded = []
+    for number, entry_id, came_from, complexity in items:
+        handler, referrer, capable = index.resolve(index.positions[entry_id], complexity)
+        if not capable and forward is not None:
+            forwarded.append((forward[0], (number, forward[1], ids[handler], complexity)))
+            continue
+        if referrer >= 0:
+            referrer_id = ids[referrer]
+        else:
+            # Handled where it entered: the referrer is the agent it came
+            # from, but a best attempt at the top has no referrer
+            referrer_id = came_from if capable else None
+        resolved.append((number, ids[handler], referrer_id, capable))
+    return resolved, forwarded
+
+
+def route_decisions_sharded(system: PetersonianAISystem, decisions: Sequence[Decision],
+                            initial_agent_ids: Sequence[str], shards: Optional[int] = None,
+                            max_workers: Optional[int] = None) -> List[Tuple[str, DecisionLogEntry]]:
+    """Route a batch of decisions with subtree shards in worker processes
+
+    Produces exactly what calling route_decision on each pair in order
+    would.  ``shards`` defaults to the number of workers.  Each worker
+    owns a fixed set of shards, and every round sends it, in one call, the
+    decisions that entered or were forwarded to those shards.  Load-aware
+    routing is inherently sequential, so with it enabled the batch is
+    routed in this process instead.
+    """
+    if len(decisions) != len(initial_agent_ids):
+        raise ValueError("decisions and initial_agent_ids must have the same length")
+    if system.load_tracker is not None:
+        return [system.route_decision(decision, agent_id)
+                for decision, agent_id in zip(decisions, initial_agent_ids)]
+
+    hierarchy = system.hierarchy
+    index = hierarchy.get_index()
+    workers = max_workers or os.cpu_count() or 1
+    plan = partition_subtrees(index, shards or workers)
+    specs = _shard_specs(hierarchy, index, plan)
+    assignment = _assign_workers(specs, workers)
+    owned: List[Dict[int, tuple]] = [{} for _ in range(min(workers, len(specs)))]
+    for shard, spec in enumerate(specs):
+        owned[assignment[shard]][shard] = spec
+
+    pending: Dict[int, list] = {}
+    for number, (decision, agent_id) in enumerate(zip(decisions, initial_agent_ids)):
+        shard = plan.owner[index.positions[agent_id]]
+        pending.setdefault(shard, []).append((number, agent_id, None, decision.complexity))
+
+    handler_ids: List[Optional[str]] = [None] * len(decisions)
+    referrer_ids: List[Optional[str]] = [None] * len(decisions)
+    capable: List[bool] = [False] * len(decisions)
+    with ExitStack() as stack:
+        # One single-process pool per worker pins each shard to its owner
+        pools = [stack.enter_context(ProcessPoolExecutor(1, initializer=_init_worker, initargs=(shards_owned,)))
+                 for shards_owned in owned]
+        while pending:
+            rounds: List[Dict[int, list]] = [{} for _ in pools]
+            for shard, items in pending.items():
+                rounds[assignment[shard]][shard] = items
+            futures = [pools[worker].submit(_route_in_shards, batches)
+                       for worker, batches in enumerate(rounds) if batches]
+            pending = {}
+            for future in futures:
+                resolved, forwarded = future.result()
+                for number, handler_id, referrer_id, handled in resolved:
+                    handler_ids[number] = handler_id
+                    referrer_ids[number] = referrer_id
+                    capable[number] = handled
+                for shard, item in forwarded:
+                    pending.setdefault(shard, []).append(item)
+
+    return system._record_resolved(decisions, initial_agent_ids, handler_ids, referrer_ids, capable)
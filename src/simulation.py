@@ -0,0 +1,245 @@
+"""
+Seeded, high-throughput simulation engine.
+
+Drives a PetersonianAISystem with rounds of synthetic decisions to
+load-test governance policies (load-aware routing, capability adaptation,
+log retention).  Entry agents, complexities and outcomes of a whole round
+are drawn at once from a seeded NumPy generator and routed in one batch,
+and metrics are sampled every ``sample_every`` rounds instead of printing
+every step.  Runs with the same configuration produce the same samples,
+apart from the wall-clock throughput.
+
+Outcomes depend on whether any agent on the entry agent's chain can cover
+the decision: decisions some agent is capable of succeed with
+``positive_rate``, best attempts by the top of the chain with
+``best_attempt_rate``.  A share ``unknown_rate`` of outcomes stays unknown.
+
+NumPy is an optional dependency; it is only needed for this module.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .peterson_ai_model import Decision, Hierarchy, PetersonianAISystem
+from .retention import RetentionPolicy
+from .scoring import score_agents, system_stability
+from .synthetic import COMPLEXITY_DISTRIBUTIONS, generate_agents
+
+HIERARCHY_SHAPES = ('random', 'balanced', 'flat', 'chains')
+
+# Descriptions by complexity band, lowest first
+DESCRIPTIONS = (
+    "Process routine customer inquiry",
+    "Handle standard refund request",
+    "Update product documentation",
+    "Evaluate new marketing strategy",
+    "Respond to critical system failure",
+    "Make strategic partnership decision",
+    "Address ethical dilemma with supplier",
+    "Handle high-stakes financial investment",
+)
+
+
+@dataclass
+class SimulationConfig:
+    agents: int = 1000
+    shape: str = 'random'  # one of HIERARCHY_SHAPES
+    fan_out: int = 4
+    depth: Optional[int] = None  # depth limit of the 'random' shape
+    max_capability: float = 10.0
+    jitter: float = 0.5
+    rounds: int = 100
+    decisions_per_round: int = 10000
+    complexity: str = 'uniform'  # one of COMPLEXITY_DISTRIBUTIONS
+    max_complexity: float = 11.0
+    positive_rate: float = 0.7
+    best_attempt_rate: float = 0.2
+    unknown_rate: float = 0.1
+    sample_every: int = 10
+    load_aware: bool = False
+    adapt_every: Optional[int] = None  # rounds between update_capabilities calls
+    learning_rate: float = 0.1
+    retention: Optional[RetentionPolicy] = None
+    seed: int = 0
+
+
+def build_hierarchy(config: SimulationConfig) -> Hierarchy:
+    """Hierarchy of the configured shape, capabilities falling off with depth
+
+    'random' attaches every agent below a random agent with spare fan-out
+    (see synthetic.generate_agents); 'balanced' is a complete tree with
+    ``fan_out`` subordinates per agent; 'flat' puts everyone directly
+    under one root; 'chains' hangs ``fan_out`` long chains off the root.
+    """
+    if config.shape == 'random':
+        return Hierarchy.from_agents(generate_agents(
+            config.agents, fan_out=config.fan_out, depth=config.depth,
+            max_capability=config.max_capability, jitter=config.jitter, seed=config.seed))
+    if config.shape not in HIERARCHY_SHAPES:
+        raise ValueError(f"Unknown hierarchy shape {config.shape!r}; "
+                         f"expected one of {', '.join(HIERARCHY_SHAPES)}")
+    if config.agents < 1:
+        return Hierarchy()
+    if config.fan_out < 1:
+        raise ValueError("fan_out must be at least 1")
+
+    nodes = np.arange(config.agents)
+    if config.shape == 'balanced':
+        parents = (nodes - 1) // config.fan_out
+    elif config.shape == 'flat':
+        parents = np.zeros(config.agents, dtype=np.int64)
+    else:
+        parents = np.maximum(nodes - config.fan_out, 0)
+    parents[0] = -1
+    parents = parents.tolist()
+    depths = [0] * config.agents
+    for node in range(1, config.agents):
+        depths[node] = depths[parents[node]] + 1  # supervisors come first
+
+    rng = np.random.default_rng(config.seed)
+    depth = np.asarray(depths, dtype=np.float64)
+    capabilities = config.max_capability * (1.0 - depth / (depth.max() + 2.0))
+    capabilities = np.maximum(capabilities + rng.uniform(-config.jitter, config.jitter, config.agents), 0.0)
+    ids = [f"agent-{node}" for node in range(config.agents)]
+    return Hierarchy.from_arrays(ids, capabilities.tolist(),
+                                 [ids[parent] if parent >= 0 else None for parent in parents],
+                                 names=[f"Agent {node}" for node in range(config.agents)])
+
+
+def _draw_complexities(rng: np.random.Generator, distribution: str, count: int,
+                       max_complexity: float) -> np.ndarray:
+    """Vectorized counterpart of synthetic's complexity distributions"""
+    if distribution == 'uniform':
+        values = rng.uniform(0.0, max_complexity, count)
+    elif distribution == 'normal':
+        values = rng.normal(max_complexity / 2, max_complexity / 6, count)
+    elif distribution == 'exponential':
+        values = rng.exponential(max_complexity / 4.0, count)
+    elif distribution == 'bimodal':
+        centres = np.where(rng.random(count) < 0.7, 0.25, 0.85) * max_complexity
+        values = rng.normal(centres, max_complexity / 12)
+    else:
+        raise ValueError(f"Unknown complexity distribution {distribution!r}; "
+                         f"expected one of {', '.join(COMPLEXITY_DISTRIBUTIONS)}")
+    return np.clip(values, 0.0, max_complexity)
+
+
+class SimulationEngine:
+    """Run rounds of seeded decisions through a PetersonianAISystem
+
+    ``samples`` collects one dict of metrics per sampling point; the
+    ``round_*`` rates cover the rounds since the previous sample.
+    """
+
+    def __init__(self, config: Optional[SimulationConfig] = None,
+                 system: Optional[PetersonianAISystem] = None):
+        self.config = config = config or SimulationConfig()
+        if config.complexity not in COMPLEXITY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown complexity distribution {config.complexity!r}; "
+                             f"expected one of {', '.join(COMPLEXITY_DISTRIBUTIONS)}")
+        if system is None:
+            system = PetersonianAISystem()
+            system.hierarchy = build_hierarchy(config)
+        self.system = system
+        if config.load_aware:
+            system.enable_load_aware_routing()
+        if config.retention is not None:
+            system.set_retention_policy(config.retention)
+        self.rng = np.random.default_rng(config.seed)
+        self.round = 0
+        self.routed = 0
+        self.samples: List[Dict[str, float]] = []
+        self._window = self._new_window()
+        self._refresh_entries()
+
+    @staticmethod
+    def _new_window() -> Dict[str, float]:
+        return {'decisions': 0, 'direct': 0, 'best_attempts': 0, 'positive': 0, 'known': 0, 'seconds': 0.0}
+
+    def _refresh_entries(self):
+        """Entry points (the leaves) and the best capability on each one's chain"""
+        index = self.system.hierarchy.get_index()
+        has_subordinates = np.zeros(len(index.ids), dtype=bool)
+        parent = np.asarray(index.parent, dtype=np.int64)
+        has_subordinates[parent[parent >= 0]] = True
+        self._index = index
+        self._entries = np.flatnonzero(~has_subordinates)
+        # Running max of capability from the root down, in preorder
+        chain_best = list(index.capabilities)
+        for position in index.order:
+            above = index.parent[position]
+            if above >= 0 and chain_best[above] > chain_best[position]:
+                chain_best[position] = chain_best[above]
+        self._chain_best = np.asarray(chain_best, dtype=np.float64)
+
+    def step(self):
+        """Generate and route one round of decisions"""
+        config = self.config
+        count = config.decisions_per_round
+        rng = self.rng
+        entries = self._entries[rng.integers(0, len(self._entries), count)]
+        complexities = _draw_complexities(rng, config.complexity, count, config.max_complexity)
+        capable = self._chain_best[entries] >= complexities
+        draws = rng.random(count)
+        known = rng.random(count) >= config.unknown_rate
+        positive = draws < np.where(capable, config.positive_rate, config.best_attempt_rate)
+        bands = np.minimum((complexities / config.max_complexity * len(DESCRIPTIONS)).astype(np.int64),
+                           len(DESCRIPTIONS) - 1)
+
+        first = self.routed
+        ids = self._index.ids
+        decisions = [
+            Decision(id=f"decision-{first + n}", description=DESCRIPTIONS[band], complexity=complexity,
+                     outcome=outcome if is_known else None)
+            for n, (band, complexity, outcome, is_known) in enumerate(zip(
+                bands.tolist(), complexities.tolist(), positive.tolist(), known.tolist()))
+        ]
+        started = time.perf_counter()
+        results = self.system.route_decisions(decisions, [ids[entry] for entry in entries.tolist()])
+        window = self._window
+        window['seconds'] += time.perf_counter() - started
+
+        window['decisions'] += count
+        window['direct'] += sum(1 for _, log_entry in results if log_entry.directly_made)
+        window['best_attempts'] += count - int(capable.sum())
+        window['positive'] += int((positive & known).sum())
+        window['known'] += int(known.sum())
+        self.routed += count
+        self.round += 1
+
+        if config.adapt_every and self.round % config.adapt_every == 0:
+            self.system.update_capabilities(config.learning_rate)
+            self._refresh_entries()
+        if config.sample_every and self.round % config.sample_every == 0:
+            self.sample()
+
+    def sample(self) -> Dict[str, float]:
+        """Record the current metrics (and the rates since the previous sample)"""
+        window = self._window
+        decisions = window['decisions']
+        scores = score_agents(self.system.hierarchy)
+        active = scores.decisions > 0
+        sample = {
+            'round': self.round,
+            'routed': self.routed,
+            'round_escalation_rate': 1.0 - window['direct'] / decisions if decisions else 0.0,
+            'round_best_attempt_rate': window['best_attempts'] / decisions if decisions else 0.0,
+            'round_positive_rate': window['positive'] / window['known'] if window['known'] else 0.0,
+            'mean_performance': float(scores.performance[active].mean()) if active.any() else 0.0,
+            'active_agents': int(active.sum()),
+            'instability': self.system.hierarchy.calculate_instability(),
+            'stability': system_stability(self.system, scores),
+            'decisions_per_second': decisions / window['seconds'] if window['seconds'] > 0 else 0.0,
+        }
+        self.samples.append(sample)
+        self._window = self._new_window()
+        return sample
+
+    def run(self, rounds: Optional[int] = None) -> List[Dict[str, float]]:
+        """Run ``rounds`` rounds (the configured number by default) and return all samples"""
+        for _ in range(self.config.rounds if rounds is None else rounds):
+            self.step()
+        return self.samples
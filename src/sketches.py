@@ -0,0 +1,413 @@
+"""
+Mergeable streaming sketches of routing traffic.
+
+For capacity planning a RoutingSketches attached to a PetersonianAISystem
+keeps, per agent and in bounded memory, the distribution of complexities
+arriving at it (as entry agent) and handled by it, the distribution of
+escalation depths of decisions entering there, and an estimate of how many
+distinct decisions it handled.  Full decision logs are not needed.
+
+* QuantileSketch is a DDSketch-style quantile sketch: values fall into
+  logarithmic buckets, so every quantile is accurate to within a relative
+  error ``relative_accuracy``; when more than ``max_bins`` buckets are in
+  use the lowest ones are collapsed, which keeps the upper quantiles exact
+  to that error.
+* DistinctCounter is a HyperLogLog with ``2 ** precision`` one-byte
+  registers (about ``1.04 / sqrt(2 ** precision)`` standard error).
+
+Both merge losslessly with sketches of the same parameters, so sketches
+from shards, processes or earlier runs can be combined, and ``to_dict``
+and ``from_dict`` give a JSON-ready form for storing them next to a
+snapshot.  RoutingSketches relies on that itself: each routing thread
+records into one of a few independently locked shards, and reads merge
+the shards' sketches.
+"""
+
+import math
+import threading
+from contextlib import ExitStack
+from hashlib import blake2b
+from itertools import count
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_MAX_BINS = 512
+DEFAULT_PRECISION = 10
+
+# Sketch shards; routing threads are spread over them round-robin.  Every
+# shard keeps its own sketches for the agents its threads saw, so memory
+# grows with the number of shards in use
+DEFAULT_SHARDS = 4
+
+# Values at or below this count as zero in a QuantileSketch
+MIN_INDEXABLE = 1e-9
+
+
+class QuantileSketch:
+    """Relative-error quantile sketch over non-negative values"""
+
+    __slots__ = ('relative_accuracy', 'max_bins', '_log_gamma', 'bins', 'zero_count', 'count', 'min', 'max')
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY, max_bins: int = DEFAULT_MAX_BINS):
+        if not 0.0 < relative_accuracy < 1.0:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max(1, max_bins)
+        self._log_gamma = math.log((1.0 + relative_accuracy) / (1.0 - relative_accuracy))
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, value: float, count: int = 1):
+        """Add ``count`` occurrences of a value"""
+        if value > MIN_INDEXABLE:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            bins = self.bins
+            bins[key] = bins.get(key, 0) + count
+            if len(bins) > self.max_bins:
+                self._collapse()
+        else:
+            self.zero_count += count
+        self.count += count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def _collapse(self):
+        """Fold the lowest buckets into the lowest one kept"""
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_bins
+        target = keys[excess]
+        self.bins[target] += sum(self.bins.pop(key) for key in keys[:excess])
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        """Add another sketch's values to this one"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracies")
+        bins = self.bins
+        for key, count in other.bins.items():
+            bins[key] = bins.get(key, 0) + count
+        if len(bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated ``q``-quantile (None when empty)"""
+        if not 0.0 <= q <= 1.0:
+            raise ValueError("q must be between 0 and 1")
+        if not self.count:
+            return None
+        if q == 0.0:
+            return self.min  # the extremes are tracked exactly
+        if q == 1.0:
+            return self.max
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return self.min
+        gamma = math.exp(self._log_gamma)
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                # Midpoint of the bucket (gamma**(key-1), gamma**key] in relative terms
+                value = 2.0 * math.exp(key * self._log_gamma) / (gamma + 1.0)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def quantiles(self, qs: Sequence[float] = DEFAULT_QUANTILES) -> Dict[float, Optional[float]]:
+        return {q: self.quantile(q) for q in qs}
+
+    def to_dict(self) -> dict:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'max_bins': self.max_bins,
+            'bins': sorted(self.bins.items()),
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'QuantileSketch':
+        sketch = cls(data['relative_accuracy'], data['max_bins'])
+        sketch.bins = {int(key): count for key, count in data['bins']}
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        if sketch.count:
+            sketch.min = data['min']
+            sketch.max = data['max']
+        return sketch
+
+
+def _hash64(item: str) -> int:
+    # Unsalted, unlike hash(), so counters built in other processes merge
+    return int.from_bytes(blake2b(item.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class DistinctCounter:
+    """HyperLogLog estimate of the number of distinct strings added"""
+
+    __slots__ = ('precision', 'registers')
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, item: str):
+        hashed = _hash64(item)
+        precision = self.precision
+        register = hashed & ((1 << precision) - 1)
+        rank = (64 - precision) - (hashed >> precision).bit_length() + 1
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def merge(self, other: 'DistinctCounter') -> 'DistinctCounter':
+        """Count the union of both counters' items"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge counters with different precisions")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def estimate(self) -> int:
+        registers = self.registers
+        size = len(registers)
+        alpha = 0.7213 / (1.0 + 1.079 / size)
+        raw = alpha * size * size / sum(2.0 ** -register for register in registers)
+        zeros = registers.count(0)
+        if raw <= 2.5 * size and zeros:
+            return round(size * math.log(size / zeros))  # linear counting for small sets
+        return round(raw)
+
+    def to_dict(self) -> dict:
+        return {'precision': self.precision, 'registers': self.registers.hex()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'DistinctCounter':
+        counter = cls(data['precision'])
+        counter.registers = bytearray.fromhex(data['registers'])
+        return counter
+
+
+class AgentSketches:
+    """The sketches kept for one agent"""
+
+    __slots__ = ('arriving', 'handled', 'escalation_depth', 'distinct_decisions')
+
+    def __init__(self, relative_accuracy: float, max_bins: int, precision: int):
+        self.arriving = QuantileSketch(relative_accuracy, max_bins)  # complexities entering here
+        self.handled = QuantileSketch(relative_accuracy, max_bins)  # complexities handled here
+        self.escalation_depth = QuantileSketch(relative_accuracy, max_bins)  # hops from here
+        self.distinct_decisions = DistinctCounter(precision)  # decisions handled here
+
+    def merge(self, other: 'AgentSketches'):
+        for name in self.__slots__:
+            getattr(self, name).merge(getattr(other, name))
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name).to_dict() for name in self.__slots__}
+
+
+class _SketchShard:
+    """The sketches recorded by one group of routing threads, guarded by its own lock"""
+
+    __slots__ = ('lock', 'agents')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.agents: Dict[str, AgentSketches] = {}
+
+    def __getstate__(self):
+        return {'agents': self.agents}
+
+    def __setstate__(self, state):
+        self.lock = threading.Lock()
+        self.agents = state['agents']
+
+
+class RoutingSketches:
+    """Per-agent complexity, escalation depth and distinct-decision sketches
+
+    Routes are recorded into ``shards`` independently locked shards, each
+    routing thread recording into one of them; quantiles, counts and
+    exports merge the shards' sketches when they are read.
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+                 max_bins: int = DEFAULT_MAX_BINS, precision: int = DEFAULT_PRECISION,
+                 shards: int = DEFAULT_SHARDS):
+        QuantileSketch(relative_accuracy, max_bins)  # validate the parameters up front
+        DistinctCounter(precision)
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.precision = precision
+        self._shards = [_SketchShard() for _ in range(max(1, shards))]
+        self._assign_threads()
+
+    def _assign_threads(self):
+        self._local = threading.local()
+        self._next_shard = count()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_local'], state['_next_shard']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._assign_threads()
+
+    def _shard(self) -> _SketchShard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            # next() on a count is atomic, so concurrent first calls get distinct shards
+            shard = self._local.shard = self._shards[next(self._next_shard) % len(self._shards)]
+            return shard
+
+    def _locked(self) -> ExitStack:
+        """Hold every shard's lock, for a consistent view across shards"""
+        stack = ExitStack()
+        for shard in self._shards:
+            stack.enter_context(shard.lock)
+        return stack
+
+    def _new(self) -> AgentSketches:
+        return AgentSketches(self.relative_accuracy, self.max_bins, self.precision)
+
+    def _merged(self, agent_id: str) -> Optional[AgentSketches]:
+        """One agent's sketches merged over the shards (None if it was never seen)"""
+        merged = None
+        for shard in self._shards:
+            with shard.lock:
+                sketches = shard.agents.get(agent_id)
+                if sketches is not None:
+                    if merged is None:
+                        merged = self._new()
+                    merged.merge(sketches)
+        return merged
+
+    @property
+    def agents(self) -> Dict[str, AgentSketches]:
+        """Every agent's sketches, merged over the shards into new sketches"""
+        merged: Dict[str, AgentSketches] = {}
+        with self._locked():
+            for shard in self._shards:
+                for agent_id, sketches in shard.agents.items():
+                    target = merged.get(agent_id)
+                    if target is None:
+                        target = merged[agent_id] = self._new()
+                    target.merge(sketches)
+        return merged
+
+    def record_route(self, entry_id: str, handler_id: str, complexity: float, depth: int, decision_id: str):
+        """Record one routed decision that took ``depth`` hops (see load_balancing.candidates)"""
+        shard = self._shard()
+        with shard.lock:
+            self._record(shard.agents, entry_id, handler_id, complexity, depth, decision_id)
+
+    def record_routes(self, routes: Iterable[Tuple[str, str, float, int, str]]):
+        """record_route for many ``(entry_id, handler_id, complexity, depth, decision_id)`` rows"""
+        shard = self._shard()
+        with shard.lock:
+            agents = shard.agents
+            for route in routes:
+                self._record(agents, *route)
+
+    def _record(self, agents, entry_id, handler_id, complexity, depth, decision_id):
+        entry = agents.get(entry_id)
+        if entry is None:
+            entry = agents[entry_id] = self._new()
+        entry.arriving.add(complexity)
+        entry.escalation_depth.add(depth)
+        if handler_id == entry_id:
+            handler = entry
+        else:
+            handler = agents.get(handler_id)
+            if handler is None:
+                handler = agents[handler_id] = self._new()
+        handler.handled.add(complexity)
+        handler.distinct_decisions.add(decision_id)
+
+    def merge(self, other: 'RoutingSketches') -> 'RoutingSketches':
+        """Add the traffic recorded by another RoutingSketches (e.g. another shard)"""
+        merged = other.agents
+        shard = self._shard()
+        with shard.lock:
+            agents = shard.agents
+            for agent_id, sketches in merged.items():
+                target = agents.get(agent_id)
+                if target is None:
+                    agents[agent_id] = sketches
+                else:
+                    target.merge(sketches)
+        return self
+
+    def complexity_quantiles(self, agent_id: str, quantiles: Sequence[float] = DEFAULT_QUANTILES,
+                             handled: bool = True) -> Dict[float, Optional[float]]:
+        """Complexity quantiles of decisions handled by (or with ``handled=False``, arriving at) an agent"""
+        sketches = self._merged(agent_id)
+        if sketches is None:
+            return {q: None for q in quantiles}
+        return (sketches.handled if handled else sketches.arriving).quantiles(quantiles)
+
+    def escalation_depth_quantiles(self, entry_id: str,
+                                   quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Dict[float, Optional[float]]:
+        """Quantiles of how many hops decisions entering at an agent took to their handler"""
+        sketches = self._merged(entry_id)
+        if sketches is None:
+            return {q: None for q in quantiles}
+        return sketches.escalation_depth.quantiles(quantiles)
+
+    def distinct_decisions(self, agent_id: str) -> int:
+        """Estimated number of distinct decisions an agent handled"""
+        sketches = self._merged(agent_id)
+        return sketches.distinct_decisions.estimate() if sketches is not None else 0
+
+    def summary(self, quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Dict[str, dict]:
+        """Quantiles and counts of every agent seen, for capacity reports"""
+        return {
+            agent_id: {
+                'arriving': len(sketches.arriving),
+                'handled': len(sketches.handled),
+                'arriving_complexity': sketches.arriving.quantiles(quantiles),
+                'handled_complexity': sketches.handled.quantiles(quantiles),
+                'escalation_depth': sketches.escalation_depth.quantiles(quantiles),
+                'distinct_decisions': sketches.distinct_decisions.estimate(),
+            }
+            for agent_id, sketches in sorted(self.agents.items())
+        }
+
+    def to_dict(self) -> dict:
+        """JSON-ready form of every sketch, merged over the shards"""
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'max_bins': self.max_bins,
+            'precision': self.precision,
+            'agents': {agent_id: sketches.to_dict() for agent_id, sketches in self.agents.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, shards: int = DEFAULT_SHARDS) -> 'RoutingSketches':
+        sketches = cls(data['relative_accuracy'], data['max_bins'], data['precision'], shards)
+        agents = sketches._shards[0].agents
+        for agent_id, agent_data in data['agents'].items():
+            agent = agents[agent_id] = sketches._new()
+            agent.arriving = QuantileSketch.from_dict(agent_data['arriving'])
+            agent.handled = QuantileSketch.from_dict(agent_data['handled'])
+            agent.escalation_depth = QuantileSketch.from_dict(agent_data['escalation_depth'])
+            agent.distinct_decisions = DistinctCounter.from_dict(agent_data['distinct_decisions'])
+        return sketches
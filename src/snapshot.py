@@ -0,0 +1,282 @@
+"""
+Binary snapshots of a whole PetersonianAISystem.
+
+``save_snapshot`` writes agents, edges, capabilities, rule sets, metric
+counters, compacted-log summaries, the system timestamp and every agent's
+decision log into one file.  ``load_snapshot`` maps the file and rebuilds
+the agents and the hierarchy in a single pass over the fixed-width agent
+table; decision logs are left in the mapping and only materialized when an
+agent's log is first read, so a restored system can route (and report
+metrics from its restored counters) straight away.  Logs are restored as
+list-backed logs; retention policies, decision windows, journals and
+instrumentation are runtime configuration and are not part of a snapshot.
+
+File layout (little-endian):
+
+* an 88-byte header (magic, version, section offsets and counts, timestamp)
+* string offsets -- ``string_count + 1`` u64 offsets into the string blob
+* string blob -- UTF-8 agent ids, names, rule texts, decision ids and
+  descriptions, decoded only on demand
+* agent table -- one 144-byte record per agent, in registration order
+* rule table -- 32-byte records for agents with their own rule sets
+* log table -- 48-byte records, each agent's entries contiguous
+"""
+
+import math
+import mmap
+import struct
+from collections.abc import MutableSequence
+from typing import Dict, List, Optional
+
+from .log_store import encode_outcome, decode_outcome
+from .peterson_ai_model import (
+    Agent, Decision, DecisionLogEntry, EthicalRule, Hierarchy, PetersonianAISystem, DEFAULT_ETHICAL_RULES
+)
+from .retention import LogSummary
+
+MAGIC = b'PAISNAP1'
+VERSION = 1
+HEADER = struct.Struct('<8sI4xQQQQQQQQd')
+AGENT = struct.Struct('<qqqdqqqqqqqqqqqddd')
+RULE = struct.Struct('<qqqb7x')
+LOG = struct.Struct('<bb6xqqqdd')
+OFFSET = struct.Struct('<Q')
+
+NO_SUMMARY = -1
+SHARED_RULES = -1
+
+
+class _StringTable:
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.offsets = [0]
+        self.blob = bytearray()
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        index = self.index.get(value)
+        if index is None:
+            index = self.index[value] = len(self.offsets) - 1
+            self.blob += value.encode('utf-8')
+            self.offsets.append(len(self.blob))
+        return index
+
+
+def _optional_timestamp(value: Optional[float]) -> float:
+    return math.nan if value is None else value
+
+
+def save_snapshot(system: PetersonianAISystem, path: str):
+    """Write the whole system to ``path``"""
+    strings = _StringTable()
+    intern = strings.intern
+    agents = bytearray()
+    rules = bytearray()
+    logs = bytearray()
+    rule_count = log_count = 0
+
+    # Registration order is kept so a restored hierarchy iterates its agents
+    # as the original did; from_agents does not need supervisors first
+    ordered = list(system.hierarchy.agents.values())
+    for agent in ordered:
+        if agent.shares_default_rules:
+            rules_start, rules_length = 0, SHARED_RULES
+        else:
+            rules_start, rules_length = rule_count, len(agent.ethical_rules)
+            for rule in agent.ethical_rules:
+                rules += RULE.pack(intern(rule.id), intern(rule.description), rule.priority,
+                                   1 if rule.active else 0)
+            rule_count += rules_length
+
+        logs_start = log_count
+        entries = list(agent.decision_logs)
+        for log_entry in entries:
+            decision = log_entry.decision
+            logs += LOG.pack(1 if log_entry.directly_made else 0, encode_outcome(decision.outcome),
+                             intern(log_entry.supervisor_id), intern(decision.id),
+                             intern(decision.description), log_entry.timestamp, decision.complexity)
+        log_count += len(entries)
+
+        summary = agent.log_summary
+        agents += AGENT.pack(
+            intern(agent.id), intern(agent.name), intern(agent.supervisor_id), agent.capability,
+            agent.rule_proposals, agent.rule_improvements, agent.decision_count, agent.positive_outcome_count,
+            rules_start, rules_length, logs_start, len(entries),
+            summary.decisions if summary is not None else NO_SUMMARY,
+            summary.positive if summary is not None else 0,
+            summary.directly_made if summary is not None else 0,
+            summary.complexity_sum if summary is not None else 0.0,
+            _optional_timestamp(summary.first_timestamp if summary is not None else None),
+            _optional_timestamp(summary.last_timestamp if summary is not None else None)
+        )
+
+    offsets_start = HEADER.size
+    blob_start = offsets_start + OFFSET.size * len(strings.offsets)
+    agents_start = blob_start + len(strings.blob)
+    rules_start = agents_start + len(agents)
+    logs_start = rules_start + len(rules)
+    with open(path, 'wb') as handle:
+        handle.write(HEADER.pack(MAGIC, VERSION, len(strings.offsets) - 1, blob_start, agents_start,
+                                 len(ordered), rules_start, rule_count, logs_start, log_count,
+                                 system.timestamp))
+        handle.write(struct.pack(f'<{len(strings.offsets)}Q', *strings.offsets))
+        handle.write(strings.blob)
+        handle.write(agents)
+        handle.write(rules)
+        handle.write(logs)
+
+
+class SnapshotFile:
+    """Read-only mapping of a snapshot with on-demand string decoding"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as handle:
+            self.map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < HEADER.size:
+            raise ValueError(f"{path} is not a version {VERSION} system snapshot")
+        (magic, version, self.string_count, self.blob_start, self.agents_start, self.agent_count,
+         self.rules_start, self.rule_count, self.logs_start, self.log_count,
+         self.timestamp) = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} system snapshot")
+        self.offsets = memoryview(self.map)[HEADER.size:self.blob_start].cast('Q')
+
+    def string(self, index: int) -> Optional[str]:
+        if index < 0:
+            return None
+        start = self.blob_start + self.offsets[index]
+        return self.map[start:self.blob_start + self.offsets[index + 1]].decode('utf-8')
+
+    def agents(self):
+        end = self.agents_start + self.agent_count * AGENT.size
+        return AGENT.iter_unpack(self.map[self.agents_start:end])
+
+    def rules(self, start: int, count: int) -> List[EthicalRule]:
+        offset = self.rules_start + start * RULE.size
+        return [EthicalRule(self.string(rule_id), self.string(description), priority, bool(active))
+                for rule_id, description, priority, active
+                in RULE.iter_unpack(self.map[offset:offset + count * RULE.size])]
+
+    def log_entries(self, agent_id: str, start: int, count: int) -> List[DecisionLogEntry]:
+        offset = self.logs_start + start * LOG.size
+        string = self.string
+        return [
+            DecisionLogEntry(
+                decision=Decision(id=string(decision_id), description=string(description),
+                                  complexity=complexity, outcome=decode_outcome(outcome)),
+                agent_id=agent_id,
+                timestamp=timestamp,
+                directly_made=bool(directly_made),
+                supervisor_id=string(referrer)
+            )
+            for directly_made, outcome, referrer, decision_id, description, timestamp, complexity
+            in LOG.iter_unpack(self.map[offset:offset + count * LOG.size])
+        ]
+
+
+class SnapshotLog(MutableSequence):
+    """An agent's decision log that stays in the snapshot until first read
+
+    Its length and appends do not load anything; any other access
+    materializes the stored entries once and then behaves like a list.
+    """
+
+    __slots__ = ('_snapshot', '_agent', '_start', '_count', '_appended', '_entries')
+
+    def __init__(self, snapshot: SnapshotFile, agent: Agent, start: int, count: int):
+        self._snapshot = snapshot
+        self._agent = agent
+        self._start = start
+        self._count = count
+        self._appended: List[DecisionLogEntry] = []
+        self._entries: Optional[List[DecisionLogEntry]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._entries is not None
+
+    def _load(self) -> List[DecisionLogEntry]:
+        if self._entries is None:
+            agent = self._agent
+            entries = self._snapshot.log_entries(agent.id, self._start, self._count)
+            for log_entry in entries:
+                # Restored decisions report outcome changes like routed ones
+                object.__setattr__(log_entry.decision, '_loggers', agent)
+            entries.extend(self._appended)
+            self._entries = entries
+            self._snapshot = self._agent = self._appended = None
+        return self._entries
+
+    def __len__(self) -> int:
+        if self._entries is None:
+            return self._count + len(self._appended)
+        return len(self._entries)
+
+    def __getitem__(self, item):
+        return self._load()[item]
+
+    def __setitem__(self, item, value):
+        self._load()[item] = value
+
+    def __delitem__(self, item):
+        del self._load()[item]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def insert(self, position: int, value: DecisionLogEntry):
+        self._load().insert(position, value)
+
+    def append(self, value: DecisionLogEntry):
+        if self._entries is None:
+            self._appended.append(value)
+        else:
+            self._entries.append(value)
+
+    def extend(self, values):
+        if self._entries is None:
+            self._appended.extend(values)
+        else:
+            self._entries.extend(values)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._entries is not None else 'not loaded'
+        return f"SnapshotLog(entries={len(self)}, {state})"
+
+
+def load_snapshot(path: str) -> PetersonianAISystem:
+    """Restore a system saved by save_snapshot; decision logs load lazily"""
+    snapshot = SnapshotFile(path)
+    string = snapshot.string
+    agents = []
+    for (agent_id, name, supervisor_id, capability, rule_proposals, rule_improvements,
+         decision_count, positive_count, rules_start, rules_length, logs_start, logs_length,
+         summary_decisions, summary_positive, summary_directly_made, summary_complexity,
+         first_timestamp, last_timestamp) in snapshot.agents():
+        rules = DEFAULT_ETHICAL_RULES if rules_length == SHARED_RULES else snapshot.rules(rules_start, rules_length)
+        agent = Agent(id=string(agent_id), name=string(name), capability=capability,
+                      supervisor_id=string(supervisor_id), ethical_rules=rules)
+        # Restored state bypasses the change hooks, which would copy rules
+        # or count the restored log entries a second time
+        object.__setattr__(agent, 'rule_proposals', rule_proposals)
+        object.__setattr__(agent, 'rule_improvements', rule_improvements)
+        object.__setattr__(agent, 'decision_logs', SnapshotLog(snapshot, agent, logs_start, logs_length))
+        object.__setattr__(agent, '_decision_count', decision_count)
+        object.__setattr__(agent, '_positive_count', positive_count)
+        if summary_decisions != NO_SUMMARY:
+            summary = LogSummary(agent)
+            summary.decisions = summary_decisions
+            summary.positive = summary_positive
+            summary.directly_made = summary_directly_made
+            summary.complexity_sum = summary_complexity
+            summary.first_timestamp = None if math.isnan(first_timestamp) else first_timestamp
+            summary.last_timestamp = None if math.isnan(last_timestamp) else last_timestamp
+            object.__setattr__(agent, '_log_summary', summary)
+        agents.append(agent)
+
+    system = PetersonianAISystem()
+    # Supervisors that were never registered are kept, as add_agent allows
+    system.hierarchy = Hierarchy.from_agents(agents, allow_dangling=True)
+    system.timestamp = snapshot.timestamp
+    return system
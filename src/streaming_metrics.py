@@ -0,0 +1,226 @@
+"""
+Streaming evaluation of agent and system scores over decision-log files.
+
+Decision history that does not fit in memory can be scored by streaming it
+from JSONL or CSV files through the same formulas Agent and Hierarchy use.
+Only a few running totals per agent are kept, so memory is independent of
+the length of the history.
+
+Log records carry the fields of a DecisionLogEntry::
+
+    {"decision_id": "d1", "agent_id": "B", "timestamp": 3.0,
+     "directly_made": false, "supervisor_id": "C", "outcome": true,
+     "complexity": 6.5}
+
+Agent records (optional, used for rule counts, instability and
+responsibility) carry ``id``, ``name``, ``capability``, ``supervisor_id``,
+``rule_proposals`` and ``rule_improvements``.
+"""
+
+import csv
+import json
+from collections import namedtuple
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from .peterson_ai_model import (
+    Agent, Hierarchy, PetersonianAISystem, DEFAULT_ETHICAL_RULES,
+    accountability_score, citizenship_score, knowledge_contribution_score,
+    performance_score, referral_responsibility
+)
+
+LogRecord = namedtuple('LogRecord', [
+    'decision_id', 'agent_id', 'timestamp', 'directly_made', 'supervisor_id', 'outcome', 'complexity'
+])
+
+LOG_FIELDS = LogRecord._fields
+AGENT_FIELDS = ('id', 'name', 'capability', 'supervisor_id', 'rule_proposals', 'rule_improvements')
+
+
+def _detect_format(path: str, format: Optional[str]) -> str:
+    if format:
+        return format
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def _parse_bool(value) -> Optional[bool]:
+    """Parse a CSV/JSON boolean; empty values mean unknown"""
+    if value is None or isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('', 'none', 'null'):
+        return None
+    return text in ('1', 'true', 'yes', 't', 'y')
+
+
+def _optional_str(value) -> Optional[str]:
+    return value if value not in (None, '') else None
+
+
+def _read_rows(path: str, format: Optional[str]) -> Iterator[dict]:
+    if _detect_format(path, format) == 'csv':
+        with open(path, newline='', encoding='utf-8') as handle:
+            yield from csv.DictReader(handle)
+    else:
+        with open(path, encoding='utf-8') as handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def read_log_records(path: str, format: Optional[str] = None) -> Iterator[LogRecord]:
+    """Stream decision-log records from a JSONL or CSV file"""
+    for row in _read_rows(path, format):
+        yield LogRecord(
+            decision_id=str(row.get('decision_id', '')),
+            agent_id=str(row['agent_id']),
+            timestamp=float(row.get('timestamp') or 0.0),
+            directly_made=bool(_parse_bool(row.get('directly_made'))),
+            supervisor_id=_optional_str(row.get('supervisor_id')),
+            outcome=_parse_bool(row.get('outcome')),
+            complexity=float(row.get('complexity') or 0.0)
+        )
+
+
+def read_hierarchy(path: str, format: Optional[str] = None) -> Hierarchy:
+    """Build a Hierarchy (without logs) from a JSONL or CSV file of agents"""
+    hierarchy = Hierarchy()
+    for row in _read_rows(path, format):
+        hierarchy.add_agent(Agent(
+            id=str(row['id']),
+            name=str(row.get('name') or row['id']),
+            capability=float(row['capability']),
+            supervisor_id=_optional_str(row.get('supervisor_id')),
+            rule_proposals=int(row.get('rule_proposals') or 0),
+            rule_improvements=int(row.get('rule_improvements') or 0)
+        ))
+    return hierarchy
+
+
+def iter_log_records(system: PetersonianAISystem) -> Iterator[LogRecord]:
+    """Stream the decision logs of a live system as log records"""
+    for agent in system.hierarchy.agents.values():
+        for log in agent.decision_logs:
+            yield LogRecord(log.decision.id, log.agent_id, log.timestamp, log.directly_made,
+                            log.supervisor_id, log.decision.outcome, log.decision.complexity)
+
+
+def write_log_records(records: Iterable[LogRecord], path: str, format: Optional[str] = None):
+    """Write log records to a JSONL or CSV file"""
+    if _detect_format(path, format) == 'csv':
+        with open(path, 'w', newline='', encoding='utf-8') as handle:
+            writer = csv.writer(handle)
+            writer.writerow(LOG_FIELDS)
+            for record in records:
+                writer.writerow(['' if value is None else value for value in record])
+    else:
+        with open(path, 'w', encoding='utf-8') as handle:
+            for record in records:
+                handle.write(json.dumps(record._asdict()) + '\n')
+
+
+class _AgentTotals:
+    """Running totals for one agent"""
+    __slots__ = ('decisions', 'positive', 'responsibility')
+
+    def __init__(self):
+        self.decisions = 0
+        self.positive = 0
+        self.responsibility = 0.0
+
+
+class StreamingEvaluator:
+    """Accumulates per-agent totals from a stream of log records
+
+    When a hierarchy is given, its agents' rule counts feed the knowledge
+    contribution, responsibility is computed from hierarchical distances
+    and the hierarchy's instability is reported.
+    """
+
+    def __init__(self, hierarchy: Optional[Hierarchy] = None):
+        self.hierarchy = hierarchy
+        self.totals: Dict[str, _AgentTotals] = {}
+        self.decisions = 0
+        if hierarchy is not None:
+            for agent_id in hierarchy.agents:
+                self.totals[agent_id] = _AgentTotals()
+
+    def feed(self, records: Iterable[LogRecord]) -> 'StreamingEvaluator':
+        """Consume log records, keeping only running totals"""
+        totals = self.totals
+        distance = None
+        if self.hierarchy is not None:
+            distance = self.hierarchy.get_index(with_capabilities=False).distance
+        for record in records:
+            agent_totals = totals.get(record.agent_id)
+            if agent_totals is None:
+                agent_totals = totals[record.agent_id] = _AgentTotals()
+            agent_totals.decisions += 1
+            if record.outcome:
+                agent_totals.positive += 1
+            if record.directly_made or not record.supervisor_id or distance is None:
+                agent_totals.responsibility += 1.0
+            else:
+                agent_totals.responsibility += referral_responsibility(
+                    distance(record.agent_id, record.supervisor_id))
+            self.decisions += 1
+        return self
+
+    def _rule_activity(self, agent_id: str) -> Tuple[int, int, bool]:
+        agent = self.hierarchy.agents.get(agent_id) if self.hierarchy is not None else None
+        if agent is None:
+            return 0, 0, bool(DEFAULT_ETHICAL_RULES)
+        return agent.rule_proposals, agent.rule_improvements, bool(agent.ethical_rules)
+
+    def agent_scores(self) -> Dict[str, Dict[str, float]]:
+        """Performance, accountability, knowledge contribution and citizenship per agent"""
+        scores = {}
+        for agent_id, totals in self.totals.items():
+            proposals, improvements, has_rules = self._rule_activity(agent_id)
+            performance = performance_score(totals.positive, totals.decisions)
+            scores[agent_id] = {
+                'decisions': totals.decisions,
+                'performance': performance,
+                'accountability': accountability_score(totals.decisions, totals.decisions),
+                'knowledge_contribution': knowledge_contribution_score(performance, proposals, improvements),
+                'mean_responsibility': totals.responsibility / totals.decisions if totals.decisions else 0.0,
+                'has_ethical_rules': has_rules,
+            }
+        max_knowledge = max((score['knowledge_contribution'] for score in scores.values()), default=0.0)
+        for score in scores.values():
+            score['citizenship'] = citizenship_score(score['knowledge_contribution'], max_knowledge,
+                                                     score.pop('has_ethical_rules'))
+        return scores
+
+    def system_scores(self, agent_scores: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, float]:
+        """System-wide aggregates of the per-agent scores"""
+        if agent_scores is None:
+            agent_scores = self.agent_scores()
+        count = len(agent_scores)
+
+        def mean(name):
+            return sum(score[name] for score in agent_scores.values()) / count if count else 0.0
+
+        summary = {
+            'decisions': self.decisions,
+            'agents': count,
+            'max_knowledge_contribution': max(
+                (score['knowledge_contribution'] for score in agent_scores.values()), default=0.0),
+            'mean_performance': mean('performance'),
+            'mean_accountability': mean('accountability'),
+            'mean_citizenship': mean('citizenship'),
+        }
+        if self.hierarchy is not None:
+            summary['instability'] = self.hierarchy.calculate_instability()
+            summary['valid'] = self.hierarchy.is_valid()
+        return summary
+
+
+def evaluate_files(log_paths: Iterable[str], agents_path: Optional[str] = None,
+                   format: Optional[str] = None) -> Dict[str, dict]:
+    """Score one or more decision-log files in a single streaming pass"""
+    hierarchy = read_hierarchy(agents_path) if agents_path else None
+    evaluator = StreamingEvaluator(hierarchy)
+    for path in log_paths:
+        evaluator.feed(read_log_records(path, format))
+    agent_scores = evaluator.agent_scores()
+    return {'agents': agent_scores, 'system': evaluator.system_scores(agent_scores)}
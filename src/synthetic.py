@@ -0,0 +1,112 @@
+"""
+Seeded generators for synthetic hierarchies and decision streams.
+
+Used by the benchmark suite and simulations to build reproducible
+workloads: the same arguments and seed always produce the same agents and
+the same decisions.
+"""
+
+import random
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from .peterson_ai_model import Agent, Decision, Hierarchy, PetersonianAISystem
+
+COMPLEXITY_DISTRIBUTIONS = ('uniform', 'normal', 'exponential', 'bimodal')
+
+
+def generate_agents(size: int, fan_out: int = 4, depth: Optional[int] = None,
+                    max_capability: float = 10.0, jitter: float = 0.5,
+                    seed: int = 0) -> List[Agent]:
+    """Generate a single-rooted hierarchy of ``size`` agents
+
+    Every agent gets a supervisor chosen at random among the agents that
+    have fewer than ``fan_out`` subordinates and sit above ``depth`` (when
+    given).  Capabilities fall off linearly with depth, plus up to
+    ``jitter`` of noise, so deep hierarchies contain some violating edges.
+    Agents are returned supervisors first.
+    """
+    if size < 1:
+        return []
+    if fan_out < 1:
+        raise ValueError("fan_out must be at least 1")
+    rng = random.Random(seed)
+    parents = [-1]
+    depths = [0]
+    children = [0]
+    open_slots = [0]  # agents that can still take a subordinate
+    for node in range(1, size):
+        if not open_slots:
+            raise ValueError(f"Cannot fit {size} agents with fan-out {fan_out} and depth {depth}")
+        slot = rng.randrange(len(open_slots))
+        parent = open_slots[slot]
+        parents.append(parent)
+        depths.append(depths[parent] + 1)
+        children.append(0)
+        children[parent] += 1
+        if children[parent] >= fan_out:
+            open_slots[slot] = open_slots[-1]
+            open_slots.pop()
+        if depth is None or depths[node] < depth:
+            open_slots.append(node)
+
+    levels = max(depths) + 1
+    agents = []
+    for node in range(size):
+        base = max_capability * (1.0 - depths[node] / (levels + 1))
+        agents.append(Agent(
+            id=f"agent-{node}",
+            name=f"Agent {node}",
+            capability=max(0.0, base + rng.uniform(-jitter, jitter)),
+            supervisor_id=f"agent-{parents[node]}" if parents[node] >= 0 else None
+        ))
+    return agents
+
+
+def generate_system(size: int, fan_out: int = 4, depth: Optional[int] = None,
+                    seed: int = 0, **options) -> PetersonianAISystem:
+    """A PetersonianAISystem populated by generate_agents"""
+    system = PetersonianAISystem()
+    system.hierarchy = Hierarchy.from_agents(
+        generate_agents(size, fan_out=fan_out, depth=depth, seed=seed, **options))
+    return system
+
+
+def _complexity(rng: random.Random, distribution: str, max_complexity: float) -> float:
+    if distribution == 'uniform':
+        value = rng.uniform(0.0, max_complexity)
+    elif distribution == 'normal':
+        value = rng.gauss(max_complexity / 2, max_complexity / 6)
+    elif distribution == 'exponential':
+        value = rng.expovariate(4.0 / max_complexity)
+    elif distribution == 'bimodal':
+        centre = max_complexity * (0.25 if rng.random() < 0.7 else 0.85)
+        value = rng.gauss(centre, max_complexity / 12)
+    else:
+        raise ValueError(f"Unknown complexity distribution {distribution!r}; "
+                         f"expected one of {', '.join(COMPLEXITY_DISTRIBUTIONS)}")
+    return min(max(value, 0.0), max_complexity)
+
+
+def generate_decisions(count: int, agent_ids: Sequence[str], distribution: str = 'uniform',
+                       max_complexity: float = 11.0, positive_rate: float = 0.6,
+                       seed: int = 0) -> Iterator[Tuple[Decision, str]]:
+    """Yield ``(decision, initial_agent_id)`` pairs
+
+    Complexities are drawn from ``distribution`` and clipped to
+    ``[0, max_complexity]``; entry agents are drawn uniformly from
+    ``agent_ids`` (pass the leaves to model work arriving at the bottom).
+    """
+    rng = random.Random(seed)
+    for n in range(count):
+        complexity = _complexity(rng, distribution, max_complexity)
+        draw = rng.random()
+        outcome = None if draw >= 0.9 else draw < positive_rate * 0.9
+        yield (Decision(id=f"decision-{n}", description="Synthetic decision",
+                        complexity=complexity, outcome=outcome),
+               agent_ids[rng.randrange(len(agent_ids))])
+
+
+def leaf_ids(agents: Sequence[Agent]) -> List[str]:
+    """Ids of the agents that supervise nobody"""
+    supervisors = {agent.supervisor_id for agent in agents}
+    return [agent.id for agent in agents if agent.id not in supervisors]
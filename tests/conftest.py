@@ -0,0 +1,113 @@
+"""
+Shared builders for the test suite, exposed as fixtures
+
+Each fixture returns a factory, so a test can build as many systems or
+decision streams as it compares.
+"""
+
+import random
+
+import pytest
+
+from src.peterson_ai_model import PetersonianAISystem, Agent, Decision
+from src.synthetic import generate_system, generate_decisions, leaf_ids
+
+# The small organization most tests route through: a CEO above a manager
+# above two juniors, as (id, name, capability, supervisor_id) rows
+ORGANIZATION = (
+    ("A", "CEO", 10.0, None),
+    ("B", "Manager", 7.0, "A"),
+    ("C", "Junior", 4.0, "B"),
+    ("D", "Junior", 3.0, "B"),
+)
+
+
+def make_system(agents=ORGANIZATION, **options) -> PetersonianAISystem:
+    """A system (``options`` go to PetersonianAISystem) with agents given as rows or Agent objects"""
+    system = PetersonianAISystem(**options)
+    for agent in agents:
+        system.add_agent(agent if isinstance(agent, Agent) else Agent(*agent))
+    return system
+
+
+def make_random_system(seed, size=150, dangling=0.03, **options) -> PetersonianAISystem:
+    """A random forest of agents a0..a{size-1}; a ``dangling`` share report to unregistered supervisors"""
+    rng = random.Random(seed)
+    system = PetersonianAISystem(**options)
+    for i in range(size):
+        supervisor_id = None
+        if i > 0:
+            supervisor_id = f"ghost-{i}" if rng.random() < dangling else f"a{rng.randrange(i)}"
+        system.add_agent(Agent(id=f"a{i}", name=f"Agent {i}", capability=rng.uniform(0, 10),
+                               supervisor_id=supervisor_id))
+    return system
+
+
+def make_synthetic_system(size, decisions=0, seed=0, log_store=None, **options) -> PetersonianAISystem:
+    """A generate_system hierarchy with ``decisions`` generated decisions routed from its leaves"""
+    system = generate_system(size, seed=seed, **options)
+    if log_store is not None:
+        system.log_store = log_store
+        for agent in system.hierarchy.agents.values():
+            system._attach_log_store(agent)
+    leaves = leaf_ids(list(system.hierarchy.agents.values()))
+    for decision, agent_id in generate_decisions(decisions, leaves, seed=seed + 1):
+        system.route_decision(decision, agent_id)
+    return system
+
+
+def make_decision_stream(seed, entry_ids, count, prefix="d", descriptions=("Task",)):
+    """``count`` (decision, entry_id) pairs with random complexities, outcomes and entry agents"""
+    rng = random.Random(seed)
+    return [(Decision(id=f"{prefix}{n}", description=rng.choice(descriptions), complexity=rng.uniform(0, 11),
+                      outcome=rng.choice([True, False, None])), rng.choice(entry_ids))
+            for n in range(count)]
+
+
+def route_stream(system, seed, entry_ids, count, **options):
+    """Route a make_decision_stream one decision at a time and return the decisions"""
+    decisions = []
+    for decision, agent_id in make_decision_stream(seed, entry_ids, count, **options):
+        system.route_decision(decision, agent_id)
+        decisions.append(decision)
+    return decisions
+
+
+def signature(system):
+    """Every agent's log as plain tuples, for comparing systems"""
+    return {
+        agent_id: [(log.decision.id, log.decision.description, log.decision.complexity, log.decision.outcome,
+                    log.agent_id, log.timestamp, log.directly_made, log.supervisor_id)
+                   for log in agent.decision_logs]
+        for agent_id, agent in system.hierarchy.agents.items()
+    }
+
+
+@pytest.fixture
+def build_system():
+    return make_system
+
+
+@pytest.fixture
+def random_system():
+    return make_random_system
+
+
+@pytest.fixture
+def synthetic_system():
+    return make_synthetic_system
+
+
+@pytest.fixture
+def decision_stream():
+    return make_decision_stream
+
+
+@pytest.fixture
+def routed():
+    return route_stream
+
+
+@pytest.fixture
+def log_signature():
+    return signature
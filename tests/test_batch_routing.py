@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests for vectorized batch routing (PetersonianAISystem.route_decisions)
+"""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.peterson_ai_model import Decision
+from src.log_store import ColumnarLogStore
+from src.retention import LastN
+
+
+def make_stream(decision_stream, seed, agent_ids, count=500):
+    decisions, initial_ids = zip(*decision_stream(seed, agent_ids, count))
+    return list(decisions), list(initial_ids)
+
+
+def test_batch_matches_sequential_routing(log_signature, random_system, decision_stream):
+    looped = random_system(3)
+    batched = random_system(3)
+    decisions, initial_ids = make_stream(decision_stream, 5, list(looped.hierarchy.agents))
+
+    expected = [looped.route_decision(decision, agent_id)
+                for decision, agent_id in zip(decisions, initial_ids)]
+    results = batched.route_decisions(decisions[:200], initial_ids[:200])
+    results += batched.route_decisions(decisions[200:], initial_ids[200:])
+
+    assert [(handler_id, log.timestamp, log.directly_made, log.supervisor_id) for handler_id, log in results] == \
+        [(handler_id, log.timestamp, log.directly_made, log.supervisor_id) for handler_id, log in expected]
+    assert batched.timestamp == looped.timestamp
+    assert log_signature(batched) == log_signature(looped)
+
+
+@pytest.mark.parametrize("make_store", [lambda: None, ColumnarLogStore])
+def test_batch_bookkeeping_matches_sequential_routing(make_store, log_signature, random_system, decision_stream):
+    looped = random_system(4, log_store=make_store())
+    batched = random_system(4, log_store=make_store())
+    for system in (looped, batched):
+        system.hierarchy.agents["a0"].set_retention_policy(LastN(5))
+        system.hierarchy.agents["a1"].track_recent_decisions(8)
+    looped_decisions, initial_ids = make_stream(decision_stream, 6, list(looped.hierarchy.agents))
+    for decision, agent_id in zip(looped_decisions, initial_ids):
+        looped.route_decision(decision, agent_id)
+    batched_decisions, initial_ids = make_stream(decision_stream, 6, list(batched.hierarchy.agents))
+    batched.route_decisions(batched_decisions, initial_ids)
+
+    # Outcomes set afterwards must reach plain, columnar, retained and windowed logs alike
+    for decisions in (looped_decisions, batched_decisions):
+        for decision in decisions[::3]:
+            decision.outcome = True
+    assert log_signature(batched) == log_signature(looped)
+    for agent_id, agent in batched.hierarchy.agents.items():
+        reference = looped.hierarchy.agents[agent_id]
+        assert (agent.decision_count, agent.positive_outcome_count) == \
+            (reference.decision_count, reference.positive_outcome_count)
+    assert batched.hierarchy.agents["a1"].calculate_windowed_performance() == \
+        looped.hierarchy.agents["a1"].calculate_windowed_performance()
+    assert batched.get_max_knowledge_contribution() == looped.get_max_knowledge_contribution()
+
+
+def test_batch_after_capability_change(random_system, decision_stream):
+    system = random_system(9, size=60)
+    reference = random_system(9, size=60)
+    decisions, initial_ids = make_stream(decision_stream, 10, list(system.hierarchy.agents), count=100)
+    system.route_decisions(decisions, initial_ids)
+
+    for target in (system, reference):
+        target.hierarchy.agents["a0"].capability = 0.5
+        target.hierarchy.agents["a1"].capability = 10.5
+    decisions, initial_ids = make_stream(decision_stream, 11, list(system.hierarchy.agents), count=100)
+    results = system.route_decisions(decisions, initial_ids)
+    for (handler_id, _), decision, agent_id in zip(results, decisions, initial_ids):
+        assert handler_id == reference.route_decision(decision, agent_id)[0]
+
+
+def test_empty_and_mismatched_batches(random_system):
+    system = random_system(1, size=5)
+    assert system.route_decisions([], []) == []
+    assert system.timestamp == 0.0
+    with pytest.raises(ValueError):
+        system.route_decisions([Decision(id="x", description="Task", complexity=1.0)], [])
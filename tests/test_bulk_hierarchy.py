@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for bulk hierarchy construction
+"""
+
+import random
+
+import pytest
+
+from src.peterson_ai_model import Agent, Hierarchy
+
+
+def random_agents(seed, count=300):
+    rng = random.Random(seed)
+    return [Agent(id=f"a{n}", name=f"Agent {n}", capability=rng.uniform(0, 10),
+                  supervisor_id=f"a{rng.randrange(n)}" if n else None)
+            for n in range(count)]
+
+
+def test_bulk_construction_matches_incremental_construction():
+    agents = random_agents(1)
+    incremental = Hierarchy()
+    for agent in random_agents(1):
+        incremental.add_agent(agent)
+    bulk = Hierarchy.from_agents(agents)
+
+    assert bulk.edges == incremental.edges
+    assert bulk.is_valid() == incremental.is_valid()
+    assert sorted(bulk.violating_edges()) == sorted(incremental.violating_edges())
+    assert bulk.calculate_instability() == pytest.approx(incremental.calculate_instability())
+    assert bulk.get_max_knowledge_contribution() == incremental.get_max_knowledge_contribution()
+    index = bulk.get_index()
+    assert index.order[0] == index.positions["a0"]
+    for agent_id in ("a17", "a250"):
+        assert bulk.get_distance(agent_id, "a0") == incremental.get_distance(agent_id, "a0")
+
+    # Incremental maintenance continues from the bulk state
+    agents[5].capability = 100.0
+    incremental.agents["a5"].capability = 100.0
+    assert sorted(bulk.violating_edges()) == sorted(incremental.violating_edges())
+
+
+def test_arrays_and_edge_lists():
+    from_arrays = Hierarchy.from_arrays(["A", "B", "C"], [10.0, 7.0, 8.0], [None, "A", "B"])
+    from_edges = Hierarchy.from_edge_list({"A": 10.0, "B": 7.0, "C": 8.0}, [("B", "A"), ("C", "B")],
+                                          names={"A": "CEO"})
+    assert from_arrays.edges == from_edges.edges == {"B": "A", "C": "B"}
+    assert from_arrays.violating_edges() == [("C", "B")]
+    assert from_edges.agents["A"].name == "CEO"
+    assert from_edges.get_index().depth[from_edges.get_index().positions["C"]] == 2
+
+    with pytest.raises(ValueError, match="more than one supervisor"):
+        Hierarchy.from_edge_list({"A": 1.0, "B": 1.0, "C": 1.0}, [("C", "A"), ("C", "B")])
+
+
+def test_rejects_cycles_dangling_supervisors_and_duplicates():
+    with pytest.raises(ValueError, match="cycle"):
+        Hierarchy.from_arrays(["A", "B", "C", "D"], [1.0] * 4, [None, "C", "D", "B"])
+    with pytest.raises(ValueError, match="cycle"):
+        Hierarchy.from_arrays(["A"], [1.0], ["A"])
+    with pytest.raises(ValueError, match="not in the hierarchy"):
+        Hierarchy.from_arrays(["A", "B"], [1.0, 1.0], [None, "X"])
+    with pytest.raises(ValueError, match="Duplicate"):
+        Hierarchy.from_arrays(["A", "A"], [1.0, 1.0], [None, None])
+
+    hierarchy = Hierarchy.from_arrays(["A", "B"], [1.0, 1.0], [None, "X"], allow_dangling=True)
+    assert hierarchy.get_distance("B", "X") == 1
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests for capability updates and incremental rebalancing
+"""
+
+import random
+
+from src.peterson_ai_model import PetersonianAISystem, Agent, Decision, Hierarchy
+from src.synthetic import generate_agents
+
+
+def test_rebalance_restores_validity_touching_only_changed_paths():
+    rng = random.Random(1)
+    hierarchy = Hierarchy.from_agents(generate_agents(400, fan_out=4, jitter=0.0, seed=2))
+    assert hierarchy.is_valid()
+    edge_count = len(hierarchy.edges)
+
+    changed = rng.sample(sorted(hierarchy.agents), 15)
+    for agent_id in changed:
+        hierarchy.agents[agent_id].capability = rng.uniform(0, 12)
+    swaps = hierarchy.rebalance(changed)
+
+    assert hierarchy.is_valid()
+    assert hierarchy.calculate_instability() == 0.0
+    assert len(hierarchy.edges) == edge_count
+    assert len(swaps) <= 15 * max(hierarchy.get_index().depth)
+    for agent_id, supervisor_id in hierarchy.edges.items():
+        assert hierarchy.agents[agent_id].supervisor_id == supervisor_id
+        assert agent_id in hierarchy._children[supervisor_id]
+    # The rebuilt index still routes every agent to a single root
+    index = hierarchy.get_index()
+    assert sum(1 for parent in index.parent if parent < 0) == 1
+
+
+def test_swap_promotes_the_more_capable_subordinate():
+    hierarchy = Hierarchy.from_arrays(["A", "B", "C", "D"], [10.0, 7.0, 4.0, 3.0], [None, "A", "B", "B"])
+    hierarchy.agents["C"].capability = 8.0
+    assert hierarchy.rebalance() == [("C", "B")]
+    assert hierarchy.edges == {"C": "A", "B": "C", "D": "C"}
+    assert hierarchy.get_distance("D", "A") == 2
+
+
+def test_update_capabilities_adjusts_active_agents_from_performance():
+    system = PetersonianAISystem()
+    system.add_agent(Agent(id="A", name="CEO", capability=10.0))
+    system.add_agent(Agent(id="B", name="Manager", capability=7.0, supervisor_id="A"))
+    system.add_agent(Agent(id="C", name="Junior", capability=6.5, supervisor_id="B"))
+    system.add_agent(Agent(id="D", name="Junior", capability=3.0, supervisor_id="B"))
+    for n in range(20):
+        system.route_decision(Decision(id=f"c{n}", description="Task", complexity=1.0, outcome=True), "C")
+    system.route_decision(Decision(id="b0", description="Task", complexity=6.9, outcome=False), "C")
+
+    updated = system.update_capabilities(learning_rate=0.2)
+    assert set(updated) == {"B", "C"}
+    assert updated["C"] == 6.5 * 1.1
+    assert updated["B"] == 7.0 * 0.9
+    # C overtook its supervisor and was promoted
+    assert system.hierarchy.agents["B"].supervisor_id == "C"
+    assert system.hierarchy.is_valid()
+    assert system.update_capabilities() == {}
+
+
+def test_rebalance_random_trees_end_valid():
+    rng = random.Random(11)
+    for trial in range(200):
+        size = rng.randrange(2, 60)
+        capabilities = [rng.uniform(0, 10) for _ in range(size)]
+        supervisors = [None] + [f"a{rng.randrange(n)}" for n in range(1, size)]
+        ids = [f"a{n}" for n in range(size)]
+
+        # Arbitrary starting capabilities, rebalanced as a whole
+        hierarchy = Hierarchy.from_arrays(ids, capabilities, supervisors)
+        hierarchy.rebalance()
+        assert hierarchy.is_valid(), trial
+
+        # Several agents of a valid tree changed at once
+        changed = rng.sample(ids, min(size, rng.randrange(1, 6)))
+        for agent_id in changed:
+            hierarchy.agents[agent_id].capability = rng.uniform(0, 12)
+        hierarchy.rebalance(changed)
+        assert hierarchy.is_valid(), trial
+        assert hierarchy.calculate_instability() == 0.0
+        assert len(hierarchy.edges) == size - 1
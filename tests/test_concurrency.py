@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests for routing from several threads and from asyncio
+"""
+
+import asyncio
+import pickle
+import sys
+import threading
+
+from src.peterson_ai_model import Decision
+from src.log_store import ColumnarLogStore
+from src.async_routing import DecisionIngestionQueue
+from src.concurrency import AtomicClock
+
+
+def check_consistent(system, total):
+    timestamps = []
+    for agent in system.hierarchy.agents.values():
+        logs = list(agent.decision_logs)
+        agent_timestamps = [log.timestamp for log in logs]
+        assert agent_timestamps == sorted(agent_timestamps)
+        timestamps.extend(agent_timestamps)
+        assert agent.decision_count == len(logs)
+        assert agent.positive_outcome_count == sum(1 for log in logs if log.decision.outcome)
+    assert sorted(timestamps) == [float(n) for n in range(total)]
+    assert system.timestamp == float(total)
+
+
+def test_threaded_routing_keeps_logs_and_timestamps_consistent(build_system, decision_stream):
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for log_store in (None, ColumnarLogStore()):
+            system = build_system(log_store=log_store)
+
+            def work(seed):
+                for decision, agent_id in decision_stream(seed, "CD", 250, prefix=f"d{seed}-"):
+                    system.route_decision(decision, agent_id)
+
+            threads = [threading.Thread(target=work, args=(seed,)) for seed in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            check_consistent(system, 8 * 250)
+    finally:
+        sys.setswitchinterval(interval)
+
+
+
+def test_systems_with_locks_pickle_and_keep_routing(build_system, decision_stream):
+    for log_store in (None, ColumnarLogStore()):
+        system = build_system(log_store=log_store)
+        system.enable_instrumentation()
+        system.enable_sketches()
+        system.enable_load_aware_routing()
+        decisions = decision_stream(0, "CD", 100)
+        for decision, agent_id in decisions:
+            system.route_decision(decision, agent_id)
+
+        restored, restored_decisions = pickle.loads(pickle.dumps((system, [d for d, _ in decisions])))
+        check_consistent(restored, 100)
+        restored_decisions[0].outcome = not restored_decisions[0].outcome
+        for decision, agent_id in decision_stream(1, "CD", 100, prefix="d1-"):
+            restored.route_decision(decision, agent_id)
+        check_consistent(restored, 200)
+        assert restored.instrumentation.snapshot()['decisions'] == 200
+        check_consistent(system, 100)
+
+def test_atomic_clock_hands_out_each_timestamp_once():
+    clock = AtomicClock(5.0)
+    assert clock.take() == 5.0
+    assert clock.take_many(3) == [6.0, 7.0, 8.0]
+    assert clock.value == 9.0
+    clock.value = 2.5
+    assert clock.take() == 2.5
+    assert pickle.loads(pickle.dumps(clock)).value == clock.value == 3.5
+
+    taken = []
+    threads = [threading.Thread(target=lambda: taken.extend(clock.take() for _ in range(1000)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(taken) == [3.5 + n for n in range(4000)]
+
+
+def test_ingestion_queue_routes_everything_with_backpressure(build_system, decision_stream):
+    system = build_system()
+    decisions = decision_stream(1, "CD", 500)
+
+    async def run():
+        async with DecisionIngestionQueue(system, maxsize=16, batch_size=8, workers=2) as queue:
+            results = await asyncio.gather(*(queue.submit(decision, agent_id)
+                                             for decision, agent_id in decisions))
+            assert queue.pending == 0
+        direct = await system.route_decision_async(Decision(id="last", description="Task", complexity=1.0), "C")
+        return results, direct
+
+    results, direct = asyncio.run(run())
+    assert [log_entry.decision for _, log_entry in results] == [decision for decision, _ in decisions]
+    assert direct[0] == "C"
+    check_consistent(system, 501)
+
+
+def test_ingestion_queue_fails_only_the_bad_request(build_system):
+    system = build_system()
+
+    async def run():
+        async with DecisionIngestionQueue(system, batch_size=4) as queue:
+            good = await queue.enqueue(Decision(id="ok", description="Task", complexity=1.0), "C")
+            bad = await queue.enqueue(Decision(id="bad", description="Task", complexity=1.0), "missing")
+            return await asyncio.gather(good, bad, return_exceptions=True)
+
+    good, bad = asyncio.run(run())
+    assert good[0] == "C"
+    assert isinstance(bad, KeyError)
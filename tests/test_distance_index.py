@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for index-backed hierarchical distance and bulk responsibility
+"""
+
+import random
+
+from src.peterson_ai_model import Agent, Decision
+from src.log_store import ColumnarLogStore
+
+
+def reference_distance(hierarchy, subordinate_id, supervisor_id):
+    """The original edge-walking get_distance"""
+    distance = 0
+    current_id = subordinate_id
+    while current_id in hierarchy.edges:
+        distance += 1
+        current_id = hierarchy.edges[current_id]
+        if current_id == supervisor_id:
+            return distance
+    return distance
+
+
+def test_distance_matches_edge_walk(random_system):
+    rng = random.Random(1)
+    system = random_system(2, dangling=0.05)
+    hierarchy = system.hierarchy
+    candidates = list(hierarchy.agents) + list(hierarchy.edges.values()) + ["unknown", None]
+    for _ in range(3000):
+        subordinate_id = rng.choice(candidates)
+        supervisor_id = rng.choice(candidates)
+        assert hierarchy.get_distance(subordinate_id, supervisor_id) == \
+            reference_distance(hierarchy, subordinate_id, supervisor_id)
+    for agent_id in hierarchy.agents:
+        assert hierarchy.get_distance(agent_id, agent_id) == reference_distance(hierarchy, agent_id, agent_id)
+
+
+def test_distance_follows_new_agents(random_system):
+    system = random_system(3, size=20, dangling=0.05)
+    system.add_agent(Agent(id="late", name="Late", capability=1.0, supervisor_id="a19"))
+    assert system.hierarchy.get_distance("late", "a19") == 1
+    assert system.hierarchy.get_distance("late", "a0") == reference_distance(system.hierarchy, "late", "a0")
+
+
+def test_bulk_responsibilities_match_per_entry_calculation(random_system):
+    for log_store in (None, ColumnarLogStore()):
+        system = random_system(4, dangling=0.05, log_store=log_store)
+        rng = random.Random(5)
+        agent_ids = list(system.hierarchy.agents)
+        for n in range(400):
+            system.route_decision(Decision(id=f"d{n}", description="Task", complexity=rng.uniform(0, 11)),
+                                  rng.choice(agent_ids))
+
+        responsibilities = system.get_responsibilities()
+        assert set(responsibilities) == set(agent_ids)
+        for agent_id, agent in system.hierarchy.agents.items():
+            expected = [agent.get_responsibility_for_decision(log, system.hierarchy) for log in agent.decision_logs]
+            assert responsibilities[agent_id] == expected
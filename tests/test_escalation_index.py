@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for the jump-pointer escalation index used by route_decision
+"""
+
+import random
+
+from src.peterson_ai_model import PetersonianAISystem, Agent, Decision
+
+
+def reference_route(hierarchy, decision, initial_agent_id):
+    """Walk the supervisor chain one level at a time (the original algorithm)"""
+    current_agent_id = initial_agent_id
+    path = []
+    while True:
+        agent = hierarchy.agents[current_agent_id]
+        path.append(agent.id)
+        if agent.can_handle_decision(decision):
+            supervisor_id = path[-2] if len(path) > 1 else None
+            return agent.id, current_agent_id == initial_agent_id, supervisor_id
+        supervisor = hierarchy.get_supervisor(current_agent_id)
+        if supervisor:
+            current_agent_id = supervisor.id
+        else:
+            return agent.id, False, None
+
+
+def build_random_system(rng, size=200):
+    system = PetersonianAISystem()
+    for i in range(size):
+        supervisor_id = None
+        if i > 0:
+            # Occasionally point at a supervisor that is never registered
+            supervisor_id = f"ghost-{i}" if rng.random() < 0.02 else f"a{rng.randrange(i)}"
+        system.add_agent(Agent(id=f"a{i}", name=f"Agent {i}", capability=rng.uniform(0, 10),
+                               supervisor_id=supervisor_id))
+    return system
+
+
+def assert_matches_reference(system, rng, count=300):
+    agent_ids = list(system.hierarchy.agents)
+    for n in range(count):
+        decision = Decision(id=f"d{n}", description="Task", complexity=rng.uniform(0, 11))
+        initial_agent_id = rng.choice(agent_ids)
+        expected = reference_route(system.hierarchy, decision, initial_agent_id)
+        timestamp = system.timestamp
+        handler_id, log_entry = system.route_decision(decision, initial_agent_id)
+        assert (handler_id, log_entry.directly_made, log_entry.supervisor_id) == expected
+        assert log_entry.agent_id == handler_id
+        assert log_entry.timestamp == timestamp
+        assert system.hierarchy.agents[handler_id].decision_logs[-1] is log_entry
+
+
+def test_matches_linear_walk_on_random_trees():
+    rng = random.Random(7)
+    for _ in range(5):
+        system = build_random_system(rng)
+        assert_matches_reference(system, rng)
+
+
+def test_best_attempt_at_top_of_chain():
+    system = PetersonianAISystem()
+    system.add_agent(Agent(id="A", name="CEO", capability=10.0))
+    system.add_agent(Agent(id="B", name="Manager", capability=7.0, supervisor_id="A"))
+    system.add_agent(Agent(id="C", name="Junior", capability=4.0, supervisor_id="B"))
+
+    handler_id, log_entry = system.route_decision(Decision(id="x", description="Hard", complexity=12.0), "C")
+    assert handler_id == "A"
+    assert log_entry.directly_made is False
+    assert log_entry.supervisor_id is None
+
+    handler_id, log_entry = system.route_decision(Decision(id="y", description="Hard", complexity=12.0), "A")
+    assert handler_id == "A"
+    assert log_entry.directly_made is False
+
+
+def test_index_follows_capability_changes_and_new_agents():
+    rng = random.Random(11)
+    system = build_random_system(rng, size=120)
+    assert_matches_reference(system, rng, count=50)
+
+    for agent in rng.sample(list(system.hierarchy.agents.values()), 30):
+        agent.capability = rng.uniform(0, 10)
+    assert_matches_reference(system, rng, count=100)
+
+    for i in range(120, 160):
+        system.add_agent(Agent(id=f"a{i}", name=f"Agent {i}", capability=rng.uniform(0, 10),
+                               supervisor_id=f"a{rng.randrange(i)}"))
+    assert_matches_reference(system, rng, count=100)
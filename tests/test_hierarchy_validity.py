@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for the incrementally maintained hierarchy validity and instability
+"""
+
+import random
+
+import pytest
+
+from src.peterson_ai_model import Hierarchy, Agent
+
+
+def reference_violations(hierarchy):
+    return sorted(
+        (agent_id, supervisor_id) for agent_id, supervisor_id in hierarchy.edges.items()
+        if hierarchy.agents[supervisor_id].capability < hierarchy.agents[agent_id].capability
+    )
+
+
+def reference_instability(hierarchy):
+    if not hierarchy.edges:
+        return 0.0
+    max_capability = max(agent.capability for agent in hierarchy.agents.values())
+    total = sum(hierarchy.agents[agent_id].capability - hierarchy.agents[supervisor_id].capability
+                for agent_id, supervisor_id in reference_violations(hierarchy))
+    return total / (len(hierarchy.edges) * max_capability) if max_capability > 0 else 0.0
+
+
+def assert_consistent(hierarchy):
+    assert sorted(hierarchy.violating_edges()) == reference_violations(hierarchy)
+    assert hierarchy.is_valid() == (not reference_violations(hierarchy))
+    assert hierarchy.calculate_instability() == pytest.approx(reference_instability(hierarchy), abs=1e-12)
+
+
+def test_validity_tracks_capability_changes():
+    rng = random.Random(8)
+    hierarchy = Hierarchy()
+    assert hierarchy.is_valid()
+    assert hierarchy.calculate_instability() == 0.0
+    for i in range(200):
+        supervisor_id = f"a{rng.randrange(i)}" if i else None
+        hierarchy.add_agent(Agent(id=f"a{i}", name=f"Agent {i}", capability=10.0 - i * 0.04,
+                                  supervisor_id=supervisor_id))
+    assert_consistent(hierarchy)
+    assert hierarchy.is_valid()
+
+    agents = list(hierarchy.agents.values())
+    for step in range(500):
+        rng.choice(agents).capability = rng.uniform(0, 12)
+        if step % 25 == 0:
+            assert_consistent(hierarchy)
+    assert_consistent(hierarchy)
+
+    # Restoring a valid ordering clears every violation
+    for i, agent in enumerate(agents):
+        agent.capability = 10.0 - i * 0.04
+    assert hierarchy.is_valid()
+    assert hierarchy.violating_edges() == []
+    assert hierarchy.calculate_instability() == 0.0
+
+
+def test_supervisor_added_after_subordinates():
+    hierarchy = Hierarchy()
+    hierarchy.add_agent(Agent(id="B", name="Manager", capability=7.0, supervisor_id="A"))
+    hierarchy.add_agent(Agent(id="C", name="Junior", capability=4.0, supervisor_id="B"))
+    assert hierarchy.is_valid()
+
+    hierarchy.add_agent(Agent(id="A", name="CEO", capability=5.0))
+    assert hierarchy.violating_edges() == [("B", "A")]
+    assert hierarchy.calculate_instability() == pytest.approx(2.0 / (2 * 7.0))
+
+    hierarchy.add_agent(Agent(id="A", name="CEO", capability=10.0))
+    assert hierarchy.is_valid()
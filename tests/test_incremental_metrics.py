@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the running metric counters kept on Agent and the incremental
+maximum knowledge contribution
+"""
+
+import random
+
+from src.peterson_ai_model import Decision, DecisionLogEntry
+
+
+def rescanned_performance(agent):
+    if not agent.decision_logs:
+        return 0.0
+    return sum(1 for log in agent.decision_logs if log.decision.outcome) / len(agent.decision_logs)
+
+
+def rescanned_max_knowledge(system):
+    return max(0.5 * rescanned_performance(agent) + 0.3 * agent.rule_proposals + 0.2 * agent.rule_improvements
+               for agent in system.hierarchy.agents.values())
+
+
+def test_counters_follow_routing_and_late_outcomes(build_system):
+    rng = random.Random(4)
+    system = build_system()
+    decisions = []
+    for n in range(200):
+        decision = Decision(id=f"d{n}", description="Task", complexity=rng.uniform(0, 11),
+                            outcome=rng.choice([True, False, None]))
+        system.route_decision(decision, rng.choice("CD"))
+        decisions.append(decision)
+
+    # Outcomes recorded after the fact must be reflected without rescans
+    for decision in rng.sample(decisions, 80):
+        decision.outcome = rng.choice([True, False, None])
+
+    for agent in system.hierarchy.agents.values():
+        assert agent.decision_count == len(agent.decision_logs)
+        assert agent.calculate_performance() == rescanned_performance(agent)
+        assert agent.calculate_accountability() == (1.0 if agent.decision_logs else 0.0)
+    assert system.get_max_knowledge_contribution() == rescanned_max_knowledge(system)
+
+
+
+def test_max_knowledge_follows_routing_between_queries(build_system):
+    rng = random.Random(7)
+    system = build_system()
+    for n in range(300):
+        decision = Decision(id=f"d{n}", description="Task", complexity=rng.uniform(0, 11),
+                            outcome=rng.choice([True, False]))
+        system.route_decision(decision, rng.choice("CD"))
+        if n % 7 == 0:
+            decision.outcome = not decision.outcome
+        if n % 5 == 0:
+            assert system.get_max_knowledge_contribution() == rescanned_max_knowledge(system)
+    assert system.get_max_knowledge_contribution() == rescanned_max_knowledge(system)
+
+def test_max_knowledge_tracks_rule_activity(build_system):
+    system = build_system()
+    assert system.get_max_knowledge_contribution() == 0.0
+
+    system.route_decision(Decision(id="d1", description="Task", complexity=2.0, outcome=True), "D")
+    assert system.get_max_knowledge_contribution() == 0.5
+
+    system.hierarchy.agents["B"].rule_proposals = 3
+    assert system.get_max_knowledge_contribution() == rescanned_max_knowledge(system)
+
+    system.hierarchy.agents["B"].rule_proposals = 0
+    system.hierarchy.agents["C"].rule_improvements = 1
+    assert system.get_max_knowledge_contribution() == rescanned_max_knowledge(system)
+
+
+def test_logs_appended_directly_are_rescanned(build_system):
+    system = build_system()
+    agent = system.hierarchy.agents["C"]
+    system.route_decision(Decision(id="d1", description="Task", complexity=2.0, outcome=False), "C")
+    agent.decision_logs.append(DecisionLogEntry(
+        decision=Decision(id="d2", description="Task", complexity=2.0, outcome=True),
+        agent_id="C", timestamp=99.0, directly_made=True))
+    assert agent.calculate_performance() == 0.5
+
+
+def test_late_outcomes_reach_every_log_of_a_decision(build_system):
+    system = build_system()
+    decision = Decision(id="d1", description="Task", complexity=2.0, outcome=False)
+    system.route_decision(decision, "C")
+    system.route_decision(decision, "D")
+    decision.outcome = True
+    assert system.hierarchy.agents["C"].positive_outcome_count == 1
+    assert system.hierarchy.agents["D"].positive_outcome_count == 1
+
+
+def test_agents_are_queued_again_after_each_capability_update(build_system):
+    system = build_system()
+    for n in range(3):
+        system.route_decision(Decision(id=f"d{n}", description="Task", complexity=2.0, outcome=True), "D")
+        assert system.update_capabilities(rebalance=False).keys() == {"D"}
+        assert system.get_max_knowledge_contribution() == rescanned_max_knowledge(system)
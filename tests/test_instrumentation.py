@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for opt-in routing instrumentation
+"""
+
+import threading
+
+import pytest
+
+from src.instrumentation import RoutingInstrumentation
+from src.peterson_ai_model import Agent, Decision
+
+
+WORKLOAD = [(3.0, "C"), (5.0, "C"), (9.0, "D"), (12.0, "C"), (6.0, "B")]
+
+
+def test_route_decision_records_hops_referrals_and_latency(build_system):
+    system = build_system()
+    assert system.instrumentation is None
+    instrumentation = system.enable_instrumentation()
+    for n, (complexity, agent_id) in enumerate(WORKLOAD):
+        system.route_decision(Decision(id=f"d{n}", description="Task", complexity=complexity), agent_id)
+
+    snapshot = instrumentation.snapshot()
+    assert snapshot['decisions'] == 5
+    assert snapshot['hops'] == {0: 2, 1: 1, 2: 2}
+    assert snapshot['best_attempts'] == 1
+    # Every agent on the way up referred the decision on
+    assert snapshot['referrals_out'] == {"C": 2, "D": 1, "B": 2}
+    assert snapshot['referrals_in'] == {"A": 2, "B": 1}
+    assert snapshot['latency']['count'] == 5
+    assert sum(count for _, count in snapshot['latency']['buckets']) == 5
+    assert instrumentation.hotspots(1) == [("A", 2)]
+
+    text = instrumentation.export_prometheus()
+    assert 'petersonian_decisions_routed_total 5' in text
+    assert 'petersonian_escalation_hops_bucket{le="+Inf"} 5' in text
+    assert 'petersonian_referrals_in_total{agent="A"} 2' in text
+
+    instrumentation.reset()
+    assert instrumentation.snapshot()['decisions'] == 0
+
+
+def test_batch_routing_records_the_same_counters(build_system):
+    pytest.importorskip("numpy")
+    single = build_system()
+    batch = build_system()
+    decisions = [Decision(id=f"d{n}", description="Task", complexity=complexity)
+                 for n, (complexity, _) in enumerate(WORKLOAD)]
+    for decision, (_, agent_id) in zip(decisions, WORKLOAD):
+        single.enable_instrumentation()
+        single.route_decision(decision, agent_id)
+    batch.enable_instrumentation()
+    batch.route_decisions(decisions, [agent_id for _, agent_id in WORKLOAD])
+
+    expected = single.instrumentation.snapshot()
+    actual = batch.instrumentation.snapshot()
+    for key in ('decisions', 'hops', 'best_attempts', 'referrals_in', 'referrals_out'):
+        assert actual[key] == expected[key]
+    assert actual['latency']['count'] == 0
+
+
+def test_threads_record_into_shards_that_snapshot_merges(build_system):
+    system = build_system()
+    instrumentation = system.enable_instrumentation()
+
+    def work(seed):
+        for n, (complexity, agent_id) in enumerate(WORKLOAD * 40):
+            system.route_decision(Decision(id=f"d{seed}-{n}", description="Task", complexity=complexity), agent_id)
+
+    threads = [threading.Thread(target=work, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    snapshot = instrumentation.snapshot()
+    assert snapshot['decisions'] == 8 * 40 * len(WORKLOAD)
+    assert snapshot['hops'] == {hops: 8 * 40 * count for hops, count in {0: 2, 1: 1, 2: 2}.items()}
+    assert snapshot['referrals_out'] == {"C": 8 * 40 * 2, "D": 8 * 40, "B": 8 * 40 * 2}
+    assert snapshot['latency']['count'] == snapshot['decisions']
+
+
+def test_referrers_are_credited_when_read(build_system):
+    system = build_system()
+    instrumentation = system.enable_instrumentation()
+    instrumentation.record_route("C", "A", 2, True)
+    instrumentation.record_route("C", "B", 1, True)
+    instrumentation.record_route("D", "B", 1, True, referrers=["D"])
+    assert instrumentation.snapshot()['referrals_out'] == {"C": 2, "B": 1, "D": 1}
+
+    # Credit follows the hierarchy as it is when the snapshot is taken
+    system.add_agent(Agent(id="E", name="Lead", capability=5.0, supervisor_id="B"))
+    junior = system.hierarchy.agents["C"]
+    junior.supervisor_id = "E"
+    system.add_agent(junior)
+    assert instrumentation.snapshot()['referrals_out'] == {"C": 2, "E": 1, "D": 1}
+
+    standalone = RoutingInstrumentation()
+    standalone.record_route("C", "A", 2, True)
+    assert standalone.snapshot()['referrals_out'] == {"C": 1}
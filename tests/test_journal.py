@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the memory-mapped decision journal
+"""
+
+import random
+
+import pytest
+
+from src.peterson_ai_model import Decision
+from src.journal import DecisionJournal, ROUTED, OUTCOME_UPDATE
+
+
+def test_replay_rebuilds_logs_and_metrics(tmp_path, build_system, routed, log_signature):
+    path = str(tmp_path / "decisions.journal")
+    rng = random.Random(6)
+    with DecisionJournal(path, group_size=32, initial_capacity=16) as journal:
+        original = build_system(journal=journal)
+        decisions = routed(original, 5, "CD", 500, descriptions=("Refund", "Hire"))
+        changed = 0
+        for decision in rng.sample(decisions, 50):
+            outcome = rng.choice([True, False, None])
+            changed += outcome is not decision.outcome
+            decision.outcome = outcome
+        assert len(journal) == 500 + changed
+
+    with DecisionJournal(path) as journal:
+        restored = build_system()
+        journal.replay(restored)
+        assert log_signature(restored) == log_signature(original)
+        assert restored.timestamp == original.timestamp
+        for agent_id, agent in restored.hierarchy.agents.items():
+            assert agent.calculate_performance() == original.hierarchy.agents[agent_id].calculate_performance()
+        assert restored.get_max_knowledge_contribution() == original.get_max_knowledge_contribution()
+
+        # Outcomes set after a replay are journaled against the original record
+        restored.journal = journal
+        replayed = restored.hierarchy.agents["A"].decision_logs[0].decision
+        replayed.outcome = not replayed.outcome
+        journal.commit()
+        update = journal.record(len(journal) - 1)
+        assert update.kind == OUTCOME_UPDATE
+        assert journal.entry(update.agent).decision.id == replayed.id
+
+
+def test_group_commit_and_zero_copy_reads(tmp_path, build_system):
+    path = str(tmp_path / "decisions.journal")
+    with DecisionJournal(path, group_size=10) as journal:
+        system = build_system(journal=journal)
+        for n in range(25):
+            system.route_decision(Decision(id=f"d{n}", description="Task", complexity=2.0), "C")
+        assert len(journal) == 25
+        assert len(list(journal.records())) == 20
+        with pytest.raises(IndexError):
+            journal.record(20)
+
+        journal.commit()
+        record = journal.record(24)
+        assert record.kind == ROUTED
+        assert journal.decision_id(record.decision_id) == "d24"
+        assert record.timestamp == 24.0
+        with journal.view() as raw:
+            assert raw.nbytes == 25 * 56
+
+
+def test_appending_while_records_are_read(tmp_path, build_system):
+    path = str(tmp_path / "decisions.journal")
+    with DecisionJournal(path, group_size=1, initial_capacity=4) as journal:
+        system = build_system(journal=journal)
+        for n in range(4):
+            system.route_decision(Decision(id=f"d{n}", description="Task", complexity=2.0), "C")
+        records = journal.records()
+        first = next(records)
+        with journal.view() as raw:
+            # Both outlive the mapping being grown several times over
+            for n in range(4, 100):
+                system.route_decision(Decision(id=f"d{n}", description="Task", complexity=2.0), "C")
+            assert raw.nbytes == 4 * 56
+            assert bytes(raw[:1]) == bytes([ROUTED])
+        remaining = list(records)
+        assert [journal.decision_id(record.decision_id) for record in [first] + remaining] == \
+            ["d0", "d1", "d2", "d3"]
+        assert len(journal) == 100
+        assert journal.entry(99).decision.id == "d99"
+        assert sum(len(agent.decision_logs) for agent in system.hierarchy.agents.values()) == 100
+
+
+def test_decision_ids_are_not_interned(tmp_path, build_system):
+    path = str(tmp_path / "decisions.journal")
+    with DecisionJournal(path) as journal:
+        system = build_system(journal=journal)
+        for n in range(500):
+            system.route_decision(Decision(id=f"decision-{n}", description="Task", complexity=2.0), "C")
+        # Only agent ids and descriptions are in the string table
+        assert len(journal.strings) <= len(system.hierarchy.agents) + 1
+
+    with DecisionJournal(path) as journal:
+        assert [journal.entry(n).decision.id for n in (0, 250, 499)] == \
+            ["decision-0", "decision-250", "decision-499"]
+
+
+def test_rejects_foreign_files(tmp_path):
+    path = tmp_path / "not-a-journal"
+    path.write_bytes(b"x" * 128)
+    with pytest.raises(ValueError):
+        DecisionJournal(str(path))
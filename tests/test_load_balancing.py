@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for load-aware routing
+"""
+
+import pytest
+
+from benchmarks.load_balancing import simulate
+from src.load_balancing import LoadTracker
+from src.peterson_ai_model import Decision
+
+# Two equally capable managers under the CEO, the first with two juniors
+ORGANIZATION = (
+    ("A", "CEO", 10.0, None),
+    ("B1", "Manager", 8.0, "A"),
+    ("B2", "Manager", 8.0, "A"),
+    ("B3", "Manager", 5.0, "A"),
+    ("C1", "Junior", 3.0, "B1"),
+    ("C2", "Junior", 3.0, "B1"),
+)
+
+
+def test_idle_system_routes_like_strict_escalation(build_system):
+    strict, aware = build_system(ORGANIZATION), build_system(ORGANIZATION)
+    aware.enable_load_aware_routing()
+    for n, complexity in enumerate([1.0, 6.0, 9.0, 12.0]):
+        expected = strict.route_decision(Decision(id=f"d{n}", description="Task", complexity=complexity), "C1")
+        aware.load_tracker.reset()
+        actual = aware.route_decision(Decision(id=f"d{n}", description="Task", complexity=complexity), "C1")
+        assert actual[0] == expected[0]
+        assert actual[1].supervisor_id == expected[1].supervisor_id
+        assert actual[1].directly_made == expected[1].directly_made
+
+
+def test_escalations_spread_over_capable_peers(build_system):
+    system = build_system(ORGANIZATION)
+    tracker = system.enable_load_aware_routing(levels=2)
+    handlers = [system.route_decision(Decision(id=f"d{n}", description="Task", complexity=6.0), "C1")
+                for n in range(6)]
+    # B3 is not capable; A one level up takes its share
+    assert sorted(handler for handler, _ in handlers) == ["A", "A", "B1", "B1", "B2", "B2"]
+    for handler, log_entry in handlers:
+        assert log_entry.supervisor_id == ("C1" if handler in ("B1", "B2") else "B1")
+        assert not log_entry.directly_made
+    assert tracker.snapshot()["B2"] == {'queued': 2, 'in_flight': 0}
+
+    # Work the entry agent could do itself may move to an idle sibling
+    _, log_entry = system.route_decision(Decision(id="easy", description="Task", complexity=1.0), "C1")
+    assert log_entry.directly_made
+    _, log_entry = system.route_decision(Decision(id="easy2", description="Task", complexity=1.0), "C1")
+    assert log_entry.agent_id == "C2" and log_entry.supervisor_id == "C1"
+    assert not log_entry.directly_made
+
+    # Batch routing falls back to sequential load-aware routing
+    results = system.route_decisions([Decision(id=f"b{n}", description="Task", complexity=6.0) for n in range(3)],
+                                     ["C2"] * 3)
+    assert [handler for handler, _ in results] == ["B1", "B2", "A"]
+
+
+
+def test_peer_hand_offs_count_as_hops(build_system):
+    system = build_system(ORGANIZATION)
+    system.enable_load_aware_routing(levels=2)
+    instrumentation = system.enable_instrumentation()
+    sketches = system.enable_sketches()
+    for n in range(2):
+        system.route_decision(Decision(id=f"easy{n}", description="Task", complexity=1.0), "C1")
+    for n in range(6):
+        system.route_decision(Decision(id=f"d{n}", description="Task", complexity=6.0), "C1")
+
+    snapshot = instrumentation.snapshot()
+    # C1 itself (0), C2 beside it (1); B1 and B2 one level up, A two levels up
+    assert snapshot["hops"] == {0: 1, 1: 5, 2: 2}
+    assert snapshot["referrals_in"] == {"C2": 1, "B1": 2, "B2": 2, "A": 2}
+    assert snapshot["referrals_out"]["C1"] == 7
+    assert sketches.agents["C1"].escalation_depth.count == 8
+    assert sketches.agents["C1"].escalation_depth.quantile(1.0) == pytest.approx(2.0, rel=0.05)
+
+def test_tracker_moves_work_through_queue_and_flight():
+    tracker = LoadTracker()
+    tracker.assign("A", 3)
+    assert tracker.start("A", 2) == 2
+    assert tracker.start("A", 5) == 1
+    assert tracker.load("A") == 3
+    tracker.finish("A", 3)
+    assert tracker.load("A") == 0 and tracker.snapshot() == {}
+    with pytest.raises(ValueError):
+        tracker.finish("A")
+    with pytest.raises(ValueError):
+        LoadTracker(levels=0)
+
+
+def test_load_aware_routing_completes_more_work():
+    config = {'agents': 300, 'fan_out': 4, 'ticks': 60, 'arrivals': 60, 'service_rate': 1,
+              'levels': 2, 'complexity': 'uniform', 'seed': 1}
+    strict, aware = simulate(config, False), simulate(config, True)
+    assert aware['completed'] > strict['completed']
+    assert aware['mean_wait_ticks'] < strict['mean_wait_ticks']
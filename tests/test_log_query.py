@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for indexed decision log queries
+"""
+
+import pytest
+
+from src.log_query import DecisionLogIndex
+from src.log_store import ColumnarLogStore
+from src.peterson_ai_model import Agent
+from src.synthetic import leaf_ids
+
+
+def subtree_ids(system, root):
+    members = set()
+    for agent_id in system.hierarchy.agents:
+        current = agent_id
+        while current is not None and current != root:
+            current = system.hierarchy.edges.get(current)
+        if current == root:
+            members.add(agent_id)
+    return members
+
+
+def brute_force(system, root, start, end, outcomes, low, high):
+    members = subtree_ids(system, root)
+    return sorted(
+        (log.agent_id, log.decision.id)
+        for agent_id in members
+        for log in system.hierarchy.agents[agent_id].decision_logs
+        if start <= log.timestamp < end and log.decision.outcome in outcomes
+        and low <= log.decision.complexity <= high
+    )
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_queries_match_a_full_scan(columnar, synthetic_system):
+    system = synthetic_system(120, 1500, seed=5, log_store=ColumnarLogStore() if columnar else None, fan_out=3)
+    index = DecisionLogIndex(system)
+    assert len(index) == sum(len(agent.decision_logs) for agent in system.hierarchy.agents.values())
+
+    for root in ("agent-0", "agent-1", "agent-5"):
+        found = index.find(subtree=root, start=300, end=1200, outcomes=(False,), min_complexity=7.0)
+        assert sorted((log.agent_id, log.decision.id) for log in found) == \
+            brute_force(system, root, 300, 1200, (False,), 7.0, float("inf"))
+        assert index.count(subtree=root, start=300, end=1200, outcomes=(False,), min_complexity=7.0) == len(found)
+        assert index.count(subtree=root, min_complexity=2.5, max_complexity=4.5) == \
+            len(brute_force(system, root, 0, float("inf"), (True, False, None), 2.5, 4.5))
+
+
+def test_rollups_match_per_agent_counts(synthetic_system):
+    system = synthetic_system(120, 1500, seed=5, fan_out=3)
+    index = DecisionLogIndex(system)
+    logs = [log for agent_id in subtree_ids(system, "agent-1")
+            for log in system.hierarchy.agents[agent_id].decision_logs if 100 <= log.timestamp < 900]
+    rollup = index.rollup("agent-1", start=100, end=900)
+    assert rollup["decisions"] == len(logs)
+    assert rollup["positive"] == sum(1 for log in logs if log.decision.outcome is True)
+    assert rollup["performance"] == pytest.approx(rollup["positive"] / len(logs))
+    assert rollup["accountability"] == 1.0
+
+    whole = index.rollup()
+    assert whole["decisions"] == len(index)
+    assert index.rollup("agent-1", start=10**9)["decisions"] == 0
+    assert index.rollup("agent-1", start=10**9)["performance"] == 0.0
+
+
+def test_refresh_picks_up_new_outcomes(synthetic_system):
+    system = synthetic_system(120, 1500, seed=5, fan_out=3)
+    index = DecisionLogIndex(system)
+    log = next(iter(system.hierarchy.agents[leaf_ids(list(system.hierarchy.agents.values()))[0]].decision_logs))
+    before = index.count(outcomes=(True,))
+    log.decision.outcome = not log.decision.outcome
+    index.refresh()
+    assert index.count(outcomes=(True,)) == before + (1 if log.decision.outcome else -1)
+    with pytest.raises(ValueError):
+        DecisionLogIndex(system, complexity_bucket_width=0)
+
+
+def test_queries_use_the_snapshot_after_hierarchy_changes(synthetic_system):
+    system = synthetic_system(120, 1500, seed=5, log_store=ColumnarLogStore(), fan_out=3)
+    index = DecisionLogIndex(system)
+    before = {root: index.find(subtree=root) for root in ("agent-0", "agent-1", "agent-5")}
+
+    for n in range(10):
+        system.add_agent(Agent(id=f"late-{n}", name=f"Late {n}", capability=1.0, supervisor_id="agent-1"))
+    leaf = system.hierarchy.agents[leaf_ids(list(system.hierarchy.agents.values()))[0]]
+    leaf.capability = 100.0
+    system.hierarchy.rebalance([leaf.id])
+
+    for root, found in before.items():
+        assert index.find(subtree=root) == found
+        assert index.count(subtree=root) == len(found)
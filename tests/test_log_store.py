@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for the columnar decision log store
+"""
+
+import random
+
+from src.peterson_ai_model import PetersonianAISystem, Agent, Decision
+from src.log_store import ColumnarLogStore, DecisionLogView
+
+
+DESCRIPTIONS = ("Refund", "Audit", "Hire")
+
+
+def test_store_backed_logs_match_list_logs(build_system, routed, log_signature):
+    plain = build_system()
+    columnar = build_system(log_store=ColumnarLogStore())
+    plain_decisions = routed(plain, 1, "CD", 300, descriptions=DESCRIPTIONS)
+    columnar_decisions = routed(columnar, 1, "CD", 300, descriptions=DESCRIPTIONS)
+
+    rng = random.Random(2)
+    for i in rng.sample(range(len(plain_decisions)), 100):
+        outcome = rng.choice([True, False, None])
+        plain_decisions[i].outcome = outcome
+        columnar_decisions[i].outcome = outcome
+
+    assert log_signature(columnar) == log_signature(plain)
+    for agent_id, agent in columnar.hierarchy.agents.items():
+        assert isinstance(agent.decision_logs, DecisionLogView)
+        reference = plain.hierarchy.agents[agent_id]
+        assert agent.calculate_performance() == reference.calculate_performance()
+        assert agent.calculate_accountability() == reference.calculate_accountability()
+    assert columnar.get_max_knowledge_contribution() == plain.get_max_knowledge_contribution()
+    assert len(columnar.log_store) == 300
+    # Only the repeated strings are interned
+    assert sorted(columnar.log_store.strings) == ["A", "Audit", "B", "C", "D", "Hire", "Refund"]
+
+
+def test_views_index_and_slice_like_lists(build_system, routed):
+    system = build_system(log_store=ColumnarLogStore())
+    routed(system, 3, "CD", 20, descriptions=DESCRIPTIONS)
+    logs = system.hierarchy.agents["C"].decision_logs
+    assert [log.timestamp for log in logs[-2:]] == [log.timestamp for log in list(logs)[-2:]]
+    assert logs[0].agent_id == "C"
+    assert bool(system.hierarchy.agents["A"].decision_logs) == (len(system.hierarchy.agents["A"].decision_logs) > 0)
+
+
+def test_existing_logs_are_adopted_by_the_store():
+    store = ColumnarLogStore()
+    agent = Agent(id="solo", name="Solo", capability=5.0)
+    staging = PetersonianAISystem()
+    staging.add_agent(agent)
+    decision = Decision(id="d0", description="Task", complexity=1.0, outcome=False)
+    staging.route_decision(decision, "solo")
+
+    system = PetersonianAISystem(log_store=store)
+    system.add_agent(agent)
+    assert isinstance(agent.decision_logs, DecisionLogView)
+    assert agent.decision_logs[0].decision.id == "d0"
+
+    decision.outcome = True
+    assert agent.decision_logs[0].decision.outcome is True
+    assert agent.calculate_performance() == 1.0
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for log retention policies and windowed/decayed metrics
+"""
+
+import random
+
+import pytest
+
+from src.log_store import ColumnarLogStore, MIN_COMPACTION_ROWS
+from src.retention import LastN, TimeWindow, ExponentialDecay, RetentionPolicy
+
+
+@pytest.mark.parametrize("make_store", [lambda: None, ColumnarLogStore])
+def test_compaction_keeps_lifetime_totals_exact(make_store, build_system, routed):
+    reference = build_system()
+    bounded = build_system(log_store=make_store())
+    bounded.set_retention_policy(LastN(50))
+    reference_decisions = routed(reference, 1, "C", 600)
+    bounded_decisions = routed(bounded, 1, "C", 600)
+
+    rng = random.Random(2)
+    for i in rng.sample(range(600), 200):
+        outcome = rng.choice([True, False, None])
+        reference_decisions[i].outcome = outcome
+        bounded_decisions[i].outcome = outcome
+
+    for agent_id, agent in bounded.hierarchy.agents.items():
+        expected = reference.hierarchy.agents[agent_id]
+        assert len(agent.decision_logs) <= 50 * 1.125 + 1
+        assert agent.decision_count == expected.decision_count
+        assert agent.positive_outcome_count == expected.positive_outcome_count
+        assert agent.calculate_performance() == expected.calculate_performance()
+        summary = agent.log_summary
+        if summary is not None:
+            kept = list(agent.decision_logs)
+            assert summary.decisions + len(kept) == expected.decision_count
+            assert summary.positive + sum(1 for log in kept if log.decision.outcome) == \
+                expected.positive_outcome_count
+            assert [log.decision.id for log in kept] == \
+                [log.decision.id for log in list(expected.decision_logs)[-len(kept):]]
+
+
+
+def test_retention_compacts_the_shared_store(build_system, routed):
+    store = ColumnarLogStore()
+    reference = build_system()
+    bounded = build_system(log_store=store)
+    bounded.set_retention_policy(LastN(50))
+    count = 4 * MIN_COMPACTION_ROWS
+    reference_decisions = routed(reference, 3, "C", count)
+    bounded_decisions = routed(bounded, 3, "C", count)
+    live = sum(len(agent.decision_logs) for agent in bounded.hierarchy.agents.values())
+    assert len(store) <= 2 * live + MIN_COMPACTION_ROWS
+    assert len(store.strings) <= 2 * len(store) + 10
+
+    # Late outcomes still reach kept and compacted entries after the rows moved
+    rng = random.Random(4)
+    for i in rng.sample(range(count), 500):
+        outcome = rng.choice([True, False, None])
+        reference_decisions[i].outcome = outcome
+        bounded_decisions[i].outcome = outcome
+    for agent_id, agent in bounded.hierarchy.agents.items():
+        expected = reference.hierarchy.agents[agent_id]
+        kept = list(agent.decision_logs)
+        assert agent.positive_outcome_count == expected.positive_outcome_count
+        assert [(log.decision.id, log.decision.outcome, log.timestamp) for log in kept] == \
+            [(log.decision.id, log.decision.outcome, log.timestamp)
+             for log in list(expected.decision_logs)[-len(kept):]]
+
+
+def test_retention_policies_must_define_excess():
+    with pytest.raises(TypeError):
+        RetentionPolicy()
+
+def test_time_window_and_decay_policies_bound_by_age(build_system, routed):
+    system = build_system()
+    routed(system, 3, "C", 600)
+    agent = system.hierarchy.agents["A"]
+    newest = agent.decision_logs[-1].timestamp
+
+    agent.set_retention_policy(TimeWindow(100.0))
+    assert all(log.timestamp >= newest - 100.0 for log in agent.decision_logs)
+
+    agent.set_retention_policy(ExponentialDecay(half_life=5.0, min_weight=0.25))
+    assert all(log.timestamp >= newest - 10.0 for log in agent.decision_logs)
+    assert agent.decision_count == agent.log_summary.decisions + len(agent.decision_logs)
+
+
+def test_windowed_and_decayed_metrics_match_brute_force(build_system, routed):
+    system = build_system()
+    agent = system.hierarchy.agents["C"]
+    with pytest.raises(ValueError):
+        agent.calculate_windowed_performance()
+    routed(system, 4, "C", 100)
+    agent.track_recent_decisions(64, half_life=20.0)
+    decisions = routed(system, 5, "C", 300)
+    decisions[-1].outcome = True
+
+    logs = list(agent.decision_logs)
+    recent = logs[-64:]
+    assert agent.calculate_windowed_performance() == \
+        sum(1 for log in recent if log.decision.outcome) / len(recent)
+    now = logs[-1].timestamp
+    in_window = [log for log in recent if log.timestamp >= now - 30.0]
+    assert agent.calculate_windowed_performance(window=30.0) == \
+        sum(1 for log in in_window if log.decision.outcome) / len(in_window)
+    assert agent.calculate_windowed_accountability() == 1.0
+
+    weights = [0.5 ** ((now - log.timestamp) / 20.0) for log in logs]
+    expected = sum(w for w, log in zip(weights, logs) if log.decision.outcome) / sum(weights)
+    # Decisions pushed out of the ring keep the outcome they had at that point
+    assert agent.calculate_decayed_performance() == pytest.approx(expected, rel=1e-9)
+    assert agent.calculate_decayed_knowledge_contribution() == pytest.approx(0.5 * expected, rel=1e-9)
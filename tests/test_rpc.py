@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for the local routing service
+"""
+
+import os
+import socket
+import tempfile
+import threading
+
+import pytest
+
+from src.peterson_ai_model import Decision
+from src.rpc import RemoteError, RoutingClient, RoutingServer
+from src.synthetic import generate_decisions, leaf_ids
+
+
+@pytest.fixture
+def build_service_system(synthetic_system):
+    return lambda: synthetic_system(200, seed=7, fan_out=4)
+
+
+@pytest.fixture(params=["unix", "tcp"])
+def address(request):
+    if request.param == "tcp":
+        yield ("127.0.0.1", 0)
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        yield os.path.join(directory, "routing.sock")
+
+
+def test_remote_routing_matches_local_routing(address, build_service_system):
+    local, remote = build_service_system(), build_service_system()
+    leaves = leaf_ids(list(local.hierarchy.agents.values()))
+    pairs = list(generate_decisions(300, leaves, seed=8))
+
+    with RoutingServer(remote, address) as server, RoutingClient(server.address) as client:
+        for decision, agent_id in pairs[:100]:
+            expected = local.route_decision(decision, agent_id)
+            actual = client.route_decision(decision, agent_id)
+            assert actual[0] == expected[0]
+            assert actual[1].timestamp == expected[1].timestamp
+            assert actual[1].supervisor_id == expected[1].supervisor_id
+        batch = pairs[100:]
+        expected = [local.route_decision(decision, agent_id) for decision, agent_id in batch]
+        actual = client.route_decisions([decision for decision, _ in batch], [agent_id for _, agent_id in batch])
+        assert [(handler, entry.timestamp) for handler, entry in actual] == \
+            [(handler, entry.timestamp) for handler, entry in expected]
+
+        agent_id = expected[0][0]
+        assert client.query("performance", agent_id) == pytest.approx(
+            remote.hierarchy.agents[agent_id].calculate_performance())
+        assert client.metrics(agent_id)["decision_count"] == remote.hierarchy.agents[agent_id].decision_count
+        assert client.query("stability") == pytest.approx(remote.calculate_system_stability())
+        with pytest.raises(RemoteError, match="Unknown"):
+            client.query("nonsense")
+        with pytest.raises(RemoteError, match="Unknown agent"):
+            client.route_decision(Decision(id="x", description="Task", complexity=1.0), "missing")
+    assert sum(agent.decision_count for agent in remote.hierarchy.agents.values()) == 300
+    if isinstance(address, str):
+        assert not os.path.exists(address)
+
+
+def test_concurrent_calls_are_coalesced(address, build_service_system):
+    system = build_service_system()
+    leaves = leaf_ids(list(system.hierarchy.agents.values()))
+    pairs = list(generate_decisions(800, leaves, seed=9))
+    requests = []
+
+    with RoutingServer(system, address) as server, RoutingClient(server.address, pool_size=2) as client:
+        original = client._exchange
+
+        def counting_exchange(sock, operation, request):
+            requests.append(len(request.get('decisions', ())))
+            return original(sock, operation, request)
+        client._exchange = counting_exchange
+
+        results = [None] * len(pairs)
+
+        def worker(start):
+            for i in range(start, len(pairs), 8):
+                results[i] = client.route_decision(*pairs[i])
+
+        threads = [threading.Thread(target=worker, args=(start,)) for start in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert all(result is not None for result in results)
+    assert sum(requests) == len(pairs)
+    # Eight callers sharing two connections must have shared requests
+    assert len(requests) < len(pairs)
+    assert sum(agent.decision_count for agent in system.hierarchy.agents.values()) == len(pairs)
+    for (decision, _), (handler_id, log_entry) in zip(pairs, results):
+        assert log_entry.decision is decision and log_entry.agent_id == handler_id
+    timestamps = sorted(log_entry.timestamp for _, log_entry in results)
+    assert timestamps == [float(n) for n in range(len(pairs))]
+
+
+def test_unix_server_only_replaces_stale_sockets(build_service_system):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "routing.sock")
+        with open(path, "w") as handle:
+            handle.write("not a socket")
+        with pytest.raises(OSError):
+            RoutingServer(build_service_system(), path)
+        with open(path) as handle:
+            assert handle.read() == "not a socket"
+        os.unlink(path)
+
+        with RoutingServer(build_service_system(), path):
+            # A live socket is not taken over
+            with pytest.raises(OSError):
+                RoutingServer(build_service_system(), path)
+            assert os.path.exists(path)
+        assert not os.path.exists(path)
+
+        # A socket left behind by a server that is gone is replaced
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(path)
+        stale.close()
+        with RoutingServer(build_service_system(), path) as server, RoutingClient(server.address) as client:
+            assert client.query("instability") >= 0.0
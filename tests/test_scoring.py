@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Tests for vectorized scoring and system stability
+"""
+
+import pytest
+
+from src.peterson_ai_model import PetersonianAISystem
+
+np = pytest.importorskip("numpy")
+
+from src.scoring import score_agents, system_stability  # noqa: E402
+
+
+@pytest.fixture
+def system(synthetic_system):
+    system = synthetic_system(300, 3000, seed=3, fan_out=4, jitter=1.5)
+    agents = list(system.hierarchy.agents.values())
+    agents[3].propose_rule(agents[3].ethical_rules[0].copy())
+    agents[8].improve_rule("truth_telling", active=False)
+    agents[9].ethical_rules = []
+    return system
+
+
+def test_vectorized_scores_match_per_agent_methods(system):
+    scores = score_agents(system.hierarchy)
+    max_knowledge = system.get_max_knowledge_contribution()
+    assert scores.max_knowledge == pytest.approx(max_knowledge)
+    for i, agent_id in enumerate(scores.ids):
+        agent = system.hierarchy.agents[agent_id]
+        assert scores.performance[i] == pytest.approx(agent.calculate_performance())
+        assert scores.accountability[i] == pytest.approx(agent.calculate_accountability())
+        assert scores.knowledge[i] == pytest.approx(agent.calculate_knowledge_contribution())
+        assert scores.citizenship[i] == pytest.approx(agent.calculate_citizenship_score(max_knowledge))
+    assert scores.as_dict()[scores.ids[0]]['decisions'] == system.hierarchy.agents[scores.ids[0]].decision_count
+
+
+def test_system_stability_is_bounded_and_consistent(system):
+    stability = system.calculate_system_stability()
+    assert 0.0 <= stability <= 1.0
+    assert system_stability(system) == pytest.approx(stability)
+    assert PetersonianAISystem().calculate_system_stability() == 0.5
+    assert len(score_agents(PetersonianAISystem().hierarchy)) == 0
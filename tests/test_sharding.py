@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for sharded routing across worker processes
+"""
+
+from src.sharding import (
+    _WORKER_SHARDS, _assign_workers, _init_worker, _shard_specs, partition_subtrees, route_decisions_sharded
+)
+
+
+def test_partition_covers_connected_subtrees(random_system):
+    system = random_system(1, size=200)
+    index = system.hierarchy.get_index()
+    plan = partition_subtrees(index, 6)
+    assert len(plan.roots) > 1
+    assert sorted(plan.owner[root] for root in plan.roots) == list(range(len(plan.roots)))
+    for node, shard in enumerate(plan.owner):
+        if node not in plan.roots:
+            assert plan.owner[index.parent[node]] == shard
+
+
+def test_sharded_routing_matches_sequential_routing(random_system, decision_stream, log_signature):
+    sequential = random_system(2, size=200)
+    sharded = random_system(2, size=200)
+    decisions, entry_ids = map(list, zip(*decision_stream(3, list(sequential.hierarchy.agents), 2000)))
+    for decision, agent_id in zip(decisions, entry_ids):
+        sequential.route_decision(decision, agent_id)
+
+    decisions, entry_ids = map(list, zip(*decision_stream(3, list(sequential.hierarchy.agents), 2000)))
+    results = route_decisions_sharded(sharded, decisions, entry_ids, shards=5, max_workers=2)
+
+    assert [log_entry.decision for _, log_entry in results] == decisions
+    assert log_signature(sharded) == log_signature(sequential)
+    assert sharded.timestamp == sequential.timestamp
+    assert sharded.get_max_knowledge_contribution() == sequential.get_max_knowledge_contribution()
+
+
+def test_workers_own_disjoint_balanced_shards(random_system):
+    system = random_system(4, size=200)
+    index = system.hierarchy.get_index()
+    specs = _shard_specs(system.hierarchy, index, partition_subtrees(index, 8))
+    assignment = _assign_workers(specs, 3)
+    assert sorted(set(assignment)) == [0, 1, 2]
+    loads = [sum(len(specs[shard][0]) for shard, worker in enumerate(assignment) if worker == owner)
+             for owner in range(3)]
+    assert sum(loads) == len(system.hierarchy.agents)
+    assert max(loads) - min(loads) <= max(len(members) for members, _ in specs)
+
+    # A worker builds only the shards it was sent
+    owned = {shard: specs[shard] for shard, worker in enumerate(assignment) if worker == 1}
+    _init_worker(owned)
+    assert sorted(_WORKER_SHARDS) == sorted(owned)
+    assert sum(len(shard_index.ids) for shard_index, _ in _WORKER_SHARDS.values()) == loads[1]
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared copy-on-write default rule set and slotted model classes
+"""
+
+import copy
+import pickle
+import sys
+
+import pytest
+
+from src.peterson_ai_model import Agent, Decision, DecisionLogEntry, EthicalRule, DEFAULT_ETHICAL_RULES
+
+
+def test_agents_share_default_rules_until_they_change_them():
+    first = Agent(id="a", name="First", capability=5.0)
+    second = Agent(id="b", name="Second", capability=5.0)
+    assert first.shares_default_rules and second.shares_default_rules
+    assert first.ethical_rules is second.ethical_rules is DEFAULT_ETHICAL_RULES
+    assert [rule.priority for rule in first.ethical_rules] == [1, 2, 3, 4, 5]
+
+    first.propose_rule(EthicalRule("transparency", "Explain decisions", 6))
+    assert first.rule_proposals == 1
+    assert [rule.id for rule in first.ethical_rules][-1] == "transparency"
+    assert second.shares_default_rules
+
+    second.improve_rule("truth_telling", priority=1)
+    assert second.rule_improvements == 1
+    assert second.ethical_rules[2].priority == 1
+    assert DEFAULT_ETHICAL_RULES[2].priority == 3
+
+
+def test_counting_rule_activity_copies_the_rules():
+    agent = Agent(id="a", name="Agent", capability=5.0)
+    agent.rule_improvements += 1
+    assert isinstance(agent.ethical_rules, list)
+    agent.ethical_rules[0].active = False
+    assert DEFAULT_ETHICAL_RULES[0].active is True
+
+
+def test_shared_rules_are_read_only():
+    agent = Agent(id="a", name="Agent", capability=5.0)
+    with pytest.raises(AttributeError):
+        agent.ethical_rules[0].active = False
+    with pytest.raises(AttributeError):
+        DEFAULT_ETHICAL_RULES[0].active = False
+    assert agent.shares_default_rules
+
+    rules = agent.own_ethical_rules()
+    rules[0].active = False
+    assert agent.ethical_rules is rules and not agent.shares_default_rules
+    assert DEFAULT_ETHICAL_RULES[0].active is True
+    with pytest.raises(KeyError):
+        agent.improve_rule("missing", active=False)
+
+
+def test_explicit_rule_lists_get_their_own_rules():
+    rules = list(DEFAULT_ETHICAL_RULES)
+    agent = Agent(id="a", name="Agent", capability=5.0, ethical_rules=rules)
+    assert agent.ethical_rules is rules and not agent.shares_default_rules
+    assert agent.ethical_rules == list(DEFAULT_ETHICAL_RULES)
+    agent.ethical_rules[0].active = False
+    agent.ethical_rules.append(EthicalRule("transparency", "Explain decisions", 6))
+    assert DEFAULT_ETHICAL_RULES[0].active is True
+    assert len(DEFAULT_ETHICAL_RULES) == 5
+
+    # Appending a shared rule afterwards is copied on the next write
+    agent.ethical_rules.append(DEFAULT_ETHICAL_RULES[4])
+    agent.improve_rule("community_contribution", active=False)
+    assert DEFAULT_ETHICAL_RULES[4].active is True
+
+
+def test_slices_of_the_defaults_get_their_own_rules():
+    agent = Agent(id="a", name="Agent", capability=5.0, ethical_rules=DEFAULT_ETHICAL_RULES[1:3])
+    assert [rule.id for rule in agent.ethical_rules] == ["personal_responsibility", "truth_telling"]
+    agent.ethical_rules[0].priority = 9
+
+    other = Agent(id="b", name="Other", capability=5.0)
+    other.ethical_rules = other.ethical_rules[::2]
+    assert not other.shares_default_rules
+    other.ethical_rules[-1].active = False
+    for rule in DEFAULT_ETHICAL_RULES:
+        assert rule.active is True
+    assert DEFAULT_ETHICAL_RULES[1].priority == 2
+
+
+def test_copies_and_pickles_keep_sharing_the_defaults():
+    agent = Agent(id="a", name="Agent", capability=5.0)
+    for clone in (copy.copy(agent), copy.deepcopy(agent), pickle.loads(pickle.dumps(agent))):
+        assert clone == agent
+        assert clone.shares_default_rules and clone.ethical_rules is DEFAULT_ETHICAL_RULES
+        clone.improve_rule("hierarchy_respect", active=False)
+        assert agent.ethical_rules[0].active is True
+    assert copy.copy(agent.ethical_rules[0]) == DEFAULT_ETHICAL_RULES[0]
+    assert pickle.loads(pickle.dumps(DEFAULT_ETHICAL_RULES[0])) is DEFAULT_ETHICAL_RULES[0]
+
+    agent.improve_rule("truth_telling", priority=1)
+    clone = pickle.loads(pickle.dumps(agent))
+    assert not clone.shares_default_rules
+    assert clone.ethical_rules == agent.ethical_rules
+    clone.ethical_rules[0].active = False
+    assert agent.ethical_rules[0].active is True
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason="dataclass slots need Python 3.10")
+def test_model_classes_are_slotted():
+    decision = Decision(id="d", description="Task", complexity=1.0)
+    instances = [
+        Agent(id="a", name="Agent", capability=5.0),
+        decision,
+        DecisionLogEntry(decision=decision, agent_id="a", timestamp=0.0, directly_made=True),
+        EthicalRule("r", "Rule", 1),
+    ]
+    for instance in instances:
+        assert not hasattr(instance, "__dict__")
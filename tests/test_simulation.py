@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the seeded simulation engine
+"""
+
+import pytest
+
+from src.retention import LastN
+
+np = pytest.importorskip("numpy")
+
+from src.simulation import HIERARCHY_SHAPES, SimulationConfig, SimulationEngine, build_hierarchy  # noqa: E402
+
+
+def without_timing(samples):
+    return [{key: value for key, value in sample.items() if key != 'decisions_per_second'}
+            for sample in samples]
+
+
+def test_runs_are_reproducible():
+    config = SimulationConfig(agents=300, rounds=6, decisions_per_round=2000, sample_every=2, seed=4)
+    first, second = SimulationEngine(config), SimulationEngine(config)
+    assert without_timing(first.run()) == without_timing(second.run())
+    assert len(first.samples) == 3 and first.routed == 12000
+    assert first.system.hierarchy.agents["agent-0"].decision_count == \
+        second.system.hierarchy.agents["agent-0"].decision_count
+    other = SimulationEngine(SimulationConfig(agents=300, rounds=6, decisions_per_round=2000, sample_every=2,
+                                              seed=5))
+    assert without_timing(other.run()) != without_timing(first.samples)
+
+
+@pytest.mark.parametrize("shape", HIERARCHY_SHAPES)
+def test_hierarchy_shapes(shape):
+    hierarchy = build_hierarchy(SimulationConfig(agents=101, shape=shape, fan_out=5, jitter=0.0))
+    index = hierarchy.get_index()
+    assert len(hierarchy.agents) == 101
+    assert sum(1 for parent in index.parent if parent < 0) == 1
+    assert hierarchy.is_valid()
+    if shape == 'flat':
+        assert max(index.depth) == 1
+    elif shape == 'chains':
+        assert max(index.depth) == 20
+    elif shape == 'balanced':
+        assert max(index.depth) == 3
+    with pytest.raises(ValueError):
+        build_hierarchy(SimulationConfig(shape="ring"))
+
+
+def test_governance_policies_and_sampled_metrics():
+    config = SimulationConfig(agents=200, rounds=8, decisions_per_round=1000, sample_every=4,
+                              load_aware=True, adapt_every=2, retention=LastN(50), seed=2)
+    engine = SimulationEngine(config)
+    samples = engine.run()
+    assert [sample['round'] for sample in samples] == [4, 8]
+    for sample in samples:
+        assert 0.0 <= sample['round_escalation_rate'] <= 1.0
+        assert 0.0 <= sample['stability'] <= 1.0
+        assert sample['active_agents'] > 0
+    assert engine.system.load_tracker is not None
+    assert max(len(agent.decision_logs) for agent in engine.system.hierarchy.agents.values()) <= 50 * 1.125 + 1
+    assert sum(agent.decision_count for agent in engine.system.hierarchy.agents.values()) == 8000
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for mergeable routing sketches
+"""
+
+import json
+import random
+import threading
+
+import pytest
+
+from src.sketches import DistinctCounter, QuantileSketch, RoutingSketches
+from src.synthetic import generate_system, generate_decisions, leaf_ids
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_quantiles_stay_within_relative_accuracy_and_merge():
+    rng = random.Random(1)
+    values = [rng.lognormvariate(1.0, 1.5) for _ in range(20000)] + [0.0] * 500
+    whole, left, right = QuantileSketch(0.01), QuantileSketch(0.01), QuantileSketch(0.01)
+    for n, value in enumerate(values):
+        whole.add(value)
+        (left if n % 2 else right).add(value)
+    merged = left.merge(right)
+    for q in (0.01, 0.5, 0.95, 0.99, 1.0):
+        expected = exact_quantile(values, q)
+        assert whole.quantile(q) == pytest.approx(expected, rel=0.0101, abs=1e-9)
+        assert merged.quantile(q) == whole.quantile(q)
+    assert whole.quantile(0.0) == 0.0 and whole.quantile(1.0) == max(values)
+    assert QuantileSketch().quantile(0.5) is None
+
+    bounded = QuantileSketch(0.01, max_bins=200)
+    for value in values:
+        bounded.add(value)
+    assert len(bounded.bins) <= 200
+    assert bounded.quantile(0.99) == pytest.approx(exact_quantile(values, 0.99), rel=0.0101)
+
+
+def test_distinct_counter_estimates_and_merges():
+    left, right = DistinctCounter(12), DistinctCounter(12)
+    for n in range(30000):
+        left.add(f"decision-{n}")
+        right.add(f"decision-{n + 15000}")
+        left.add(f"decision-{n}")  # duplicates do not count
+    assert left.estimate() == pytest.approx(30000, rel=0.05)
+    assert left.merge(right).estimate() == pytest.approx(45000, rel=0.05)
+    small = DistinctCounter()
+    for n in range(100):
+        small.add(str(n))
+    assert small.estimate() == pytest.approx(100, abs=3)
+    with pytest.raises(ValueError):
+        left.merge(DistinctCounter(10))
+
+
+def test_system_sketches_follow_routing_and_round_trip():
+    system = generate_system(150, fan_out=3, seed=3)
+    sketches = system.enable_sketches(relative_accuracy=0.02)
+    leaves = leaf_ids(list(system.hierarchy.agents.values()))
+    handled, depths = {}, {}
+    index = system.hierarchy.get_index()
+    for decision, agent_id in generate_decisions(4000, leaves, seed=4):
+        handler_id, _ = system.route_decision(decision, agent_id)
+        handled.setdefault(handler_id, []).append(decision.complexity)
+        depths.setdefault(agent_id, []).append(
+            index.depth[index.positions[agent_id]] - index.depth[index.positions[handler_id]])
+
+    busiest = max(handled, key=lambda agent_id: len(handled[agent_id]))
+    for q, value in sketches.complexity_quantiles(busiest).items():
+        assert value == pytest.approx(exact_quantile(handled[busiest], q), rel=0.0201)
+    entry = leaves[0]
+    assert sketches.escalation_depth_quantiles(entry)[0.99] == pytest.approx(
+        exact_quantile(depths[entry], 0.99), rel=0.0201)
+    assert sketches.distinct_decisions(busiest) == pytest.approx(len(handled[busiest]), rel=0.1)
+    assert sketches.complexity_quantiles("nobody") == {0.5: None, 0.95: None, 0.99: None}
+    assert sketches.summary()[entry]['arriving'] == len(depths[entry])
+
+    restored = RoutingSketches.from_dict(json.loads(json.dumps(sketches.to_dict())))
+    assert restored.summary() == sketches.summary()
+    # Merging two shards' sketches equals sketching all traffic in one place
+    doubled = RoutingSketches.from_dict(sketches.to_dict()).merge(restored)
+    assert doubled.summary()[entry]['arriving'] == 2 * len(depths[entry])
+    assert doubled.complexity_quantiles(busiest) == sketches.complexity_quantiles(busiest)
+
+
+def test_batch_routing_records_the_same_sketches():
+    pytest.importorskip("numpy")
+    single, batch = generate_system(100, seed=5), generate_system(100, seed=5)
+    single.enable_sketches()
+    batch.enable_sketches()
+    leaves = leaf_ids(list(single.hierarchy.agents.values()))
+    pairs = list(generate_decisions(1000, leaves, seed=6))
+    for decision, agent_id in pairs:
+        single.route_decision(decision, agent_id)
+    batch.route_decisions([decision for decision, _ in pairs], [agent_id for _, agent_id in pairs])
+    assert batch.sketches.to_dict() == single.sketches.to_dict()
+
+
+def test_threads_record_into_shards_that_merge_on_read():
+    rng = random.Random(7)
+    routes = [(f"e{rng.randrange(5)}", f"h{rng.randrange(3)}", rng.uniform(0.1, 10), rng.randrange(4), f"d{n}")
+              for n in range(4000)]
+    single = RoutingSketches(shards=1)
+    single.record_routes(routes)
+
+    sharded = RoutingSketches(shards=4)
+    threads = [threading.Thread(target=sharded.record_routes, args=(routes[start::4],)) for start in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(1 for shard in sharded._shards if shard.agents) == 4
+    assert sharded.summary() == single.summary()
+    assert sharded.distinct_decisions("h1") == single.distinct_decisions("h1")
+    assert sharded.escalation_depth_quantiles("e2") == single.escalation_depth_quantiles("e2")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for system snapshots
+"""
+
+import pytest
+
+from src.peterson_ai_model import Decision, EthicalRule
+from src.log_store import ColumnarLogStore
+from src.retention import LastN
+from src import snapshot
+from src.snapshot import SnapshotLog, load_snapshot, save_snapshot
+
+
+@pytest.fixture
+def populated_system(build_system, routed):
+    """Factory for the organization with its own rules, a non-ASCII name and routed decisions"""
+    def build(log_store=None):
+        system = build_system(log_store=log_store)
+        agents = system.hierarchy.agents
+        agents["D"].name = "Ünïcode"
+        agents["B"].propose_rule(EthicalRule("escalate", "Escalate when unsure", 6))
+        agents["C"].improve_rule("truth_telling", active=False)
+        routed(system, 1, "CD", 300, descriptions=("Refund", "Audit"))
+        return system
+    return build
+
+
+def agent_state(system):
+    return {
+        agent_id: (agent.name, agent.capability, agent.supervisor_id, agent.rule_proposals,
+                   agent.rule_improvements, agent.decision_count, agent.positive_outcome_count,
+                   [(r.id, r.description, r.priority, r.active) for r in agent.ethical_rules])
+        for agent_id, agent in system.hierarchy.agents.items()
+    }
+
+
+@pytest.mark.parametrize("make_store", [lambda: None, ColumnarLogStore])
+def test_snapshot_round_trip_restores_state_lazily(tmp_path, make_store, populated_system, log_signature):
+    system = populated_system(make_store())
+    system.hierarchy.agents["A"].set_retention_policy(LastN(20))
+    path = str(tmp_path / "system.snap")
+    save_snapshot(system, path)
+
+    restored = load_snapshot(path)
+    assert agent_state(restored) == agent_state(system)
+    assert restored.timestamp == system.timestamp
+    assert restored.hierarchy.calculate_instability() == system.hierarchy.calculate_instability()
+    assert restored.get_max_knowledge_contribution() == system.get_max_knowledge_contribution()
+    assert restored.hierarchy.agents["A"].log_summary.decisions == system.hierarchy.agents["A"].log_summary.decisions
+    assert restored.hierarchy.agents["B"].ethical_rules is not system.hierarchy.agents["B"].ethical_rules
+    for agent in restored.hierarchy.agents.values():
+        assert isinstance(agent.decision_logs, SnapshotLog) and not agent.decision_logs.loaded
+
+    # Routing and metrics work without touching the stored logs
+    extra = Decision(id="extra", description="Late", complexity=5.0, outcome=True)
+    system.route_decision(Decision(id="extra", description="Late", complexity=5.0, outcome=True), "C")
+    restored.route_decision(extra, "C")
+    assert not restored.hierarchy.agents["B"].decision_logs.loaded
+    assert agent_state(restored) == agent_state(system)
+
+    assert log_signature(restored) == log_signature(system)
+    assert restored.hierarchy.agents["B"].decision_logs.loaded
+
+
+def test_restored_decisions_track_outcome_changes(tmp_path, populated_system):
+    system = populated_system()
+    path = str(tmp_path / "system.snap")
+    save_snapshot(system, path)
+    restored = load_snapshot(path)
+
+    agent = restored.hierarchy.agents["C"]
+    before = agent.positive_outcome_count
+    first = agent.decision_logs[0].decision
+    first.outcome = not first.outcome
+    assert agent.positive_outcome_count == before + (1 if first.outcome else -1)
+
+
+def test_agents_keep_their_registration_order(tmp_path, build_system):
+    # Juniors registered before their supervisors, which preorder would reverse
+    system = build_system([("D", "Junior", 3.0, "B"), ("C", "Junior", 4.0, "B"),
+                           ("B", "Manager", 7.0, "A"), ("A", "CEO", 10.0, None)])
+    path = str(tmp_path / "system.snap")
+    save_snapshot(system, path)
+    restored = load_snapshot(path)
+    assert list(restored.hierarchy.agents) == ["D", "C", "B", "A"]
+    assert restored.hierarchy.edges == system.hierarchy.edges
+    assert restored.hierarchy.get_distance("D", "A") == 2
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a snapshot" * 10)
+    with pytest.raises(ValueError):
+        load_snapshot(str(path))
+
+
+def test_documented_record_sizes_match_the_formats():
+    documented = {
+        snapshot.HEADER: "an 88-byte header",
+        snapshot.AGENT: "one 144-byte record per agent",
+        snapshot.RULE: "32-byte records",
+        snapshot.LOG: "48-byte records",
+    }
+    for record, text in documented.items():
+        assert text in snapshot.__doc__
+        assert f"{record.size}-byte" in text
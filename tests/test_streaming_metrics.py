@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming metric evaluation over decision-log files
+"""
+
+import json
+
+import pytest
+
+from src.peterson_ai_model import Agent
+from src.streaming_metrics import (
+    StreamingEvaluator, iter_log_records, read_hierarchy, read_log_records, write_log_records
+)
+from examples.evaluate_logs import main as evaluate_logs_main
+
+
+AGENTS = [
+    {"id": "A", "name": "CEO", "capability": 10.0, "supervisor_id": None, "rule_proposals": 2},
+    {"id": "B", "name": "Manager", "capability": 7.0, "supervisor_id": "A", "rule_improvements": 1},
+    {"id": "C", "name": "Junior", "capability": 4.0, "supervisor_id": "B"},
+    {"id": "D", "name": "Junior", "capability": 3.0, "supervisor_id": "B"},
+]
+
+
+@pytest.fixture
+def system(build_system, routed):
+    system = build_system([Agent(**row) for row in AGENTS])
+    routed(system, 12, "CD", 300)
+    return system
+
+
+@pytest.mark.parametrize("suffix", ["jsonl", "csv"])
+def test_streamed_scores_match_agent_methods(tmp_path, suffix, system):
+    log_path = str(tmp_path / f"logs.{suffix}")
+    agents_path = tmp_path / "agents.jsonl"
+    write_log_records(iter_log_records(system), log_path)
+    agents_path.write_text("\n".join(json.dumps(row) for row in AGENTS))
+
+    evaluator = StreamingEvaluator(read_hierarchy(str(agents_path)))
+    evaluator.feed(read_log_records(log_path))
+    scores = evaluator.agent_scores()
+
+    max_knowledge = system.get_max_knowledge_contribution()
+    responsibilities = system.get_responsibilities()
+    for agent_id, agent in system.hierarchy.agents.items():
+        assert scores[agent_id]["decisions"] == len(agent.decision_logs)
+        assert scores[agent_id]["performance"] == agent.calculate_performance()
+        assert scores[agent_id]["accountability"] == agent.calculate_accountability()
+        assert scores[agent_id]["knowledge_contribution"] == agent.calculate_knowledge_contribution()
+        assert scores[agent_id]["citizenship"] == agent.calculate_citizenship_score(max_knowledge)
+        expected = responsibilities[agent_id]
+        assert scores[agent_id]["mean_responsibility"] == \
+            pytest.approx(sum(expected) / len(expected) if expected else 0.0)
+
+    summary = evaluator.system_scores()
+    assert summary["decisions"] == 300
+    assert summary["max_knowledge_contribution"] == max_knowledge
+    assert summary["instability"] == system.hierarchy.calculate_instability()
+
+
+def test_cli_writes_scores(tmp_path, system):
+    log_path = str(tmp_path / "logs.jsonl")
+    output = tmp_path / "scores.json"
+    write_log_records(iter_log_records(system), log_path)
+
+    evaluate_logs_main([log_path, log_path, "--output", str(output)])
+    scores = json.loads(output.read_text())
+    assert scores["system"]["decisions"] == 600
+    assert scores["agents"]["C"]["performance"] == system.hierarchy.agents["C"].calculate_performance()
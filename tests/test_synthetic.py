@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for the synthetic workload generators and benchmark comparison
+"""
+
+import json
+from collections import Counter
+
+import pytest
+
+from src.synthetic import generate_agents, generate_decisions, generate_system, leaf_ids
+from benchmarks.run_benchmarks import BASELINE, BENCHMARKS, compare, compare_speedups, percentile
+
+
+def test_generated_hierarchy_respects_shape_and_seed():
+    agents = generate_agents(500, fan_out=3, depth=7, seed=4)
+    assert [(a.id, a.capability, a.supervisor_id) for a in agents] == \
+        [(a.id, a.capability, a.supervisor_id) for a in generate_agents(500, fan_out=3, depth=7, seed=4)]
+    assert max(Counter(a.supervisor_id for a in agents if a.supervisor_id).values()) <= 3
+
+    system = generate_system(500, fan_out=3, depth=7, seed=4)
+    index = system.hierarchy.get_index()
+    assert max(index.depth) <= 7
+    assert sum(1 for a in agents if a.supervisor_id is None) == 1
+
+    with pytest.raises(ValueError):
+        generate_agents(100, fan_out=2, depth=2)
+
+
+def test_generated_decisions_are_reproducible_and_bounded():
+    leaves = leaf_ids(generate_agents(50, seed=1))
+    first = [(d.complexity, d.outcome, agent_id)
+             for d, agent_id in generate_decisions(200, leaves, distribution='bimodal', seed=9)]
+    second = [(d.complexity, d.outcome, agent_id)
+              for d, agent_id in generate_decisions(200, leaves, distribution='bimodal', seed=9)]
+    assert first == second
+    assert all(0.0 <= complexity <= 11.0 and agent_id in leaves for complexity, _, agent_id in first)
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {'results': {'op': {'throughput': 1000.0, 'p99_us': 10.0, 'peak_bytes': 100}}}
+    steady = {'results': {'op': {'throughput': 900.0, 'p99_us': 11.0, 'peak_bytes': 110}}}
+    slower = {'results': {'op': {'throughput': 500.0, 'p99_us': 10.0, 'peak_bytes': 100}}}
+    assert compare(steady, baseline, tolerance=0.2) == []
+    assert len(compare(slower, baseline, tolerance=0.2)) == 1
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0.5) == 2.0
+
+
+def test_batch_routing_must_beat_the_scalar_loop():
+    def results(batch, scalar):
+        return {'results': {'route_decisions': {'throughput': batch},
+                            'route_decisions_scalar': {'throughput': scalar}}}
+    assert compare_speedups(results(2000.0, 1000.0)) == []
+    assert len(compare_speedups(results(900.0, 1000.0))) == 1
+    assert compare_speedups({'results': {'route_decisions': {'throughput': 1.0}}}) == []
+
+
+def test_committed_baseline_covers_the_default_run():
+    with open(BASELINE, encoding='utf-8') as handle:
+        baseline = json.load(handle)
+    assert baseline['config'] == {'agents': 10000, 'fan_out': 8, 'depth': None, 'decisions': 50000,
+                                  'complexity': 'uniform', 'seed': 0}
+    assert set(BENCHMARKS) <= set(baseline['results'])